@@ -0,0 +1,26 @@
+import argparse
+import logging
+import sys
+
+from returns.daemon import *
+from returns.data import get_combined_sp500_interest_data
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep market data and warm workers resident and serve "
+                                                 "sweep requests over a local socket.")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    # Configure logging
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S",
+                        stream=sys.stdout)
+    d, h = get_combined_sp500_interest_data()
+    server = SimulationDaemon(d, args.socket, args.workers)
+    logger.info(f"Serving sweeps on {args.socket}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,47 @@
+import argparse
+import datetime
+import glob
+import multiprocessing as mp
+import sys
+from itertools import repeat
+
+from returns.data import *
+from returns.models import MODEL_SPEC_FAMILIES
+from returns.pipeline import PIPELINE_HORIZONS, summarize_model
+from returns.stages import StageManifest
+from returns.summary_index import update_summary_index
+
+path = "./out_data/"
+
+
+def pipeline_manager(spec, date_str, raw):
+    """
+    Runs one model through simulation and summary in this process, recording its outputs in the
+    stage manifest.
+    """
+    d, h = get_combined_sp500_interest_data()
+    return summarize_model(spec, d, get_price_range_index(d), date_str, PIPELINE_HORIZONS, raw, path,
+                           manifest=StageManifest())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back-test models and write their summaries in one pass, "
+                                                 "without the per-window result files.")
+    parser.add_argument("--models", choices=list(MODEL_SPEC_FAMILIES) + ["all"], default="insurance",
+                        help="model family to test")
+    parser.add_argument("--raw", action="store_true",
+                        help="also write the per-window result files (returns_<years>_<model>_<date>.csv)")
+    args = parser.parse_args()
+
+    # Configure logging
+    logging.basicConfig(level=logging.INFO,
+                        format="%(process)d|%(asctime)s|%(levelname)s|%(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S",
+                        stream=sys.stdout)
+    specs = [s for k, specs_fn in MODEL_SPEC_FAMILIES.items() if args.models in (k, "all") for s in specs_fn()]
+    date_str = datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
+    with mp.Pool() as p:
+        summaries = p.starmap(pipeline_manager, zip(specs, repeat(date_str), repeat(args.raw)))
+    logger.info(f"Summary files created: {summaries}")
+    update_summary_index(glob.glob(f"{path}summary_*.csv"))
+    logger.info("Done")
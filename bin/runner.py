@@ -1,8 +1,17 @@
+import argparse
 import multiprocessing as mp
+import os
 from itertools import repeat
 
+from returns.checkpoint import SweepCheckpoint
 from returns.data import *
+from returns.distributed import LEASE_TIMEOUT, SweepCoordinator, SweepWorker, make_tasks, run_task_group, start_local_workers
+from returns.engine import *
 from returns.models import *
+from returns.progressive import progressive_model_tester
+from returns.search import OBJECTIVES, parameter_grid, successive_halving
+from returns.stages import StageManifest
+from returns.writer import BackgroundResultWriter
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG,
@@ -12,97 +21,285 @@ logging.basicConfig(level=logging.DEBUG,
                     filemode='w')
 
 path = "./out_data/"
+checkpoint_path = f"{path}checkpoints/"
 
 
-def model_tester(model, data, years=10):
+def model_generator_kelly(data):
     """
-    Tests the given model on the provided data for the specified number of years.
+    Generates models for testing, built from the Kelly specs (with their accrual curve) for data.
     """
-    test_interval = datetime.timedelta(days=STRIDE_DAYS)
-    test_start_date = data[0][0]  # first (oldest) date in data
-    model_returns = []
+    for spec in model_specs_kelly():
+        logging.info(f"Testing KellyModel with bond_fract={spec['kwargs']['bond_fract']}, "
+                     f"rebalance_period={spec['kwargs']['rebalance_period']}")
+        yield build_model(spec, data)
 
-    logging.info("Starting model testing")
 
-    while test_start_date + datetime.timedelta(days=365 * years) < data[-1][0]:
-        model.model_config(test_start_date, years=years)
+def model_generator_bnh():
+    """
+    Generates models for testing.
+    """
+    logging.info(f"Testing Buy and Hold Model")
+    yield Model()
 
-        skip_to_date = test_start_date - PADDING_TIME_DELTA
-        for d in data:
-            if skip_to_date is not None and d[0] < skip_to_date:
-                continue
-            else:
-                # data is (stock price, interest rate by years)
-                _data = (d[combined_sp500_index], d[combined_interest_index])
-                skip_to_date = model.trade(d[0], _data)
 
-        for log_line in model.status():
-            logging.debug(log_line)
+def model_generator_insurance():
+    """
+    Generates models for testing.
+    """
+    for spec in model_specs_insurance():
+        logging.info(f"Testing InsuranceModel with insurance_fract={spec['kwargs']['insurance_frac']}, "
+                     f"insurance_deductible={spec['kwargs']['insurance_deductible']}")
+        yield build_model(spec)
 
-        model_returns.append(model.total_returns())
-        logging.debug((f"frac_returns={model_returns[-1][1]:5.2%} yearly_return_rate={model_returns[-1][2]}"
-                       "model={model.name} start_date={test_start_date}"))
-        test_start_date += test_interval
 
-    logging.info("End model testing")
-    return model_returns
+def model_specs_search():
+    """
+    Candidate specs for the parameter search, a much finer grid than the sweep generators.
+    """
+    kelly = parameter_grid("KellyModel",
+                           bond_fract=[0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5],
+                           rebalance_period=[30, 60, 90, 180, 365])
+    # interest on cash accrues like in the Kelly sweep grid (see model_specs_kelly)
+    return ([dict(spec, accrual="stepped") for spec in kelly] +
+            parameter_grid("InsuranceModel",
+                           insurance_frac=[0.02, 0.05, 0.075, 0.1, 0.15, 0.2],
+                           insurance_deductible=[0.06, 0.09, 0.12, 0.15, 0.18, 0.24]))
 
 
-def model_generator_kelly():
+def group_tasks_by_model(tasks):
     """
-    Generates models for testing.
+    Groups sweep units by (model, horizon), keeping chunk order.
     """
-    for i in [0.1, 0.2, 0.25, 0.15]:
-        for j in [90, 180]:
-            logging.info(f"Testing KellyModel with bond_fract={i}, rebalance_period={j}")
-            yield KellyModel(bond_fract=i, rebalance_period=j)
+    groups = {}
+    for task in tasks:
+        groups.setdefault(task["task_id"].rsplit("_", 1)[0], []).append(task)
+    return list(groups.values())
 
 
-def model_generator_bnh():
+def start_group_writer(group_tasks, first_rets, date_str):
     """
-    Generates models for testing.
+    Opens the background writer of the result file of one (model, horizon), named after the model
+    of its first rows.
+
+    Returns:
+    BackgroundResultWriter: The writer (None if the file was already complete).
     """
-    logging.info(f"Testing Buy and Hold Model")
-    yield Model()
+    fn = f"{path}returns_{group_tasks[0]['years']}_{first_rets[0][-1]}_{date_str}.csv"
+    if os.path.exists(fn):
+        logging.info(f"Results already complete in {fn}")
+        return None
+    logging.info(f"Writing results to {fn}")
+    return BackgroundResultWriter(fn, returns_header(window_metrics=True), atomic=True)
 
 
-def model_generator_insurance():
+def write_group_results(checkpoint, group_tasks, date_str, range_index):
     """
-    Generates models for testing.
+    Assembles the committed units of one (model, horizon) into its result file.
+
+    Returns:
+    BackgroundResultWriter: The finishing writer (None if the file was already complete).
     """
-    for i in [0.05, 0.1]:
-        for j in [0.09, 0.12, 0.18]:
-            logging.info(f"Testing InsuranceModel with insurance_fract={i}, insurance_deductible={j}")
-            yield InsuranceModel(insurance_frac=i, insurance_deductible=j)
+    years = group_tasks[0]["years"]
+    first_rets = checkpoint.read(group_tasks[0]["task_id"])
+    writer = start_group_writer(group_tasks, first_rets, date_str)
+    if writer is None:
+        return None
+    writer.put(range_index.attach_window_metrics(first_rets, years))
+    for task in group_tasks[1:]:
+        writer.put(range_index.attach_window_metrics(checkpoint.read(task["task_id"]), years))
+    writer.finish()
+    return writer
 
 
-def model_test_manager(years, date_str):
+def close_and_record(writers, group_tasks_list):
     """
-    Manages the testing of models for the specified years.
+    Waits for the result writers and records each result file as a stage output in the manifest,
+    with the data files and the model parameters it came from.
+    """
+    manifest = StageManifest()
+    for writer, group_tasks in zip(writers, group_tasks_list):
+        if writer is None:
+            continue
+        writer.close()
+        task = group_tasks[0]
+        params = {"model": task["model"], "years": task["years"], "stride_days": task["stride_days"],
+                  "dataset_hash": task["dataset_hash"]}
+        manifest.record(f"results:{writer.filename}", [sp500_input_path, interest_input_path], params,
+                        [writer.filename])
+
+
+def model_test_manager(model_index, date_str):
     """
-    logging.info(f"Testing models for {years} years")
+    Manages the testing of one model for all horizons of the sweep: each chunk of start dates is
+    simulated once to the longest horizon and the shorter horizons are extracted from that run.
+    Units already committed to the sweep checkpoint are skipped. After each chunk its units are
+    committed and handed to the background writers of their result files, which write them while
+    the next chunk is simulated.
+    """
+    prefix = f"m{model_index:03}_"
+    checkpoint = SweepCheckpoint(f"{checkpoint_path}{date_str}")
+    tasks = [task for task in checkpoint.load() if task["task_id"].startswith(prefix)]
+    logging.info(f"Testing model {tasks[0]['model']} for {len(tasks)} units")
     d, h = get_combined_sp500_interest_data()
+    range_index = get_price_range_index(d)
+    groups = {g[0]["task_id"].rsplit("_", 1)[0]: g for g in group_tasks_by_model(tasks)}
+
+    by_chunk = {}
+    for task in tasks:
+        by_chunk.setdefault(task["chunk"], []).append(task)
+    writers = {}  # (model, horizon) -> writer, None if its file is already complete
+    for chunk in sorted(by_chunk):
+        chunk_tasks = by_chunk[chunk]
+        pending = [task for task in chunk_tasks if not checkpoint.is_done(task["task_id"])]
+        rets_by_task = run_task_group(pending, d) if pending else {}
+        for task in chunk_tasks:
+            key = task["task_id"].rsplit("_", 1)[0]
+            if task["task_id"] in rets_by_task:
+                rets = rets_by_task[task["task_id"]]
+                checkpoint.commit(task, rets)
+            elif key in writers and writers[key] is None:
+                continue
+            else:
+                rets = checkpoint.read(task["task_id"])
+            if key not in writers:
+                writers[key] = start_group_writer(groups[key], rets, date_str)
+            if writers[key] is not None:
+                writers[key].put(range_index.attach_window_metrics(rets, task["years"]))
 
-    for m in model_generator_insurance():
-        rets = model_tester(m, d, years=years)
+    for writer in writers.values():
+        if writer is not None:
+            writer.finish()
+    close_and_record([writers[key] for key in groups], list(groups.values()))
 
-        fn = f"{path}returns_{years}_{rets[0][-1]}_{date_str}.csv"
-        logging.info(f"Writing results to {fn}")
 
-        with open(fn, "w") as outfile:
-            writer = csv.writer(outfile)
-            writer.writerow(["date",
-                             "frac_return",
-                             "yearly_return_rate",
-                             "time_span",
-                             "model_name"])
-            for r in rets:
-                writer.writerow(r)
+def progressive_test_manager(years, date_str, tolerance):
+    """
+    Exploratory sweep: tests each model coarse-to-fine over the start dates until its estimates
+    are within tolerance, writing only the windows evaluated. The sampled results go to
+    progressive_{years}_{model}_{date_str}.csv, so they are never taken for a full sweep, and
+    the manifest records the fraction of start dates each file covers.
+    """
+    logging.info(f"Progressive testing of models for {years} years, tolerance={tolerance}")
+    d, h = get_combined_sp500_interest_data()
+    range_index = get_price_range_index(d)
+    manifest = StageManifest()
+    for spec in model_specs_insurance():
+        rets, estimates, fraction = progressive_model_tester(build_model(spec, d), d, years, tolerance,
+                                                             range_index=range_index)
+        fn = f"{path}progressive_{years}_{rets[0][-1]}_{date_str}.csv"
+        logging.info(f"Writing {fraction:.1%} of the start dates to {fn}")
+        with BackgroundResultWriter(fn, returns_header(window_metrics=True), atomic=True) as writer:
+            writer.put(rets)
+        params = {"model": spec, "years": years, "tolerance": tolerance, "sample_fraction": fraction,
+                  "dataset_hash": get_dataset_hash(d)}
+        manifest.record(f"results:{fn}", [sp500_input_path, interest_input_path], params, [fn])
+
+
+def search_manager(date_str, objective, winners):
+    """
+    Successive-halving parameter search, writing full-fidelity results for the winners and
+    recording each result file in the manifest with the search that selected it.
+    """
+    d, h = get_combined_sp500_interest_data()
+    range_index = get_price_range_index(d)
+    manifest = StageManifest()
+    with mp.Pool() as p:
+        result, history = successive_halving(model_specs_search(), d, objective, winners=winners,
+                                             starmap=p.starmap)
+    for spec, score, rets_by_years in result:
+        for years, rets in rets_by_years.items():
+            if not rets:
+                continue
+            fn = f"{path}returns_{years}_{rets[0][-1]}_{date_str}.csv"
+            logging.info(f"Writing results to {fn}")
+            with BackgroundResultWriter(fn, returns_header(window_metrics=True), atomic=True) as writer:
+                writer.put(range_index.attach_window_metrics(rets, years))
+            params = {"model": spec, "years": years, "stride_days": STRIDE_DAYS, "search_objective": objective,
+                      "search_score": float(score), "winners": winners, "dataset_hash": get_dataset_hash(d)}
+            manifest.record(f"results:{fn}", [sp500_input_path, interest_input_path], params, [fn])
+
+
+def distributed_test_manager(date_str, queue_dir, local_workers=0, lease_timeout=LEASE_TIMEOUT):
+    """
+    Publishes the incomplete units of the sweep to the work queue, commits results as they come
+    back and writes each (horizon, model) result file once all of its units are committed.
+    Workers on other hosts join with --mode worker on the same queue directory.
+    """
+    checkpoint = SweepCheckpoint(f"{checkpoint_path}{date_str}")
+    tasks = checkpoint.load()
+    d, h = get_combined_sp500_interest_data()
+    range_index = get_price_range_index(d)
+    groups = {g[0]["task_id"].rsplit("_", 1)[0]: g for g in group_tasks_by_model(tasks)}
+
+    writers, written_groups = [], []
+    coordinator = SweepCoordinator(queue_dir, lease_timeout=lease_timeout)
+    coordinator.submit(checkpoint.pending())
+    workers = start_local_workers(queue_dir, local_workers, get_combined_sp500_interest_data)
+
+    def write_if_complete(group_tasks):
+        if all(checkpoint.is_done(task["task_id"]) for task in group_tasks):
+            writers.append(write_group_results(checkpoint, group_tasks, date_str, range_index))
+            written_groups.append(group_tasks)
+
+    for group_tasks in groups.values():
+        write_if_complete(group_tasks)
+    for task, rets in coordinator.iter_results():
+        checkpoint.commit(task, rets)
+        write_if_complete(groups[task["task_id"].rsplit("_", 1)[0]])
+
+    coordinator.shutdown()
+    for worker in workers:
+        worker.join()
+    close_and_record(writers, written_groups)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Back-test models over all start dates and horizons.")
+    parser.add_argument("--mode", choices=["pool", "coordinator", "worker"],
+                        help="pool (default): local process pool; coordinator/worker: distributed work queue")
+    parser.add_argument("--queue-dir", default=f"{path}queue",
+                        help="work queue directory shared by the coordinator and workers")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="worker processes the coordinator starts on this host")
+    parser.add_argument("--resume", metavar="DATE_STR",
+                        help="resume the interrupted sweep tagged DATE_STR, redoing only incomplete units")
+    parser.add_argument("--lease-timeout", type=float, default=LEASE_TIMEOUT,
+                        help="seconds without a worker heartbeat before a task is re-dispatched")
+    parser.add_argument("--tolerance", type=float,
+                        help="exploratory sweep: sample start dates coarse-to-fine and stop once the confidence "
+                             "intervals of the mean returns and losing fraction are within this fraction of "
+                             "the estimates (e.g. 0.05), writing progressive_*.csv files")
+    parser.add_argument("--search", choices=list(OBJECTIVES), metavar="OBJECTIVE",
+                        help="successive-halving search over Kelly and insurance parameters for the objective "
+                             f"({', '.join(OBJECTIVES)}), writing full results for the winners")
+    parser.add_argument("--winners", type=int, default=3,
+                        help="number of search winners tested at full fidelity")
+    args = parser.parse_args()
+    if args.tolerance is not None and (args.mode is not None or args.resume is not None):
+        parser.error("--tolerance runs its own local sweep and cannot be combined with --mode or --resume")
+    args.mode = args.mode or "pool"
+    return args
 
 
 if __name__ == '__main__':
-    date_str = datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
-    p = mp.Pool()
-    args = zip(range(1, 16), repeat(date_str))
-    p.starmap(model_test_manager, args)
+    args = parse_args()
+    d, h = get_combined_sp500_interest_data()
+    if args.mode == "worker":
+        SweepWorker(args.queue_dir, d).run()
+    elif args.search is not None:
+        search_manager(datetime.datetime.now().strftime("%Y-%m-%d_%H%M"), args.search, args.winners)
+    elif args.tolerance is not None:
+        date_str = datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
+        p = mp.Pool()
+        p.starmap(progressive_test_manager, zip(range(1, 16), repeat(date_str), repeat(args.tolerance)))
+    else:
+        date_str = args.resume or datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
+        specs = model_specs_insurance()
+        SweepCheckpoint(f"{checkpoint_path}{date_str}").plan(make_tasks(specs, range(1, 16), d),
+                                                             resume=args.resume is not None)
+        if args.mode == "coordinator":
+            distributed_test_manager(date_str, args.queue_dir, args.local_workers, args.lease_timeout)
+        else:
+            p = mp.Pool()
+            p.starmap(model_test_manager, zip(range(len(specs)), repeat(date_str)))
     logger.info("################ All model testing completed ################")
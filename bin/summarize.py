@@ -1,7 +1,49 @@
+import argparse
+import functools
+import glob
+import os
+import sys
+
+from returns.cube import StartRegimes, StatsCube, get_cube_filename
+from returns.data import *
+from returns.pipeline import summary_stage_params
+from returns.stages import StageManifest
+from returns.summary_index import update_summary_index
+from returns.tensor import TENSOR_COLUMNS, build_results_tensor, get_results_tensor_outputs, select_latest_runs
+
+data_files = [sp500_input_path, interest_input_path]
+years = list(range(1, 16))
+
+
+@functools.lru_cache(maxsize=None)
+def get_start_regimes():
+    # only parsed when a cube is out of date
+    d, h = get_combined_sp500_interest_data()
+    return StartRegimes(d, get_price_range_index(d))
+
+
+def summarize_run(suffix, run_years, bootstrap):
+    """
+    Writes the summary, total returns and statistics cube files of a model run over the horizons
+    it has result files for; the cube is filled from the chunks of the summary's aggregation
+    pass, so every result file is read once for the column ranges, once to aggregate and once
+    for the medians and quantiles.
+    """
+    cube = StatsCube()
+    create_summary_file_chunked(suffix, years=run_years, bootstrap=bootstrap,
+                                chunk_callback=cube.chunk_adder(get_start_regimes()))
+    cube.save(get_cube_filename(suffix))
+
+
 if __name__ == "__main__":
-    import glob
-    import sys
-    from returns.data import *
+    parser = argparse.ArgumentParser(description="Summarize the model run result files that are out of date.")
+    # the bootstrap intervals are the only part of summarizing whose memory is not bounded by the
+    # chunk size: the moving-block resamples need one horizon's total and yearly returns in memory
+    # (16 bytes per window, ~0.1 MB for the bundled data)
+    parser.add_argument("--no-bootstrap", dest="bootstrap", action="store_false",
+                        help="leave out the bootstrap confidence intervals, keeping memory bounded by the chunk size "
+                             "on arbitrarily long result files")
+    args = parser.parse_args()
 
     # Configure logging
     logging.basicConfig(level=logging.INFO,
@@ -9,8 +51,27 @@ if __name__ == "__main__":
                         datefmt="%Y-%m-%d %H:%M:%S",
                         stream=sys.stdout,
                         filemode="w")
-    create_combined_data_file()
+    manifest = StageManifest()
+    manifest.run_stage("combined_data", data_files, {}, ["./data/combined_data.csv"], create_combined_data_file)
+
     files = glob.glob("./out_data/returns_*.csv")
-    files_created = create_summary_files(files)
-    logger.info(f"Summary files created: {files_created}")
+    for suffix in sorted(get_run_suffixes(files)):
+        # a run may cover only some horizons (e.g. search winners), its stage depends on those it has
+        run_years = [year for year in years if os.path.exists(f"./out_data/returns_{year}_{suffix}")]
+        if not run_years:
+            logger.info(f"Skipping {suffix}: no result files for horizons {years[0]}-{years[-1]}")
+            continue
+        run_files = [f"./out_data/returns_{year}_{suffix}" for year in run_years]
+        summary_fn = f"./out_data/summary_{suffix}"
+        manifest.run_stage(f"summary:{suffix}", run_files + data_files,
+                           summary_stage_params(run_years, args.bootstrap),
+                           [summary_fn, get_total_returns_filename(summary_fn), get_cube_filename(suffix)],
+                           lambda: summarize_run(suffix, run_years, args.bootstrap))
+
+    # the tensor holds the newest run of every (horizon, model); older runs are not its inputs
+    tensor_files = select_latest_runs(files)
+    manifest.run_stage("results_tensor", tensor_files, {"runs": "newest per horizon and model",
+                                                        "columns": TENSOR_COLUMNS},
+                       get_results_tensor_outputs(), lambda: build_results_tensor(tensor_files))
+    update_summary_index(glob.glob("./out_data/summary_*.csv"))
     logger.info("Done")
@@ -0,0 +1,23 @@
+import argparse
+import logging
+import sys
+
+from returns.summary_service import *
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve summary queries over local HTTP/JSON.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--pattern", default=SUMMARY_PATTERN, help="glob of the summary files to serve")
+    parser.add_argument("--capacity", type=int, default=CACHE_CAPACITY,
+                        help="total returns files kept in memory")
+    args = parser.parse_args()
+
+    # Configure logging
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S",
+                        stream=sys.stdout)
+    server = SummaryServer(SummaryStore(args.pattern, capacity=args.capacity), args.host, args.port)
+    logger.info(f"Serving summaries on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,103 @@
+import datetime
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365
+MID_YEAR_OFFSET_DAYS = 182  # yearly rates are anchored at mid-year when interpolating
+
+
+class InterestAccrualCurve:
+    """
+    Cumulative log interest accrual over calendar days.
+
+    The curve holds one entry per calendar day from January 1st of the first year in the
+    interest data to January 1st of the year after the last one, so growth of cash between
+    any two dates is a single subtraction and an exp.
+    """
+
+    def __init__(self, interest_data, column=0, interpolate=False):
+        """
+        Parameters:
+        interest_data (dict): Yearly interest data as returned by get_interest_data (year -> list of rates).
+        column (int): Index of the rate to use within each year's list of rates.
+        interpolate (bool): If True, rates are interpolated linearly between mid-year values instead
+            of stepping at year boundaries.
+        """
+        years = sorted(interest_data)
+        self.origin = datetime.datetime(years[0], 1, 1)
+        self.end = datetime.datetime(years[-1] + 1, 1, 1)
+        self.interpolate = interpolate
+        n_days = (self.end - self.origin).days
+
+        day = np.arange(n_days)
+        day_year = (np.datetime64(self.origin.date(), "D") + day).astype("datetime64[Y]").astype(int) + 1970
+        if interpolate:
+            anchor_days = np.array([(datetime.datetime(y, 1, 1) - self.origin).days + MID_YEAR_OFFSET_DAYS
+                                    for y in years])
+            anchor_rates = np.array([interest_data[y][column] for y in years])
+            daily_rates = np.interp(day, anchor_days, anchor_rates)
+        else:
+            # years missing from the data carry the previous year's rate
+            yearly_rates = []
+            for y in range(years[0], years[-1] + 1):
+                if y in interest_data:
+                    rate = interest_data[y][column]
+                yearly_rates.append(rate)
+            daily_rates = np.array(yearly_rates)[day_year - years[0]]
+
+        # cum_log[i] is the log accrual from origin to the start of day i
+        self.cum_log = np.zeros(n_days + 1)
+        np.cumsum(np.log1p(daily_rates) / DAYS_PER_YEAR, out=self.cum_log[1:])
+        logger.info(f"Interest accrual curve built for {self.origin:%Y-%m-%d} to {self.end:%Y-%m-%d}"
+                    f" (interpolate={interpolate})")
+
+    def day_index(self, date):
+        """
+        Returns the index of date into the curve.
+        """
+        index = (date - self.origin).days
+        if not 0 <= index < len(self.cum_log):
+            raise ValueError(f"Date {date} is outside of the accrual curve range {self.origin} to {self.end}")
+        return index
+
+    def day_indices(self, dates):
+        """
+        Vectorized day_index for an array-like of dates.
+        """
+        index = (np.asarray(dates, dtype="datetime64[D]") - np.datetime64(self.origin.date(), "D")).astype(int)
+        if np.any(index < 0) or np.any(index >= len(self.cum_log)):
+            raise ValueError(f"Dates are outside of the accrual curve range {self.origin} to {self.end}")
+        return index
+
+    def log_growth(self, start_date, end_date):
+        return self.cum_log[self.day_index(end_date)] - self.cum_log[self.day_index(start_date)]
+
+    def growth(self, start_date, end_date):
+        """
+        Growth factor of cash held from start_date to end_date.
+
+        Parameters:
+        start_date (datetime): Date the cash was deposited.
+        end_date (datetime): Date the cash is valued.
+
+        Returns:
+        float: The compounded growth factor (1.0 when the dates are equal).
+        """
+        return math.exp(self.log_growth(start_date, end_date))
+
+    def growth_many(self, start_index, end_index):
+        """
+        Growth factors for many (start, end) pairs of day indices at once.
+
+        Parameters:
+        start_index (array-like of int): Curve indices of the start dates (see day_indices).
+        end_index (array-like of int): Curve indices of the end dates.
+
+        Returns:
+        ndarray: The compounded growth factors.
+        """
+        return np.exp(self.cum_log[np.asarray(end_index)] - self.cum_log[np.asarray(start_index)])
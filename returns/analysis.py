@@ -1,6 +1,44 @@
 import numpy as np
-import pandas as pd
-from matplotlib import pyplot as plt
+
+# pandas and matplotlib are imported where they are used, so simulation workers that only
+# aggregate returns never load the plotting stack
+
+RETURNS_STATS_COLUMNS = ["sample_size",
+                         "time_span",
+                         "model_name",
+                         "mean_total_returns",
+                         "mean_yearly_compound_returns",
+                         "median_total_returns",
+                         "median_yearly_returns",
+                         "sdev_total_returns",
+                         "sdev_yearly_returns",
+                         "fraction_losing_starts",
+                         "mode_total_returns",
+                         "mode_yearly_returns"]
+
+FINE_BINS = 4096  # histogram bins used to locate medians in chunked summaries
+
+BOOTSTRAP_SAMPLES = 200  # resamples per horizon
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 0  # fixed, so summaries are reproducible
+MIN_BOOTSTRAP_BLOCKS = 10  # blocks are shortened to fit at least this many; with fewer the intervals are NaN
+# statistics with bootstrap confidence intervals, each adds <stat>_ci_low and <stat>_ci_high columns
+BOOTSTRAP_STATS = ["mean_total_returns",
+                   "mean_yearly_compound_returns",
+                   "median_total_returns",
+                   "median_yearly_returns",
+                   "sdev_total_returns",
+                   "sdev_yearly_returns",
+                   "fraction_losing_starts"]
+BOOTSTRAP_CI_COLUMNS = [f"{stat}_ci_{side}" for stat in BOOTSTRAP_STATS for side in ["low", "high"]]
+
+DISTRIBUTION_BINS = 45  # histogram bins stored with the total returns distributions (as plotted)
+DISTRIBUTION_QUANTILES = np.linspace(0., 1., 101)  # quantile levels stored with the distributions
+
+WINDOW_METRICS_STATS_COLUMNS = ["mean_market_max_drawdown",
+                                "median_market_max_drawdown",
+                                "worst_market_max_drawdown",
+                                "worst_market_return"]
 
 
 def calculate_mode(hist_data):
@@ -65,6 +103,259 @@ def aggregate_returns(returns_data):
     ), total_returns.tolist()
 
 
+class MomentsAccumulator:
+    """
+    Mergeable count, mean, variance, extremes and losing count of a numeric column, updated
+    chunk by chunk.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.  # sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+        self.negative = 0
+
+    def _merge_moments(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        mean = values.mean()
+        self._merge_moments(len(values), mean, np.sum((values - mean) ** 2))
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.negative += np.count_nonzero(values < 0.0)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        self._merge_moments(other.count, other.mean, other.m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.negative += other.negative
+
+    def std(self):
+        return np.sqrt(self.m2 / self.count)
+
+
+class ColumnAggregator(MomentsAccumulator):
+    """
+    Mergeable running statistics of one numeric result column, updated chunk by chunk.
+
+    Count, moments, extremes and the losing count need no range. Histograms need the column
+    range up front (from a previous pass), so summaries over huge result sets are built in
+    passes over chunks instead of from one in-memory array.
+    """
+
+    def __init__(self, value_range=None, bins=45, fine_bins=FINE_BINS):
+        super().__init__()
+        self.value_range = value_range
+        self.bins = bins
+        self.fine_bins = fine_bins
+        if value_range is not None:
+            self.hist = np.zeros(bins, dtype=np.int64)
+            self.fine_hist = np.zeros(fine_bins, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        super().update(values)
+        if self.value_range is not None and len(values):
+            self.hist += np.histogram(values, bins=self.bins, range=self.value_range)[0]
+            self.fine_hist += np.histogram(values, bins=self.fine_bins, range=self.value_range)[0]
+
+    def merge(self, other):
+        """
+        Merges the statistics of another aggregator over the same column range.
+        """
+        if other.count == 0:
+            return
+        super().merge(other)
+        if self.value_range is not None:
+            self.hist += other.hist
+            self.fine_hist += other.fine_hist
+
+    def mode(self):
+        return calculate_mode((self.hist, np.histogram_bin_edges([], bins=self.bins, range=self.value_range)))
+
+    def rank_brackets(self, ranks):
+        """
+        Value intervals holding the given ranks (0 is the smallest value), found from the fine
+        histogram (widened by a bin on each side against rounding at the bin edges).
+
+        Returns:
+        list of tuple: (rank, low, high) for every rank.
+        """
+        edges = np.histogram_bin_edges([], bins=self.fine_bins, range=self.value_range)
+        cumulative = np.cumsum(self.fine_hist)
+        brackets = []
+        for rank in ranks:
+            b = int(np.searchsorted(cumulative, rank + 1))
+            brackets.append((int(rank), edges[max(b - 1, 0)], edges[min(b + 2, self.fine_bins)]))
+        return brackets
+
+    def distribution_histogram(self):
+        """
+        The histogram as stored with the total returns distributions: equal to
+        np.histogram(values, bins=self.bins) when value_range is the column's (min, max).
+
+        Returns:
+        tuple: (counts, bin edges)
+        """
+        return self.hist.copy(), np.histogram_bin_edges([], bins=self.bins, range=self.value_range)
+
+
+def distribution_summary(total_returns, bins=DISTRIBUTION_BINS, levels=DISTRIBUTION_QUANTILES):
+    """
+    Histogram and quantiles of one horizon's total returns, computed once at summary time
+    so distributions can be plotted and compared without the raw returns.
+
+    Returns:
+    tuple: (histogram counts, bin edges, quantiles at levels)
+    """
+    total_returns = np.asarray(total_returns, dtype=float)
+    if len(total_returns) == 0:
+        return np.zeros(bins, dtype=np.int64), np.linspace(0., 1., bins + 1), np.full(len(levels), np.nan)
+    counts, edges = np.histogram(total_returns, bins=bins)
+    return counts, edges, np.quantile(total_returns, levels)
+
+
+def quantile_ranks(n, levels=DISTRIBUTION_QUANTILES):
+    """
+    Order statistics behind np.quantile(values, levels) (linear method) of n values.
+
+    Returns:
+    tuple: (lower ranks, upper ranks, interpolation weights), the quantiles being
+           lower + weight * (upper - lower) of the sorted values at those ranks.
+    """
+    virtual = np.asarray(levels, dtype=float) * (n - 1)
+    lower = np.floor(virtual).astype(np.int64)
+    return lower, np.minimum(lower + 1, n - 1), virtual - lower
+
+
+def bootstrap_block_length(n, first_date, last_date, time_span):
+    """
+    Block length for the moving-block bootstrap: the number of consecutive windows whose
+    start dates lie within one horizon of each other (they share days of returns), shortened
+    so the n windows hold at least MIN_BOOTSTRAP_BLOCKS blocks. Long horizons over the history
+    (e.g. 10 years of 1956-2023) get blocks shorter than their overlap, so their intervals
+    understate the uncertainty somewhat rather than being left empty.
+    """
+    if n < 2:
+        return 1
+    stride_days = max((last_date - first_date).days / (n - 1), 1e-9)
+    overlap = int(max(np.ceil(time_span * 365 / stride_days), 1))
+    return min(overlap, max(n // MIN_BOOTSTRAP_BLOCKS, 1))
+
+
+def moving_block_bootstrap_starts(n, block_length, samples=BOOTSTRAP_SAMPLES, seed=BOOTSTRAP_SEED):
+    """
+    Block start indices of moving-block bootstrap resamples of n ordered windows: every resample
+    concatenates ceil(n / block_length) random blocks of block_length consecutive windows,
+    the last one cut to make n windows.
+
+    Returns:
+    ndarray: (samples, blocks) start indices.
+    """
+    rng = np.random.default_rng(seed)
+    blocks = -(-n // block_length)
+    return rng.integers(0, n - block_length + 1, size=(samples, blocks))
+
+
+def moving_block_bootstrap_indices(n, block_length, samples=BOOTSTRAP_SAMPLES, seed=BOOTSTRAP_SEED):
+    """
+    Index arrays of moving-block bootstrap resamples (see moving_block_bootstrap_starts).
+
+    Returns:
+    ndarray: (samples, n) indices.
+    """
+    starts = moving_block_bootstrap_starts(n, block_length, samples, seed)
+    indices = starts[:, :, None] + np.arange(block_length)
+    return indices.reshape(samples, -1)[:, :n].astype(np.intp)
+
+
+def _resampled_sums(values, starts, block_length, n):
+    # sum of every resample from cumulative sums at the block starts and ends
+    cumulative = np.concatenate([[0.], np.cumsum(values)])
+    lengths = np.full(starts.shape[1], block_length)
+    lengths[-1] = n - (starts.shape[1] - 1) * block_length
+    return (cumulative[starts + lengths] - cumulative[starts]).sum(axis=1)
+
+
+def bootstrap_intervals(total_returns, yearly_returns, block_length, samples=BOOTSTRAP_SAMPLES,
+                        confidence=BOOTSTRAP_CONFIDENCE, seed=BOOTSTRAP_SEED):
+    """
+    Moving-block bootstrap confidence intervals of the summary statistics of one horizon, all
+    computed from the same resamples of the start-date ordering. Means, standard deviations
+    and the losing fraction come from cumulative sums over the block starts; the medians are
+    taken one resample at a time, so no (samples x windows) array is built.
+
+    With fewer than MIN_BOOTSTRAP_BLOCKS blocks in the windows (fewer windows than that, as
+    bootstrap_block_length fits the blocks otherwise) the resamples would repeat the same few
+    blocks, and all intervals are NaN.
+
+    Returns:
+    tuple: (low, high) for every statistic in BOOTSTRAP_STATS, flattened in BOOTSTRAP_CI_COLUMNS order.
+    """
+    total_returns = np.asarray(total_returns, dtype=float)
+    yearly_returns = np.asarray(yearly_returns, dtype=float)
+    n = len(total_returns)
+    if n == 0 or n / block_length < MIN_BOOTSTRAP_BLOCKS:
+        return (np.nan,) * len(BOOTSTRAP_CI_COLUMNS)
+    starts = moving_block_bootstrap_starts(n, block_length, samples, seed)
+
+    def mean_and_std(values):
+        centered = values - values.mean()
+        s1 = _resampled_sums(centered, starts, block_length, n) / n
+        s2 = _resampled_sums(centered ** 2, starts, block_length, n) / n
+        return values.mean() + s1, np.sqrt(np.maximum(s2 - s1 ** 2, 0.))
+
+    total_mean, total_std = mean_and_std(total_returns)
+    yearly_mean, yearly_std = mean_and_std(yearly_returns)
+    losing = _resampled_sums((total_returns < 0.0).astype(float), starts, block_length, n) / n
+    medians = np.empty((2, samples))
+    offsets = np.arange(block_length)
+    for i in range(samples):
+        indices = (starts[i][:, None] + offsets).reshape(-1)[:n]
+        medians[0, i] = np.median(total_returns[indices])
+        medians[1, i] = np.median(yearly_returns[indices])
+    estimates = [total_mean, yearly_mean, medians[0], medians[1], total_std, yearly_std, losing]
+    alpha = (1. - confidence) / 2
+    bounds = np.quantile(np.array(estimates), [alpha, 1. - alpha], axis=1)
+    return tuple(bounds.T.reshape(-1).tolist())
+
+
+def aggregate_window_metrics(returns_data):
+    """
+    returns_data rows carry the window metrics between time_span and model_name:
+                   ["date",
+                    "frac_return",
+                    "yearly_return_rate",
+                    "time_span",
+                    "market_return",
+                    "market_min",
+                    "market_max",
+                    "market_max_drawdown",
+                    "model_name"]
+    """
+    metrics_vectors = np.array([r[4:8] for r in returns_data], dtype=float).T
+    market_returns = metrics_vectors[0]
+    max_drawdowns = metrics_vectors[3]
+    return (
+        np.mean(max_drawdowns),
+        np.median(max_drawdowns),
+        np.max(max_drawdowns),
+        np.min(market_returns)
+    )
+
+
 def show_metrics(return_stats):
     print(f"### AGGREGATE RETURNS ### {return_stats[2]} ###")
     print(f"Sample Size              = {return_stats[0]}")
@@ -80,36 +371,56 @@ def show_metrics(return_stats):
     print(f"Mode of Yearly Returns   = {return_stats[11]:5.2%}")
 
 
-def get_aggregate_returns_by_period(data):
+def get_summary_columns(window_metrics=False, bootstrap=False):
+    """
+    Columns of the summary vectors built with or without window metrics and bootstrap intervals.
+    """
+    return (RETURNS_STATS_COLUMNS +
+            (WINDOW_METRICS_STATS_COLUMNS if window_metrics else []) +
+            (BOOTSTRAP_CI_COLUMNS if bootstrap else []))
+
+
+def get_aggregate_returns_by_period(data, window_metrics=False, bootstrap=True):
+    """
+    Summary vectors of every horizon's rows.
+
+    Parameters:
+    data (dict): Horizon -> total_returns rows sorted by start date.
+    window_metrics (bool): The rows carry window metrics from the price range index; add their statistics.
+    bootstrap (bool): Add the bootstrap confidence intervals.
+
+    Returns:
+    tuple: (summary vectors with the columns of get_summary_columns, horizon -> total returns)
+    """
     returns_stats_by_period = []
     total_returns_by_period = {}
     for k, v in data.items():
         summary_vector, total_returns = aggregate_returns(v)
+        if window_metrics:
+            summary_vector += aggregate_window_metrics(v)
+        if bootstrap:
+            block_length = bootstrap_block_length(len(v), v[0][0], v[-1][0], summary_vector[1])
+            summary_vector += bootstrap_intervals(total_returns, [float(r[2]) for r in v], block_length)
         total_returns_by_period[k] = total_returns
         returns_stats_by_period.append(summary_vector)
     return returns_stats_by_period, total_returns_by_period
 
 
-def get_df_aggregate_returns_by_period(returns_stats_by_period):
-    df = pd.DataFrame(returns_stats_by_period, columns=[
-        "sample_size",
-        "time_span",
-        "model_name",
-        "mean_total_returns",
-        "mean_yearly_compound_returns",
-        "median_total_returns",
-        "median_yearly_returns",
-        "sdev_total_returns",
-        "sdev_yearly_returns",
-        "fraction_losing_starts",
-        "mode_total_returns",
-        "mode_yearly_returns"
-    ])
+def get_df_aggregate_returns_by_period(returns_stats_by_period, window_metrics=False, bootstrap=False):
+    import pandas as pd
+
+    columns = get_summary_columns(window_metrics, bootstrap)
+    for summary_vector in returns_stats_by_period:
+        if len(summary_vector) != len(columns):
+            raise ValueError(f"Summary vector of {len(summary_vector)} values, expected columns {columns}")
+    df = pd.DataFrame(returns_stats_by_period, columns=columns)
     df = df.sort_values(by=["time_span"])
     return df
 
 
 def plot_df(df, columns=None, df2=None):
+    from matplotlib import pyplot as plt
+
     if columns is None:
         columns = df.columns.to_list()[3:]
     fig, axs = plt.subplots(nrows=len(columns), ncols=1)
@@ -123,10 +434,16 @@ def plot_df(df, columns=None, df2=None):
 
 
 def plot_histograms(total_returns_by_period):
+    from matplotlib import pyplot as plt
+
     fig, axs = plt.subplots(nrows=len(total_returns_by_period), ncols=1)
     fig.set_size_inches(8, 4 * len(total_returns_by_period))
     for ax, (k, v) in zip(axs.reshape(-1), total_returns_by_period.items()):
-        _ = ax.hist(v, bins=45)
+        if hasattr(v, "hist_counts"):
+            # pre-binned distribution (returns.data.TotalReturnsDistribution)
+            _ = ax.hist(v.hist_edges[:-1], bins=v.hist_edges, weights=v.hist_counts)
+        else:
+            _ = ax.hist(v, bins=DISTRIBUTION_BINS)
         ax.set_title(f"Sample Returns {k}")
 
 def plot_period_comparison_data(drf):
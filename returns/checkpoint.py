@@ -0,0 +1,88 @@
+import datetime
+import json
+import logging
+import os
+
+import numpy as np
+
+from returns.distributed import decode_rows, encode_rows, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class SweepCheckpoint:
+    """
+    Task manifest and committed result units of one sweep, kept on disk so an interrupted
+    sweep can be resumed.
+
+    The manifest lists every (model, horizon, start-date chunk) unit, as made by
+    returns.distributed.make_tasks. A unit is complete once its part file exists; part files
+    are written to a temporary name and renamed, so a crash never leaves a partial unit behind.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_filename = os.path.join(directory, "manifest.json")
+        self.parts_dir = os.path.join(directory, "parts")
+        self.tasks = []
+
+    def plan(self, tasks, resume=False):
+        """
+        Writes the manifest for a new sweep, or checks it against the existing one when resuming.
+
+        Parameters:
+        tasks (list of dict): The sweep's units.
+        resume (bool): Continue the sweep already planned in the directory.
+
+        Returns:
+        list of dict: The units that are not complete yet.
+        """
+        if resume:
+            with open(self.manifest_filename) as infile:
+                manifest = json.load(infile)
+            if manifest["tasks"] != tasks:
+                raise ValueError(f"Sweep in {self.directory} was planned with different tasks or data")
+            self.tasks = manifest["tasks"]
+        else:
+            if os.path.exists(self.manifest_filename):
+                raise FileExistsError(f"Sweep already planned in {self.directory}, resume it instead")
+            os.makedirs(self.parts_dir, exist_ok=True)
+            write_json_atomic(self.manifest_filename, {"created": datetime.datetime.now().isoformat(),
+                                                       "tasks": tasks})
+            self.tasks = tasks
+        pending = self.pending()
+        logger.info(f"Sweep {self.directory}: {len(self.tasks) - len(pending)} of {len(self.tasks)} units complete")
+        return pending
+
+    def load(self):
+        """
+        Loads the manifest of an already planned sweep.
+        """
+        with open(self.manifest_filename) as infile:
+            self.tasks = json.load(infile)["tasks"]
+        return self.tasks
+
+    def part_filename(self, task_id):
+        return os.path.join(self.parts_dir, f"{task_id}.npz")
+
+    def is_done(self, task_id):
+        return os.path.exists(self.part_filename(task_id))
+
+    def pending(self):
+        return [t for t in self.tasks if not self.is_done(t["task_id"])]
+
+    def commit(self, task, rows):
+        """
+        Atomically records the result rows of a completed unit.
+        """
+        tmp_filename = f"{self.part_filename(task['task_id'])}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as outfile:
+            np.savez(outfile, **encode_rows(rows))
+        os.replace(tmp_filename, self.part_filename(task["task_id"]))
+
+    def read(self, task_id):
+        """
+        Returns the result rows of a completed unit.
+        """
+        with np.load(self.part_filename(task_id)) as arrays:
+            return decode_rows(arrays)
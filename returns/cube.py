@@ -0,0 +1,306 @@
+import glob
+import logging
+
+import numpy as np
+
+from returns.analysis import MomentsAccumulator
+from returns.data import combined_interest_index, get_run_suffixes, iter_model_run_chunks, CHUNK_ROWS
+from returns.summary_index import Range
+
+logger = logging.getLogger(__name__)
+
+CUBE_DIMENSIONS = ["model_name", "horizon", "decade", "rate_bucket", "prior_return_bucket"]
+# buckets are keyed by their lower edge; values below the first edge fall in the -inf bucket
+RATE_BUCKET_EDGES = [round(0.01 * k, 2) for k in range(1, 16)]  # starting interest rate, 1% buckets
+PRIOR_RETURN_BUCKET_EDGES = [-0.3, -0.2, -0.1, 0., 0.1, 0.2, 0.3]  # market return over the year before the start
+CUBE_COLUMNS = ["frac_return", "yearly_return_rate"]
+# histogram bins per cell, spread over the column range of the (model, horizon) results the cell
+# came from (the range pass of the summary), so no horizon's returns are clipped
+CUBE_HIST_BINS = 200
+_STATS = ["count", "mean", "m2", "min", "max", "negative"]
+
+
+def _bucket(values, edges):
+    edges = np.asarray(edges, dtype=float)
+    lower = np.concatenate([[-np.inf], edges])
+    result = lower[np.searchsorted(edges, values, side="right")]
+    return np.where(np.isnan(values), np.nan, result)
+
+
+class CellColumn(MomentsAccumulator):
+    """
+    Statistics of one column in a cube cell: moments, extremes and the losing count, plus a
+    histogram on the edges of the results it came from. Cells merge their histograms only while
+    the edges agree (cells of one model and horizon); merging other cells keeps the moments and
+    drops the histogram (hist and edges None).
+    """
+
+    def __init__(self, edges=None):
+        super().__init__()
+        self.edges = edges
+        self.hist = None if edges is None else np.zeros(len(edges) - 1, dtype=np.int64)
+
+    def update(self, values):
+        super().update(values)
+        if self.hist is not None:
+            self.hist += np.histogram(values, bins=self.edges)[0]
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0 and self.edges is None:
+            self.edges = other.edges
+            self.hist = None if other.hist is None else other.hist.copy()
+        elif self.hist is not None and other.hist is not None and np.array_equal(self.edges, other.edges):
+            self.hist += other.hist
+        else:
+            self.edges, self.hist = None, None
+        super().merge(other)
+
+
+def _new_cell(value_ranges=None):
+    if value_ranges is None:
+        return {c: CellColumn() for c in CUBE_COLUMNS}
+    return {c: CellColumn(np.histogram_bin_edges([], bins=CUBE_HIST_BINS, range=value_ranges[c]))
+            for c in CUBE_COLUMNS}
+
+
+def _key(values):
+    # NaN marks a missing prior-year return, kept as None so keys compare equal
+    return tuple(None if isinstance(v, float) and np.isnan(v) else v for v in values)
+
+
+def cell_stats(cell):
+    """
+    Plain statistics of a (merged) cell.
+
+    Returns:
+    dict: count, and mean, std, min, max and fraction negative of each column.
+    """
+    stats = {"count": cell["frac_return"].count}
+    for c, agg in cell.items():
+        stats.update({f"mean_{c}": agg.mean,
+                      f"std_{c}": agg.std() if agg.count else np.nan,
+                      f"min_{c}": agg.min,
+                      f"max_{c}": agg.max})
+    stats["fraction_losing_starts"] = cell["frac_return"].negative / stats["count"] if stats["count"] else np.nan
+    return stats
+
+
+class StartRegimes:
+    """
+    Start-date regime of windows: decade, starting interest rate bucket and prior-year market
+    return bucket (from a PriceRangeIndex over the same data).
+    """
+
+    def __init__(self, data, range_index):
+        self.range_index = range_index
+        self.rates = np.array([d[combined_interest_index] for d in data], dtype=float)
+
+    def of(self, start_dates):
+        """
+        Parameters:
+        start_dates (array of datetime64[s]): Window start dates.
+
+        Returns:
+        tuple of arrays: (decade, rate bucket, prior-year return bucket)
+        """
+        n = len(self.rates)
+        i = np.minimum(self.range_index.indices_of(start_dates), n - 1)
+        decade = start_dates.astype("datetime64[Y]").astype(int) + 1970
+        decade = decade // 10 * 10
+        prior_start = start_dates - np.timedelta64(365, "D")
+        h = np.minimum(self.range_index.indices_of(prior_start), n - 1)
+        prior = self.range_index.window_return(h, i)
+        prior = np.where(prior_start < self.range_index.dates[0], np.nan, prior)
+        return decade, _bucket(self.rates[i], RATE_BUCKET_EDGES), _bucket(prior, PRIOR_RETURN_BUCKET_EDGES)
+
+
+class StatsCube:
+    """
+    Window results aggregated by (model_name, horizon, decade, rate_bucket, prior_return_bucket).
+
+    Every cell holds mergeable statistics (CellColumn: count, moments, extremes, histogram) of
+    the total and yearly returns, so slices and roll-ups are answered by merging cells instead
+    of rescanning the window results.
+    """
+
+    def __init__(self):
+        self.cells = {}  # key tuple in CUBE_DIMENSIONS order -> {column: CellColumn}
+
+    def add(self, model_name, horizon, start_dates, values, regimes, value_ranges=None):
+        """
+        Adds window results.
+
+        Parameters:
+        model_name (str): Model name.
+        horizon (int): Window length in years.
+        start_dates (array of datetime64[s]): Window start dates.
+        values (dict): Column of CUBE_COLUMNS -> array of values per window.
+        regimes (StartRegimes): Regimes of the start dates.
+        value_ranges (dict): Column -> (min, max) over all results of the model and horizon, for
+            the histograms of new cells (without it cells keep moments only).
+        """
+        decade, rate, prior = regimes.of(start_dates)
+        unique, inverse = np.unique(np.column_stack([decade, rate, prior]), axis=0, return_inverse=True)
+        for k, u in enumerate(unique):
+            rows = inverse.reshape(-1) == k
+            key = _key((model_name, int(horizon), int(u[0]), float(u[1]), float(u[2])))
+            cell = self.cells.setdefault(key, _new_cell(value_ranges))
+            for c in CUBE_COLUMNS:
+                cell[c].update(values[c][rows])
+
+    def chunk_adder(self, regimes):
+        """
+        Callback adding the chunks of a summary pass, see returns.data.summarize_model_run_file.
+        """
+        def add_chunk(model_name, horizon, chunk, value_ranges):
+            if len(chunk["date"]):
+                self.add(model_name, horizon, chunk["date"].astype("datetime64[s]"), chunk, regimes, value_ranges)
+        return add_chunk
+
+    def merge(self, other):
+        for key, cell in other.cells.items():
+            mine = self.cells.setdefault(key, _new_cell())
+            for c in CUBE_COLUMNS:
+                mine[c].merge(cell[c])
+        return self
+
+    def _matches(self, key, conditions):
+        for name, condition in conditions.items():
+            value = key[CUBE_DIMENSIONS.index(name)]
+            if isinstance(condition, Range):
+                if value is None or not condition.lo <= value <= condition.hi:
+                    return False
+            elif callable(condition):
+                if value is None or not condition(value):
+                    return False
+            elif isinstance(condition, (list, set, tuple)):
+                if value not in condition:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def rollup(self, dimensions=(), **conditions):
+        """
+        Merges the cells matching the conditions, grouped by the given dimensions.
+
+        Parameters:
+        dimensions (list of str): Dimensions kept in the result keys (others are rolled up).
+        conditions: Dimension -> value, list, set or tuple of values, Range(lo, hi) (inclusive)
+            or predicate, the filters of returns.summary_index.SummaryIndex.query plus predicates, e.g.
+            rollup(["horizon"], model_name="Buy_Hold", rate_bucket=lambda r: r >= 0.06, decade=Range(1970, 1989))
+
+        Returns:
+        dict: Tuple of the kept dimension values -> merged cell.
+        """
+        unknown = set(dimensions) | set(conditions)
+        unknown -= set(CUBE_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions {sorted(unknown)}, expected {CUBE_DIMENSIONS}")
+        positions = [CUBE_DIMENSIONS.index(d) for d in dimensions]
+        result = {}
+        for key, cell in self.cells.items():
+            if self._matches(key, conditions):
+                merged = result.setdefault(tuple(key[p] for p in positions), _new_cell())
+                for c in CUBE_COLUMNS:
+                    merged[c].merge(cell[c])
+        return result
+
+    def select(self, **conditions):
+        """
+        Merges all cells matching the conditions (see rollup) into one cell.
+        """
+        return self.rollup((), **conditions).get((), _new_cell())
+
+    def save(self, filename):
+        keys = list(self.cells)
+        arrays = {"model_name": np.array([k[0] for k in keys]),
+                  "horizon": np.array([k[1] for k in keys], dtype=np.int64),
+                  "decade": np.array([k[2] for k in keys], dtype=np.int64),
+                  "rate_bucket": np.array([np.nan if k[3] is None else k[3] for k in keys], dtype=float),
+                  "prior_return_bucket": np.array([np.nan if k[4] is None else k[4] for k in keys], dtype=float)}
+        for c in CUBE_COLUMNS:
+            cells = [self.cells[k][c] for k in keys]
+            for s in _STATS:
+                arrays[f"{c}_{s}"] = np.array([getattr(agg, s) for agg in cells])
+            # cells without a histogram are stored with NaN edges
+            arrays[f"{c}_hist"] = np.array([np.zeros(CUBE_HIST_BINS, dtype=np.int64) if agg.hist is None else agg.hist
+                                            for agg in cells]).reshape(len(keys), CUBE_HIST_BINS)
+            arrays[f"{c}_edges"] = np.array([np.full(CUBE_HIST_BINS + 1, np.nan) if agg.edges is None else agg.edges
+                                             for agg in cells]).reshape(len(keys), CUBE_HIST_BINS + 1)
+        with open(filename, "wb") as outfile:
+            np.savez(outfile, **arrays)
+        logger.info(f"Statistics cube with {len(keys)} cells written to {filename}")
+
+    @classmethod
+    def load(cls, filenames):
+        """
+        Loads and merges cube files.
+        """
+        cube = cls()
+        for fn in filenames:
+            with np.load(fn) as arrays:
+                for n in range(len(arrays["model_name"])):
+                    key = _key((str(arrays["model_name"][n]), int(arrays["horizon"][n]), int(arrays["decade"][n]),
+                                float(arrays["rate_bucket"][n]), float(arrays["prior_return_bucket"][n])))
+                    cell = _new_cell()
+                    for c in CUBE_COLUMNS:
+                        for s in _STATS:
+                            setattr(cell[c], s, arrays[f"{c}_{s}"][n].item())
+                        if not np.isnan(arrays[f"{c}_edges"][n]).any():
+                            cell[c].edges = arrays[f"{c}_edges"][n].copy()
+                            cell[c].hist = arrays[f"{c}_hist"][n].copy()
+                    if key in cube.cells:
+                        for c in CUBE_COLUMNS:
+                            cube.cells[key][c].merge(cell[c])
+                    else:
+                        cube.cells[key] = cell
+        return cube
+
+
+def get_cube_filename(suffix, path="./out_data/"):
+    return f"{path}cube_{suffix.replace('.csv', '.npz')}"
+
+
+def create_cube_file(suffix, regimes, years=range(1, 16), chunk_size=CHUNK_ROWS):
+    """
+    Builds the statistics cube of one model run (all horizons) from its result files in chunks,
+    one pass for the column ranges and one to fill the cells. bin/summarize.py builds the cube
+    within the summary passes instead (see returns.data.create_summary_file_chunked).
+
+    Returns:
+    str: The cube file name.
+    """
+    cube = StatsCube()
+    columns = ["date", "model_name"] + CUBE_COLUMNS
+    for year in years:
+        run_filename = f"./out_data/returns_{year}_{suffix}"
+        scans = {c: MomentsAccumulator() for c in CUBE_COLUMNS}
+        for chunk in iter_model_run_chunks(run_filename, CUBE_COLUMNS, chunk_size):
+            for c in CUBE_COLUMNS:
+                scans[c].update(chunk[c])
+        value_ranges = {c: (scans[c].min, scans[c].max) for c in CUBE_COLUMNS}
+        add_chunk = cube.chunk_adder(regimes)
+        for chunk in iter_model_run_chunks(run_filename, columns, chunk_size):
+            if len(chunk["date"]):
+                add_chunk(chunk["model_name"][0], year, chunk, value_ranges)
+    filename = get_cube_filename(suffix)
+    cube.save(filename)
+    return filename
+
+
+def create_cube_files(files, data, range_index, years=range(1, 16)):
+    """
+    Builds the statistics cube of every model run in the result files (see create_summary_files).
+    """
+    regimes = StartRegimes(data, range_index)
+    return [create_cube_file(suffix, regimes, years) for suffix in get_run_suffixes(files)]
+
+
+def load_cube(pattern="./out_data/cube_*.npz"):
+    """
+    Loads and merges all cube files, e.g. load_cube().select(model_name="Buy_Hold", horizon=10, decade=1970).
+    """
+    return StatsCube.load(sorted(glob.glob(pattern)))
@@ -0,0 +1,211 @@
+import datetime
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from returns.analysis import RETURNS_STATS_COLUMNS, aggregate_returns
+from returns.engine import CHUNKS_PER_WORKER, iter_start_dates, run_window_horizons, split_start_dates
+from returns.models import MODEL_CLASSES, STRIDE_DAYS, build_model, check_spec_accrual
+
+logger = logging.getLogger(__name__)
+
+SOCKET_PATH = "./out_data/simulation.sock"
+
+# Requests and responses are JSON lines over a Unix socket. A sweep request
+#
+#   {"specs": [<model spec>, ...], "horizons": [1, 5, 10], "stride_days": 3, "rows": false}
+#
+# streams one {"type": "result", ...} line per model spec as soon as all of its windows are done
+# (summary statistics per horizon, plus the rows if asked for), then {"type": "done", ...}.
+# {"command": "ping"} and {"command": "shutdown"} are answered with one line. A request that is
+# malformed or fails is answered with {"type": "error", "message": ...}.
+
+_worker_data = None  # (data, dates) of a daemon worker process
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = (data, [d[0] for d in data])
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def _run_chunk(spec, start_dates, horizons):
+    """
+    Runs one model spec over a chunk of start dates for all horizons that fit the data.
+
+    Returns:
+    dict: horizon -> total_returns rows
+    """
+    data, dates = _worker_data
+    model = build_model(spec, data)
+    result = {years: [] for years in horizons}
+    for start_date in start_dates:
+        fit = [years for years in horizons if start_date + datetime.timedelta(days=365 * years) < data[-1][0]]
+        for years, row in run_window_horizons(model, data, start_date, fit, dates).items():
+            result[years].append(row)
+    return result
+
+
+def validate_sweep_request(request):
+    """
+    Checks a sweep request before any work is queued.
+
+    Raises:
+    ValueError: If the specs are missing or unknown (model or accrual, see check_spec_accrual), or
+        the horizons or stride are not positive integers.
+    """
+    specs = request.get("specs")
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("specs must be a non-empty list of model specs")
+    for spec in specs:
+        if not isinstance(spec, dict) or spec.get("model") not in MODEL_CLASSES:
+            raise ValueError(f"unknown model spec {spec!r}, models are {sorted(MODEL_CLASSES)}")
+        if not isinstance(spec.get("kwargs", {}), dict):
+            raise ValueError(f"kwargs of model spec {spec!r} must be an object")
+        check_spec_accrual(spec)
+    horizons = request.get("horizons", list(range(1, 16)))
+    if (not isinstance(horizons, list) or not horizons or
+            not all(isinstance(h, int) and not isinstance(h, bool) and h > 0 for h in horizons)):
+        raise ValueError(f"horizons must be a non-empty list of positive integers, got {horizons!r}")
+    stride_days = request.get("stride_days", STRIDE_DAYS)
+    if not isinstance(stride_days, int) or isinstance(stride_days, bool) or stride_days <= 0:
+        raise ValueError(f"stride_days must be a positive integer, got {stride_days!r}")
+
+
+def _json_row(row):
+    return [row[0].isoformat()] + list(row[1:])
+
+
+class SimulationDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-lived local simulation service. The market data is parsed once and every worker process
+    of the warm pool holds its own copy, so a sweep request only pays for the simulation.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, data, socket_path=SOCKET_PATH, workers=None):
+        self.data = data
+        self.workers = workers or os.cpu_count() or 1
+        self.socket_path = socket_path
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(data,))
+        pids = {f.result() for f in [self.pool.submit(_warm_up) for _ in range(self.workers)]}
+        logger.info(f"Warmed {len(pids)} worker processes over {len(data)} data rows")
+        super().__init__(socket_path, _DaemonRequestHandler)
+
+    def sweep(self, request):
+        """
+        Runs a sweep request, yielding response messages as model specs complete. Chunks not yet
+        started are cancelled if the sweep fails or the generator is closed (client gone).
+        """
+        validate_sweep_request(request)
+        start = time.perf_counter()
+        horizons = sorted(set(request.get("horizons", range(1, 16))))
+        stride_days = request.get("stride_days", STRIDE_DAYS)
+        start_dates = list(iter_start_dates(self.data, horizons[0], stride_days))
+        chunks = split_start_dates(start_dates, self.workers * CHUNKS_PER_WORKER)
+
+        futures, parts = {}, {}
+        try:
+            for s, spec in enumerate(request["specs"]):
+                parts[s] = [None] * len(chunks)
+                for c, chunk in enumerate(chunks):
+                    futures[self.pool.submit(_run_chunk, spec, chunk, horizons)] = (s, c)
+            for future in as_completed(futures):
+                s, c = futures[future]
+                parts[s][c] = future.result()
+                if all(p is not None for p in parts[s]):
+                    yield self._result_message(request, s, parts.pop(s))
+        finally:
+            cancelled = sum(future.cancel() for future in futures)
+            if cancelled:
+                logger.info(f"Sweep stopped, cancelled {cancelled} of {len(futures)} chunks")
+        yield {"type": "done", "specs": len(request["specs"]), "seconds": time.perf_counter() - start}
+
+    def _result_message(self, request, s, chunk_results):
+        result = {"type": "result", "spec_index": s, "spec": request["specs"][s], "horizons": {}}
+        for years in chunk_results[0]:
+            rows = [row for part in chunk_results for row in part[years]]
+            if not rows:
+                continue
+            result["model_name"] = rows[0][-1]
+            summary = dict(zip(RETURNS_STATS_COLUMNS, aggregate_returns(rows)[0]))
+            horizon = {k: (v if isinstance(v, str) else float(v)) for k, v in summary.items()}
+            if request.get("rows"):
+                horizon["rows"] = [_json_row(r) for r in rows]
+            result["horizons"][str(years)] = horizon
+        return result
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+
+    def _send(self, message):
+        self.wfile.write((json.dumps(message) + "\n").encode())
+        self.wfile.flush()
+
+    def handle(self):
+        for line in self.rfile:
+            messages = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+                command = request.get("command", "sweep")
+                if command == "ping":
+                    self._send({"type": "pong", "workers": self.server.workers, "rows": len(self.server.data)})
+                elif command == "shutdown":
+                    self._send({"type": "bye"})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                elif command == "sweep":
+                    messages = self.server.sweep(request)
+                    for message in messages:
+                        self._send(message)
+                else:
+                    self._send({"type": "error", "message": f"unknown command {command}"})
+            except (BrokenPipeError, ConnectionResetError):
+                logger.info("Client disconnected")
+                if messages is not None:
+                    messages.close()
+                return
+            except Exception as e:
+                logger.exception(f"Request failed: {e}")
+                if messages is not None:
+                    messages.close()
+                try:
+                    self._send({"type": "error", "message": f"{type(e).__name__}: {e}"})
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+
+def daemon_request(request, socket_path=SOCKET_PATH):
+    """
+    Sends one request to a running daemon and yields its response messages as they arrive, e.g.
+    for msg in daemon_request({"specs": [{"model": "KellyModel", "kwargs": {"bond_fract": 0.3}}], "horizons": [10]})
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile("rw") as stream:
+            stream.write(json.dumps(request) + "\n")
+            stream.flush()
+            for line in stream:
+                message = json.loads(line)
+                yield message
+                if message["type"] in ("done", "error", "pong", "bye"):
+                    return
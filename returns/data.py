@@ -1,23 +1,32 @@
+import contextlib
 import csv
 import datetime
+import functools
+import hashlib
 import json
 import locale
 import logging
+import os
+import zipfile
 
-import pandas as pd
+import numpy as np
 
-from returns.analysis import get_aggregate_returns_by_period, get_df_aggregate_returns_by_period
+from returns.accrual import InterestAccrualCurve
+from returns.analysis import (ColumnAggregator, bootstrap_block_length, bootstrap_intervals, distribution_summary,
+                              get_aggregate_returns_by_period, get_df_aggregate_returns_by_period, quantile_ranks,
+                              DISTRIBUTION_BINS, DISTRIBUTION_QUANTILES)
+from returns.range_index import PriceRangeIndex
 
 logger = logging.getLogger(__name__)
 
-locale.setlocale(locale.LC_ALL, '')
-
 sp500_input_path = "./data/SP500.tab"
 interest_input_path = "./data/interest.tab"
 
 FMT_IN = "%b %d, %Y"
 FMT_out = "%Y-%m-%d"
 
+CHUNK_ROWS = 100000  # result rows per chunk in the chunked summary reader
+
 sp500_index = 5
 interest_index = 1
 combined_sp500_index = sp500_index
@@ -58,6 +67,7 @@ def get_sp500_data():
     tuple: A tuple containing the sorted data (with dates and values) and the header.
     """
     parsed_data = []
+    locale.setlocale(locale.LC_ALL, '')  # values use the locale's thousands separators
 
     with open(sp500_input_path, "r") as infile:
         reader = csv.reader(infile, delimiter="\t")
@@ -81,6 +91,24 @@ def get_sp500_data():
     return parsed_data, header
 
 
+def get_data_accrual_curve(data, interpolate=False):
+    """
+    Builds the accrual curve from the yearly rates carried by the combined data rows, so cash
+    accrues interest on the same history the model is simulated on (real or synthetic).
+
+    Parameters:
+    data (list): Combined data as returned by get_combined_sp500_interest_data.
+    interpolate (bool): Interpolate between yearly rates instead of stepping at year boundaries.
+
+    Returns:
+    InterestAccrualCurve: The accrual curve of the data's interest column.
+    """
+    interest = {}
+    for row in data:
+        interest.setdefault(row[0].year, [row[combined_interest_index]])
+    return InterestAccrualCurve(interest, interpolate=interpolate)
+
+
 def get_combined_sp500_interest_data():
     """
     Reads S&P 500 and interest data from TSV files.
@@ -99,6 +127,30 @@ def get_combined_sp500_interest_data():
     return result, sp500_header + interest_header
 
 
+def get_dataset_hash(data):
+    """
+    Returns a short content hash of the combined data, used to check that workers
+    simulate against the same data as the coordinator.
+    """
+    h = hashlib.sha256()
+    for row in data:
+        h.update(repr(row).encode())
+    return h.hexdigest()[:16]
+
+
+def get_price_range_index(data):
+    """
+    Builds the range-query index over the adjusted close of the combined data.
+
+    Parameters:
+    data (list): Combined S&P 500 and interest data, as returned by get_combined_sp500_interest_data.
+
+    Returns:
+    PriceRangeIndex: Index answering window return, min, max and max drawdown queries.
+    """
+    return PriceRangeIndex([row[0] for row in data], [row[combined_sp500_index] for row in data])
+
+
 def create_combined_data_file():
     """
     Creates a combined CSV file with data from all model runs.
@@ -147,7 +199,167 @@ def get_model_run_outputs(suffix, years=[1, 2, 3]):
     return results, header, f"./out_data/summary_{suffix}"
 
 
-def create_summary_file(results, header, filename):
+def get_run_tag(filename, model_name):
+    """
+    Returns the run tag (the runner's date_str) of a summary file.
+    """
+    return os.path.basename(filename)[len("summary_"):-len(".csv")].replace(f"{model_name}_", "", 1)
+
+
+def get_total_returns_filename(summary_filename, extension=".npz"):
+    """
+    Returns the name of the total returns file that goes with a summary file
+    (extension ".json" for summaries written before the binary distribution files).
+    """
+    return summary_filename.replace("summary", "total_returns").replace(".csv", extension)
+
+
+class TotalReturnsFileWriter:
+    """
+    Writes a total returns .npz file one array at a time: a horizon's returns can be streamed to
+    the file chunk by chunk, so neither one horizon nor all of them are held in memory. The file
+    is written under a temporary name and renamed into place on close.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.horizons = []
+        self._tmp_filename = f"{filename}.tmp"
+        self._zip = zipfile.ZipFile(self._tmp_filename, "w", allowZip64=True)
+
+    def write_array(self, name, array):
+        with self._zip.open(f"{name}.npy", "w", force_zip64=True) as outfile:
+            np.lib.format.write_array(outfile, np.asanyarray(array), allow_pickle=False)
+
+    @contextlib.contextmanager
+    def array_stream(self, name, count, dtype=np.float32):
+        """
+        Context for writing a 1-d array of count values in chunks; yields a function that
+        appends a chunk of values.
+        """
+        dtype = np.dtype(dtype)
+        written = 0
+        with self._zip.open(f"{name}.npy", "w", force_zip64=True) as outfile:
+            np.lib.format.write_array_header_1_0(outfile, {"descr": np.lib.format.dtype_to_descr(dtype),
+                                                           "fortran_order": False,
+                                                           "shape": (int(count),)})
+
+            def append(values):
+                nonlocal written
+                values = np.ascontiguousarray(values, dtype=dtype)
+                outfile.write(values.tobytes())
+                written += len(values)
+
+            yield append
+        if written != count:
+            raise ValueError(f"{name}: {written} values written, {count} announced")
+
+    def add_horizon(self, horizon, hist_counts, hist_edges, quantiles, total_returns=None):
+        """
+        Adds the histogram and quantiles of a horizon, and its returns unless they were
+        streamed with array_stream(f"returns_{horizon}", ...).
+        """
+        if total_returns is not None:
+            self.write_array(f"returns_{horizon}", np.asarray(total_returns, dtype=np.float32))
+        self.write_array(f"hist_counts_{horizon}", hist_counts)
+        self.write_array(f"hist_edges_{horizon}", hist_edges)
+        self.write_array(f"quantiles_{horizon}", quantiles)
+        self.horizons.append(str(horizon))
+
+    def close(self):
+        self.write_array("horizons", np.array(self.horizons))
+        self.write_array("quantile_levels", DISTRIBUTION_QUANTILES)
+        self._zip.close()
+        os.replace(self._tmp_filename, self.filename)
+        logger.info(f"Total returns data written to {self.filename}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._zip.close()
+            os.remove(self._tmp_filename)
+
+
+def write_total_returns_file(filename, total_returns_by_period):
+    """
+    Writes the total returns of every horizon, with their histograms and quantiles (see
+    returns.analysis.distribution_summary), to a .npz file. The returns are stored as float32.
+
+    Parameters:
+    filename (str): The .npz file to write.
+    total_returns_by_period (dict): Horizon -> total returns.
+    """
+    with TotalReturnsFileWriter(filename) as writer:
+        for k, v in total_returns_by_period.items():
+            writer.add_horizon(k, *distribution_summary(v), total_returns=v)
+
+
+class TotalReturnsDistribution:
+    """
+    Total returns of one horizon from a total returns file, with the histogram and quantiles
+    computed at summary time. Each array is read from the file on first use, so plotting the
+    histograms never reads the returns. Iterates over the returns like the JSON lists did.
+    """
+
+    def __init__(self, filename, horizon):
+        self.filename = filename
+        self.horizon = horizon
+
+    def _read(self, name):
+        # no file handle is kept open between reads
+        with np.load(self.filename) as npz:
+            return npz[name]
+
+    @functools.cached_property
+    def returns(self):
+        return self._read(f"returns_{self.horizon}")
+
+    @functools.cached_property
+    def hist_counts(self):
+        return self._read(f"hist_counts_{self.horizon}")
+
+    @functools.cached_property
+    def hist_edges(self):
+        return self._read(f"hist_edges_{self.horizon}")
+
+    @functools.cached_property
+    def quantiles(self):
+        return self._read(f"quantiles_{self.horizon}")
+
+    @functools.cached_property
+    def quantile_levels(self):
+        return self._read("quantile_levels")
+
+    def __len__(self):
+        return len(self.returns)
+
+    def __iter__(self):
+        return iter(self.returns.tolist())
+
+
+def read_total_returns_file(summary_filename):
+    """
+    Reads the total returns that go with a summary file.
+
+    Returns:
+    dict: Horizon (str) -> TotalReturnsDistribution, or -> list of total returns for
+          summaries written with JSON total returns files.
+    """
+    filename = get_total_returns_filename(summary_filename)
+    try:
+        with np.load(filename) as npz:
+            horizons = npz["horizons"].tolist()
+    except FileNotFoundError:
+        with open(get_total_returns_filename(summary_filename, ".json"), "r") as infile:
+            return json.load(infile)
+    return {str(k): TotalReturnsDistribution(filename, k) for k in horizons}
+
+
+def create_summary_file(results, header, filename, bootstrap=True):
     """
     Creates a summary of the results and writes it to a CSV file.
 
@@ -155,34 +367,239 @@ def create_summary_file(results, header, filename):
     results (dict): A dictionary containing the results for each year.
     header (list): A list of headers for the CSV file.
     filename (str): The name of the CSV file to write.
+    bootstrap (bool): Add the bootstrap confidence intervals.
     """
-    returns_stats_by_period, total_returns_by_period = get_aggregate_returns_by_period(results)
-    df = get_df_aggregate_returns_by_period(returns_stats_by_period)
+    window_metrics = "market_max_drawdown" in header
+    returns_stats_by_period, total_returns_by_period = get_aggregate_returns_by_period(results, window_metrics,
+                                                                                       bootstrap)
+    df = get_df_aggregate_returns_by_period(returns_stats_by_period, window_metrics, bootstrap)
 
     df.to_csv(filename, index=False)
     logger.info(f"Summary data written to {filename}")
 
-    json_filename = filename.replace("summary", "total_returns").replace(".csv", ".json")
-    with open(json_filename, "w") as outfile:
-        json.dump(total_returns_by_period, outfile)
-    logger.info(f"Total returns data written to {json_filename}")
-    return filename, json_filename
+    total_returns_filename = get_total_returns_filename(filename)
+    write_total_returns_file(total_returns_filename, total_returns_by_period)
+    return filename, total_returns_filename
 
 
-def create_summary_files(files):
+def iter_model_run_chunks(filename, columns, chunk_size=CHUNK_ROWS):
     """
-    Prompts the user to select a file suffix from a list of file names.
+    Reads typed columns of a model run output file in chunks.
 
     Parameters:
-    files (list of str): A list of file names.
+    filename (str): The model run output CSV.
+    columns (list of str): Columns to read.
+    chunk_size (int): Rows per chunk.
+
+    Yields:
+    dict: Column name -> ndarray for each chunk, in file order.
+    """
+    import pandas as pd
+
+    for chunk in pd.read_csv(filename, usecols=columns, chunksize=chunk_size, float_precision="round_trip"):
+        yield {c: chunk[c].to_numpy() for c in columns}
+
+
+def _order_statistics(filename, ranks_by_column, aggregators, chunk_size=CHUNK_ROWS):
+    """
+    Exact values at the given ranks of columns of a model run output file, in one chunked pass:
+    the fine histograms of the aggregators bracket every rank and only the values inside the
+    (merged) brackets are kept and sorted.
 
     Returns:
-    str: The selected file suffix.
+    dict: Column -> array of the values at its ranks.
+    """
+    intervals, below, candidates = {}, {}, {}
+    for c, ranks in ranks_by_column.items():
+        merged = []
+        for rank, low, high in sorted(aggregators[c].rank_brackets(ranks), key=lambda b: b[1]):
+            if merged and low <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], high)
+            else:
+                merged.append([low, high])
+        intervals[c] = merged
+        below[c] = [0] * len(merged)
+        candidates[c] = [[] for _ in merged]
+    for chunk in iter_model_run_chunks(filename, list(ranks_by_column), chunk_size):
+        for c, merged in intervals.items():
+            for k, (low, high) in enumerate(merged):
+                below[c][k] += np.count_nonzero(chunk[c] < low)
+                candidates[c][k].append(chunk[c][(chunk[c] >= low) & (chunk[c] <= high)])
+    result = {}
+    for c, ranks in ranks_by_column.items():
+        lows = np.array([low for low, high in intervals[c]])
+        values = [np.sort(np.concatenate(k_candidates)) for k_candidates in candidates[c]]
+        selected = []
+        for rank, low, high in aggregators[c].rank_brackets(ranks):
+            k = int(np.searchsorted(lows, low, "right")) - 1
+            selected.append(values[k][rank - below[c][k]])
+        result[c] = np.array(selected)
+    return result
+
+
+def has_window_metrics(filename):
+    """
+    True if the rows of a model run output file carry window metrics from the price range index.
+    """
+    with open(filename, "r") as infile:
+        return "market_max_drawdown" in next(csv.reader(infile))
+
+
+def summarize_model_run_file(filename, total_returns_file=None, horizon=None, chunk_size=CHUNK_ROWS,
+                             bootstrap=False, chunk_callback=None):
+    """
+    Summarizes one model run output file with bounded memory.
+
+    The file is read in chunks three times: once for the column ranges, once for moments and
+    histograms (streaming the total returns to total_returns_file if given) and once to pick the
+    exact medians, and the quantiles of the total returns, out of the fine histogram bins that
+    hold them. The bootstrap intervals are opt-in, as the moving-block resamples need the total
+    and yearly returns of the whole horizon in memory (16 bytes per window, resampled one
+    resample at a time); without them memory is bounded by chunk_size. The statistics match
+    aggregate_returns on the rows as written (the runner writes them in date order).
+
+    Parameters:
+    filename (str): The model run output CSV.
+    total_returns_file (TotalReturnsFileWriter): If given, the horizon's total returns,
+        histogram and quantiles are added to it.
+    horizon: Key of the horizon in total_returns_file (default the file's time span).
+    chunk_size (int): Rows per chunk.
+    bootstrap (bool): Add the bootstrap confidence intervals (holds the horizon's returns in memory).
+    chunk_callback (callable): Called as chunk_callback(model_name, horizon, chunk, value_ranges)
+        with every chunk of the aggregation pass (including the date column) and the column
+        ranges of the file, e.g. to fill a statistics cube (returns.cube.StatsCube.chunk_adder).
+
+    Returns:
+    tuple: The summary vector, as built by get_aggregate_returns_by_period.
+    """
+    value_columns = ["frac_return", "yearly_return_rate"]
+    if has_window_metrics(filename):
+        value_columns += ["market_max_drawdown", "market_return"]
+
+    time_span, model_name, first_date, last_date = None, None, None, None
+    scans = {c: ColumnAggregator() for c in value_columns}
+    for chunk in iter_model_run_chunks(filename, value_columns + ["date", "time_span", "model_name"], chunk_size):
+        if model_name is None and len(chunk["model_name"]):
+            time_span = round(float(chunk["time_span"][0]), 0)
+            model_name = chunk["model_name"][0]
+            first_date = datetime.datetime.strptime(chunk["date"][0][:10], FMT_out)
+        if len(chunk["date"]):
+            last_date = datetime.datetime.strptime(chunk["date"][-1][:10], FMT_out)
+        for c in value_columns:
+            scans[c].update(chunk[c])
+    if horizon is None:
+        horizon = int(time_span)
+
+    aggregators = {c: ColumnAggregator(value_range=(scans[c].min, scans[c].max), bins=DISTRIBUTION_BINS)
+                   for c in value_columns}
+    frac_chunks, yearly_chunks = [], []
+    with contextlib.ExitStack() as stack:
+        append_returns = None
+        if total_returns_file is not None:
+            append_returns = stack.enter_context(
+                total_returns_file.array_stream(f"returns_{horizon}", scans["frac_return"].count))
+        value_ranges = {c: (scans[c].min, scans[c].max) for c in value_columns}
+        chunk_columns = value_columns + (["date"] if chunk_callback is not None else [])
+        for chunk in iter_model_run_chunks(filename, chunk_columns, chunk_size):
+            for c in value_columns:
+                aggregators[c].update(chunk[c])
+            if chunk_callback is not None:
+                chunk_callback(model_name, horizon, chunk, value_ranges)
+            if append_returns is not None:
+                append_returns(chunk["frac_return"])
+            if bootstrap:
+                frac_chunks.append(chunk["frac_return"])
+                yearly_chunks.append(chunk["yearly_return_rate"])
+
+    total, yearly = aggregators["frac_return"], aggregators["yearly_return_rate"]
+    ranks = {c: [(aggregators[c].count - 1) // 2, aggregators[c].count // 2] for c in value_columns}
+    lower, upper, weights = quantile_ranks(total.count)
+    ranks["frac_return"] += lower.tolist() + upper.tolist()
+    selected = _order_statistics(filename, ranks, aggregators, chunk_size)
+    medians = {c: (selected[c][0] + selected[c][1]) / 2 for c in value_columns}
+    if total_returns_file is not None:
+        low_values, high_values = np.split(selected["frac_return"][2:], 2)
+        total_returns_file.add_horizon(horizon, *total.distribution_histogram(),
+                                       low_values + weights * (high_values - low_values))
+
+    summary_vector = (
+        total.count,
+        time_span,
+        model_name,
+        total.mean,
+        yearly.mean,
+        medians["frac_return"],
+        medians["yearly_return_rate"],
+        total.std(),
+        yearly.std(),
+        total.negative / total.count,
+        total.mode(),
+        yearly.mode()
+    )
+    if "market_max_drawdown" in value_columns:
+        summary_vector += (aggregators["market_max_drawdown"].mean,
+                           medians["market_max_drawdown"],
+                           aggregators["market_max_drawdown"].max,
+                           aggregators["market_return"].min)
+    if bootstrap:
+        block_length = bootstrap_block_length(total.count, first_date, last_date, time_span)
+        summary_vector += bootstrap_intervals(np.concatenate(frac_chunks), np.concatenate(yearly_chunks),
+                                              block_length)
+    return summary_vector
+
+
+def create_summary_file_chunked(suffix, years=[1, 2, 3], chunk_size=CHUNK_ROWS, bootstrap=False,
+                                chunk_callback=None):
+    """
+    Creates the summary and total returns files for a suffix with bounded memory, reading
+    each model run output in chunks instead of loading all horizons (see create_summary_file).
+    bootstrap=True adds the confidence intervals at the cost of one horizon's total and yearly
+    returns in memory (see summarize_model_run_file).
+    The total returns are streamed into the total returns file horizon by horizon, and
+    chunk_callback sees the chunks of every horizon (see summarize_model_run_file).
+
+    Returns:
+    tuple: The summary and total returns file names.
+    """
+    filename = f"./out_data/summary_{suffix}"
+    total_returns_filename = get_total_returns_filename(filename)
+    returns_stats_by_period = []
+    with TotalReturnsFileWriter(total_returns_filename) as total_returns_file:
+        for year in years:
+            run_filename = f"./out_data/returns_{year}_{suffix}"
+            logger.info(f"Summarizing {run_filename}")
+            returns_stats_by_period.append(summarize_model_run_file(run_filename, total_returns_file, year,
+                                                                    chunk_size, bootstrap, chunk_callback))
+
+    window_metrics = has_window_metrics(f"./out_data/returns_{years[0]}_{suffix}")
+    df = get_df_aggregate_returns_by_period(returns_stats_by_period, window_metrics, bootstrap)
+    df.to_csv(filename, index=False)
+    logger.info(f"Summary data written to {filename}")
+    return filename, total_returns_filename
+
+
+def get_run_suffixes(files):
+    """
+    Returns the model run suffixes ("{model_name}_{date_str}.csv") of the result file names.
     """
     # Extract unique suffixes from file names
     # there is an _ in the directory name so 3 not 2...!!
     suffixes = list(set("_".join(filename.split("_")[3:]) for filename in files))
     logger.info("Suffixes extracted from file names")
+    return suffixes
+
+
+def create_summary_files(files):
+    """
+    Prompts the user to select a file suffix from a list of file names.
+
+    Parameters:
+    files (list of str): A list of file names.
+
+    Returns:
+    str: The selected file suffix.
+    """
+    suffixes = get_run_suffixes(files)
     unique_suffixes = {'_'.join(x.split("_")[1:]) for x in suffixes}
     for s in unique_suffixes:
         logger.info(f"  - {s}")
@@ -190,8 +607,7 @@ def create_summary_files(files):
     years = range(1, 16)
     for i, suffix in enumerate(suffixes):
         logger.info(f"*** {i} of {len(suffixes)} *** {suffix}")
-        result = get_model_run_outputs(suffix, years=years)
-        fn, jfn = create_summary_file(*result)
+        fn, jfn = create_summary_file_chunked(suffix, years=years)
         files_created.append((fn, jfn))
     return files_created
 
@@ -202,30 +618,20 @@ def read_summary_data(filename):
     :param filename:
     :return:
     """
+    import pandas as pd
+
     df = pd.read_csv(filename)
-    json_filename = filename.replace("summary", "total_returns").replace(".csv", ".json")
-    with open(json_filename, "r") as infile:
-        total_returns_by_period = json.load(infile)
-    return df, total_returns_by_period
+    return df, read_total_returns_file(filename)
 
 
 def get_model_comparison_data(files, year=10):
+    import pandas as pd
+
     rdata = []
     for p in files:
         d, h = read_summary_data(p)
-        rdata.append(d.iloc[year-1].to_list())
-    drf = pd.DataFrame(rdata, columns=[
-        "sample_size",
-        "time_span",
-        "model_name",
-        "mean_total_returns",
-        "mean_yearly_compound_returns",
-        "median_total_returns",
-        "median_yearly_returns",
-        "sdev_total_returns",
-        "sdev_yearly_returns",
-        "fraction_losing_starts",
-        "mode_total_returns",
-        "mode_yearly_returns"])
+        rdata.append(d.iloc[year-1])
+    # columns by name, summaries may carry window metrics and confidence intervals
+    drf = pd.DataFrame(rdata).reset_index(drop=True)
     drf = drf.sort_values("mean_total_returns")
-    return drf
\ No newline at end of file
+    return drf
@@ -0,0 +1,390 @@
+import datetime
+import glob
+import json
+import logging
+import multiprocessing as mp
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+from returns.data import get_dataset_hash
+from returns.engine import iter_start_dates, run_window, run_window_horizons
+from returns.models import STRIDE_DAYS, build_model
+
+logger = logging.getLogger(__name__)
+
+LEASE_TIMEOUT = 60.  # seconds without a heartbeat before a claimed task is re-dispatched
+HEARTBEAT_INTERVAL = 5.  # seconds between heartbeats of a busy worker
+POLL_INTERVAL = 0.5  # seconds between queue scans
+CHUNK_WINDOWS = 500  # start dates per task
+ROW_ARRAYS = ["date", "frac_return", "yearly_return_rate", "time_span", "model_name"]  # see encode_rows
+
+# File-system work queue shared by a coordinator and any number of workers, on one host or
+# on several hosts mounting the same directory. A work item is the group of tasks of one model
+# and start-date chunk (all horizons), so every start date is simulated once to the longest horizon:
+#
+#   <queue_dir>/pending/<group_id>.json              published by the coordinator
+#   <queue_dir>/claimed/<group_id>__<worker>.json    claimed by a worker (atomic rename), mtime is the heartbeat
+#   <queue_dir>/results/<group_id>.npz               compact results of every task, pushed back by the worker
+#   <queue_dir>/results/<group_id>.error.json        group failed on a worker
+#   <queue_dir>/stop                                 coordinator is done, idle workers exit
+
+
+def write_json_atomic(filename, obj):
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, "w") as outfile:
+        json.dump(obj, outfile)
+    os.replace(tmp_filename, filename)
+
+
+def _group_id_of(filename):
+    return os.path.basename(filename).split(".")[0].split("__")[0]
+
+
+def get_group_id(task):
+    """
+    Returns the work item of a task: m000_y02_c0003 -> m000_c0003, its model and start-date chunk.
+    """
+    m, _, c = task["task_id"].split("_")
+    return f"{m}_{c}"
+
+
+def group_tasks_by_chunk(tasks):
+    """
+    Groups tasks by model and start-date chunk, the units run_task_group simulates together.
+
+    Returns:
+    dict: group id -> list of tasks, in task order.
+    """
+    groups = {}
+    for task in tasks:
+        groups.setdefault(get_group_id(task), []).append(task)
+    return groups
+
+
+def make_tasks(model_specs, horizons, data, chunk_windows=CHUNK_WINDOWS, stride_days=STRIDE_DAYS):
+    """
+    Splits a sweep into tasks of contiguous start-date chunks.
+
+    Parameters:
+    model_specs (list of dict): Model specs (see returns.models.build_model).
+    horizons (list of int): Window lengths in years.
+    data (list): Combined S&P 500 and interest data.
+    chunk_windows (int): Number of start dates per task.
+    stride_days (int): Days between start dates.
+
+    Returns:
+    list of dict: JSON-able tasks, in sweep order.
+    """
+    data_hash = get_dataset_hash(data)
+    tasks = []
+    for m, spec in enumerate(model_specs):
+        for years in horizons:
+            start_dates = list(iter_start_dates(data, years, stride_days))
+            for c, i in enumerate(range(0, len(start_dates), chunk_windows)):
+                chunk = start_dates[i:i + chunk_windows]
+                tasks.append({"task_id": f"m{m:03}_y{years:02}_c{c:04}",
+                              "model": spec,
+                              "years": years,
+                              "chunk": c,
+                              "first_start_date": chunk[0].isoformat(),
+                              "last_start_date": chunk[-1].isoformat(),
+                              "stride_days": stride_days,
+                              "dataset_hash": data_hash})
+    return tasks
+
+
+def run_task(task, data):
+    """
+    Runs the windows of one task.
+
+    Returns:
+    list of tuple: total_returns rows for the task's start dates, in order.
+    """
+    model = build_model(task["model"], data)
+    first = datetime.datetime.fromisoformat(task["first_start_date"])
+    last = datetime.datetime.fromisoformat(task["last_start_date"])
+    dates = [d[0] for d in data]
+    return [run_window(model, data, start_date, task["years"], dates)
+            for start_date in iter_start_dates(data, task["years"], task["stride_days"])
+            if first <= start_date <= last]
+
+
+def run_task_group(tasks, data):
+    """
+    Runs tasks of the same model and chunk for several horizons with one simulation per start
+    date (see returns.engine.run_window_horizons).
+
+    Returns:
+    dict: task_id -> total_returns rows, equal to run_task for each task.
+    """
+    model = build_model(tasks[0]["model"], data)
+    dates = [d[0] for d in data]
+    ranges = [(task, datetime.datetime.fromisoformat(task["first_start_date"]),
+               datetime.datetime.fromisoformat(task["last_start_date"])) for task in tasks]
+    years_min = min(task["years"] for task in tasks)
+    result = {task["task_id"]: [] for task in tasks}
+    for start_date in iter_start_dates(data, years_min, tasks[0]["stride_days"]):
+        covering = {task["years"]: task["task_id"] for task, first, last in ranges if first <= start_date <= last}
+        if not covering:
+            continue
+        for years, row in run_window_horizons(model, data, start_date, list(covering), dates).items():
+            result[covering[years]].append(row)
+    return result
+
+
+def encode_rows(rows):
+    """
+    Packs total_returns rows into typed arrays.
+    """
+    return {"date": np.array([r[0] for r in rows], dtype="datetime64[s]"),
+            "frac_return": np.array([r[1] for r in rows], dtype=float),
+            "yearly_return_rate": np.array([r[2] for r in rows], dtype=float),
+            "time_span": np.array([r[3] for r in rows], dtype=float),
+            "model_name": np.array(rows[0][-1] if rows else "")}
+
+
+def decode_rows(arrays):
+    """
+    Unpacks typed arrays back into total_returns rows.
+    """
+    name = str(arrays["model_name"])
+    return list(zip(arrays["date"].astype(datetime.datetime).tolist(),
+                    arrays["frac_return"].tolist(),
+                    arrays["yearly_return_rate"].tolist(),
+                    arrays["time_span"].tolist(),
+                    [name] * len(arrays["date"])))
+
+
+def encode_group_rows(rows_by_task):
+    """
+    Packs the rows of a group's tasks into one set of typed arrays, keyed "<task_id>__<array>".
+    """
+    return {f"{task_id}__{k}": v for task_id, rows in rows_by_task.items() for k, v in encode_rows(rows).items()}
+
+
+def decode_group_rows(arrays, task_ids):
+    """
+    Unpacks encode_group_rows arrays into task_id -> total_returns rows.
+    """
+    return {task_id: decode_rows({k: arrays[f"{task_id}__{k}"] for k in ROW_ARRAYS}) for task_id in task_ids}
+
+
+class SweepCoordinator:
+    """
+    Publishes sweep tasks to the queue directory as (model, chunk) groups, collects results and
+    re-dispatches groups whose worker stopped sending heartbeats.
+    """
+
+    def __init__(self, queue_dir, lease_timeout=LEASE_TIMEOUT):
+        self.queue_dir = queue_dir
+        self.lease_timeout = lease_timeout
+        self.groups = {}  # group id -> tasks
+        self.done = set()  # group ids
+        self._missing = {}
+        # a new sweep starts from an empty queue: tasks, claims and results (or errors) left by
+        # an earlier sweep in the same directory would otherwise be picked up by this one
+        for sub_dir in ["pending", "claimed", "results"]:
+            os.makedirs(os.path.join(queue_dir, sub_dir), exist_ok=True)
+            for fn in glob.glob(os.path.join(queue_dir, sub_dir, "*")):
+                os.remove(fn)
+        if os.path.exists(os.path.join(queue_dir, "stop")):
+            os.remove(os.path.join(queue_dir, "stop"))
+
+    def _pending_filename(self, group_id):
+        return os.path.join(self.queue_dir, "pending", f"{group_id}.json")
+
+    def _publish(self, group_id):
+        write_json_atomic(self._pending_filename(group_id), {"group_id": group_id, "tasks": self.groups[group_id]})
+
+    def submit(self, tasks):
+        groups = group_tasks_by_chunk(tasks)
+        for group_id, group_tasks in groups.items():
+            self.groups[group_id] = group_tasks
+            self._publish(group_id)
+        logger.info(f"Submitted {len(tasks)} tasks in {len(groups)} groups to {self.queue_dir}")
+
+    def poll(self):
+        """
+        Scans the queue once.
+
+        Returns:
+        list of tuple: (task, rows) for the tasks completed since the last poll.
+        """
+        completed = []
+        for fn in glob.glob(os.path.join(self.queue_dir, "results", "*.error.json")):
+            with open(fn) as infile:
+                error = json.load(infile)
+            raise RuntimeError(f"Task group {_group_id_of(fn)} failed on {error['worker']}: {error['error']}")
+        for fn in sorted(glob.glob(os.path.join(self.queue_dir, "results", "*.npz"))):
+            group_id = _group_id_of(fn)
+            if group_id in self.done or group_id not in self.groups:
+                continue
+            group_tasks = self.groups[group_id]
+            with np.load(fn) as arrays:
+                rows_by_task = decode_group_rows(arrays, [task["task_id"] for task in group_tasks])
+            self.done.add(group_id)
+            completed.extend((task, rows_by_task[task["task_id"]]) for task in group_tasks)
+
+        claimed = set()
+        now = time.time()
+        for fn in glob.glob(os.path.join(self.queue_dir, "claimed", "*.json")):
+            group_id = _group_id_of(fn)
+            try:
+                age = now - os.path.getmtime(fn)
+            except FileNotFoundError:
+                continue  # finished meanwhile
+            if group_id in self.done:
+                continue
+            if age > self.lease_timeout:
+                logger.warning(f"Lease of {os.path.basename(fn)} expired after {age:.0f}s, re-dispatching")
+                try:
+                    os.rename(fn, self._pending_filename(group_id))
+                    os.utime(self._pending_filename(group_id))
+                except FileNotFoundError:
+                    continue
+            claimed.add(group_id)
+
+        # groups found nowhere on two scans in a row are published again
+        pending = {_group_id_of(fn) for fn in glob.glob(os.path.join(self.queue_dir, "pending", "*.json"))}
+        for group_id in set(self.groups) - self.done - claimed - pending:
+            self._missing[group_id] = self._missing.get(group_id, 0) + 1
+            if self._missing[group_id] > 1:
+                logger.warning(f"Task group {group_id} lost, re-dispatching")
+                self._publish(group_id)
+                self._missing[group_id] = 0
+        return completed
+
+    def iter_results(self, poll_interval=POLL_INTERVAL):
+        """
+        Yields (task, rows) as task groups complete, until all submitted tasks are done.
+        """
+        while len(self.done) < len(self.groups):
+            completed = self.poll()
+            yield from completed
+            if not completed:
+                time.sleep(poll_interval)
+
+    def shutdown(self):
+        with open(os.path.join(self.queue_dir, "stop"), "w") as outfile:
+            outfile.write(datetime.datetime.now().isoformat())
+
+
+class SweepWorker:
+    """
+    Pulls task groups from the queue directory, runs each with one simulation per start date
+    (see run_task_group) and pushes back compact results.
+    """
+
+    def __init__(self, queue_dir, data, worker_id=None, heartbeat_interval=HEARTBEAT_INTERVAL):
+        self.queue_dir = queue_dir
+        self.data = data
+        self.data_hash = get_dataset_hash(data)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.tasks_done = 0  # tasks, not groups
+        self.tasks_failed = 0
+
+    def claim(self):
+        """
+        Claims the next pending task group by renaming it into the claimed directory.
+
+        Returns:
+        str: The claimed file name, or None if nothing is pending.
+        """
+        for fn in sorted(glob.glob(os.path.join(self.queue_dir, "pending", "*.json"))):
+            claimed_fn = os.path.join(self.queue_dir, "claimed", f"{_group_id_of(fn)}__{self.worker_id}.json")
+            try:
+                os.rename(fn, claimed_fn)
+            except FileNotFoundError:
+                continue  # another worker was faster
+            os.utime(claimed_fn)  # start the lease
+            return claimed_fn
+        return None
+
+    def _heartbeat(self, claimed_fn, stop_event):
+        while not stop_event.wait(self.heartbeat_interval):
+            try:
+                os.utime(claimed_fn)
+            except FileNotFoundError:
+                return  # re-dispatched
+
+    def execute(self, claimed_fn):
+        with open(claimed_fn) as infile:
+            item = json.load(infile)
+        group_id, tasks = item["group_id"], item["tasks"]
+        results_dir = os.path.join(self.queue_dir, "results")
+        stop_event = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(claimed_fn, stop_event), daemon=True)
+        heartbeat.start()
+        try:
+            if tasks[0]["dataset_hash"] != self.data_hash:
+                raise ValueError(f"dataset hash {self.data_hash} does not match task {tasks[0]['dataset_hash']}")
+            logger.info(f"Worker {self.worker_id} running {group_id} ({len(tasks)} tasks)")
+            rows_by_task = run_task_group(tasks, self.data)
+            tmp_fn = os.path.join(results_dir, f"{group_id}.{self.worker_id}.tmp")
+            with open(tmp_fn, "wb") as outfile:
+                np.savez(outfile, **encode_group_rows(rows_by_task))
+            os.replace(tmp_fn, os.path.join(results_dir, f"{group_id}.npz"))
+            self.tasks_done += len(tasks)
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} failed on {group_id}: {e}")
+            write_json_atomic(os.path.join(results_dir, f"{group_id}.error.json"),
+                               {"worker": self.worker_id, "error": str(e)})
+            self.tasks_failed += len(tasks)
+        finally:
+            stop_event.set()
+            heartbeat.join()
+            if os.path.exists(claimed_fn):
+                os.remove(claimed_fn)
+
+    def run(self, idle_timeout=None, poll_interval=POLL_INTERVAL):
+        """
+        Runs tasks until the coordinator signals stop (or nothing was pending for idle_timeout seconds).
+        """
+        logger.info(f"Worker {self.worker_id} started on {self.queue_dir}")
+        idle_since = time.time()
+        while True:
+            claimed_fn = self.claim()
+            if claimed_fn is not None:
+                self.execute(claimed_fn)
+                idle_since = time.time()
+            elif os.path.exists(os.path.join(self.queue_dir, "stop")):
+                break
+            elif idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                break
+            else:
+                time.sleep(poll_interval)
+        logger.info(f"Worker {self.worker_id} stopped after {self.tasks_done} tasks "
+                    f"({self.tasks_failed} failed)")
+
+
+def _local_worker_main(queue_dir, data_loader, worker_id, heartbeat_interval, idle_timeout):
+    data, _ = data_loader()
+    SweepWorker(queue_dir, data, worker_id=worker_id, heartbeat_interval=heartbeat_interval).run(idle_timeout)
+
+
+def start_local_workers(queue_dir, n_workers, data_loader, heartbeat_interval=HEARTBEAT_INTERVAL, idle_timeout=None):
+    """
+    Starts worker processes on this host, standing in for workers on other hosts.
+
+    Parameters:
+    queue_dir (str): The queue directory shared with the coordinator.
+    n_workers (int): Number of worker processes.
+    data_loader (callable): Picklable function returning (data, header), e.g. get_combined_sp500_interest_data.
+
+    Returns:
+    list of Process: The started worker processes.
+    """
+    workers = []
+    for i in range(n_workers):
+        p = mp.Process(target=_local_worker_main,
+                       args=(queue_dir, data_loader, f"{socket.gethostname()}-local{i}", heartbeat_interval,
+                             idle_timeout),
+                       daemon=True)
+        p.start()
+        workers.append(p)
+    return workers
@@ -0,0 +1,242 @@
+import bisect
+import copy
+import datetime
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from returns.data import combined_sp500_index, combined_interest_index
+from returns.models import STRIDE_DAYS, PADDING_TIME_DELTA
+from returns.range_index import WINDOW_METRICS_FIELDS
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500  # windows per result batch
+CHUNKS_PER_WORKER = 4  # start-date chunks per worker in parallel_model_tester, evens out uneven chunks
+EXECUTORS = ["serial", "thread", "process"]
+
+_worker_data = None  # (data, dates) of a process pool worker, set once by _init_worker
+
+
+def returns_header(window_metrics=False):
+    """
+    Returns the CSV header for model result rows.
+    """
+    header = ["date",
+              "frac_return",
+              "yearly_return_rate",
+              "time_span"]
+    if window_metrics:
+        header += WINDOW_METRICS_FIELDS
+    return header + ["model_name"]
+
+
+def iter_start_dates(data, years, stride_days=STRIDE_DAYS):
+    """
+    Yields the start dates of all windows of the given length that fit in the data.
+    """
+    test_interval = datetime.timedelta(days=stride_days)
+    test_start_date = data[0][0]  # first (oldest) date in data
+    while test_start_date + datetime.timedelta(days=365 * years) < data[-1][0]:
+        yield test_start_date
+        test_start_date += test_interval
+
+
+def _first_index(data, dates, skip_to_date):
+    """
+    Index of the first row on or after skip_to_date (0 when the dates are not given).
+    """
+    return 0 if dates is None else bisect.bisect_left(dates, skip_to_date)
+
+
+def run_window(model, data, start_date, years, dates=None):
+    """
+    Runs the model over a single window and returns its total_returns row.
+    If the list of data dates is given, the scan starts at the window instead of at data[0].
+    """
+    model.model_config(start_date, years=years)
+
+    skip_to_date = start_date - PADDING_TIME_DELTA
+    for d in data[_first_index(data, dates, skip_to_date):]:
+        if skip_to_date is not None and d[0] < skip_to_date:
+            continue
+        else:
+            # data is (stock price, interest rate by years)
+            _data = (d[combined_sp500_index], d[combined_interest_index])
+            skip_to_date = model.trade(d[0], _data)
+            if not model.last_trigger:
+                # nothing trades after the last trade
+                break
+
+    for log_line in model.status():
+        logger.debug(log_line)
+
+    result = model.total_returns()
+    logger.debug(f"frac_returns={result[1]:5.2%} yearly_return_rate={result[2]} "
+                 f"model={result[-1]} start_date={start_date}")
+    return result
+
+
+def run_window_horizons(model, data, start_date, horizons, dates=None):
+    """
+    Runs the model once over the longest of the horizons and returns the total_returns row of
+    every horizon. A shorter run's state at its last trade is the longer run's state on the same
+    day before that day's trade, so the shorter horizons are valued there (Model.horizon_returns).
+
+    Returns:
+    dict: horizon -> total_returns row, equal to run_window(model, data, start_date, horizon)
+    """
+    horizons = sorted(horizons)
+    model.model_config(start_date, years=horizons[-1])
+    end_dates = [start_date + datetime.timedelta(days=365 * years) for years in horizons[:-1]]
+
+    result = {}
+    next_end = 0
+    skip_to_date = start_date - PADDING_TIME_DELTA
+    for d in data[_first_index(data, dates, skip_to_date):]:
+        if skip_to_date is not None and d[0] < skip_to_date:
+            continue
+        _data = (d[combined_sp500_index], d[combined_interest_index])
+        while next_end < len(end_dates) and d[0] >= end_dates[next_end]:
+            result[horizons[next_end]] = model.horizon_returns(d[0], _data)
+            next_end += 1
+        skip_to_date = model.trade(d[0], _data)
+        if not model.last_trigger:
+            break
+        if skip_to_date is not None and next_end < len(end_dates):
+            # never skip over the end of a shorter horizon
+            skip_to_date = min(skip_to_date, end_dates[next_end] - PADDING_TIME_DELTA)
+
+    result[horizons[-1]] = model.total_returns()
+    logger.debug(f"model={result[horizons[-1]][-1]} start_date={start_date} horizons={horizons}")
+    return result
+
+
+def iter_model_returns(model, data, years=10, range_index=None, batch_size=BATCH_SIZE):
+    """
+    Tests the model over all windows of the given length, yielding batches of result rows
+    as they are produced.
+
+    Parameters:
+    model (Model): The model to test.
+    data (list): Combined S&P 500 and interest data.
+    years (int): Window length in years.
+    range_index (PriceRangeIndex): If given, the market window metrics are attached to each row.
+    batch_size (int): Number of windows per batch.
+    """
+    batch = []
+    dates = [d[0] for d in data]
+    for start_date in iter_start_dates(data, years):
+        batch.append(run_window(model, data, start_date, years, dates))
+        if len(batch) >= batch_size:
+            yield batch if range_index is None else range_index.attach_window_metrics(batch, years)
+            batch = []
+    if batch:
+        yield batch if range_index is None else range_index.attach_window_metrics(batch, years)
+
+
+def model_tester(model, data, years=10, range_index=None):
+    """
+    Tests the given model on the provided data for the specified number of years.
+    If a PriceRangeIndex is given, the market window metrics are attached to each row.
+    """
+    logger.info("Starting model testing")
+    model_returns = []
+    for batch in iter_model_returns(model, data, years, range_index=range_index):
+        model_returns.extend(batch)
+    logger.info("End model testing")
+    return model_returns
+
+
+def model_tester_horizons(model, data, horizons, range_index=None, stride_days=STRIDE_DAYS):
+    """
+    Tests the model for all horizons with one simulation per start date (run_window_horizons).
+
+    Returns:
+    dict: horizon -> rows, equal to model_tester(model, data, horizon) for every horizon.
+    """
+    logger.info(f"Starting model testing for horizons {list(horizons)}")
+    dates = [d[0] for d in data]
+    model_returns = {years: [] for years in horizons}
+    for start_date in iter_start_dates(data, min(horizons), stride_days):
+        # horizons whose window still fits in the data for this start date
+        fit = [years for years in horizons if start_date + datetime.timedelta(days=365 * years) < data[-1][0]]
+        for years, row in run_window_horizons(model, data, start_date, fit, dates).items():
+            model_returns[years].append(row)
+    if range_index is not None:
+        model_returns = {years: range_index.attach_window_metrics(rows, years) if rows else rows
+                         for years, rows in model_returns.items()}
+    logger.info("End model testing")
+    return model_returns
+
+
+def _run_start_dates(model, data, dates, start_dates, years):
+    return [run_window(model, data, start_date, years, dates) for start_date in start_dates]
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = (data, [d[0] for d in data])
+
+
+def _run_start_dates_in_worker(model, start_dates, years):
+    return _run_start_dates(model, *_worker_data, start_dates, years)
+
+
+def split_start_dates(start_dates, chunks):
+    """
+    Splits the start dates into at most chunks contiguous, nearly equal chunks, in order.
+    """
+    size, extra = divmod(len(start_dates), max(chunks, 1))
+    result, i = [], 0
+    for c in range(max(chunks, 1)):
+        n = size + (c < extra)
+        if n:
+            result.append(start_dates[i:i + n])
+        i += n
+    return result
+
+
+def parallel_model_tester(model, data, years=10, range_index=None, executor="process", workers=None, chunks=None):
+    """
+    Tests the given model like model_tester, splitting its start dates into contiguous chunks
+    that run on an executor. The chunk results are concatenated in order, so the rows equal
+    model_tester's.
+
+    Parameters:
+    model (Model): The model to test (copied for every chunk).
+    data (list): Combined S&P 500 and interest data.
+    years (int): Window length in years.
+    range_index (PriceRangeIndex): If given, the market window metrics are attached to each row.
+    executor (str or Executor): "serial", "thread", "process" or a concurrent.futures.Executor.
+        Process pools receive the data once per worker, other executors once per chunk.
+    workers (int): Pool size (default os.cpu_count()).
+    chunks (int): Number of chunks (default CHUNKS_PER_WORKER per worker).
+    """
+    workers = workers or os.cpu_count() or 1
+    start_dates = split_start_dates(list(iter_start_dates(data, years)), chunks or workers * CHUNKS_PER_WORKER)
+    logger.info(f"Starting model testing in {len(start_dates)} chunks on {executor} executor")
+    dates = [d[0] for d in data]
+    if executor == "serial":
+        parts = [_run_start_dates(model, data, dates, chunk, years) for chunk in start_dates]
+    elif executor == "process":
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(data,)) as pool:
+            futures = [pool.submit(_run_start_dates_in_worker, model, chunk, years) for chunk in start_dates]
+            parts = [f.result() for f in futures]
+    elif executor == "thread" or isinstance(executor, Executor):
+        pool = ThreadPoolExecutor(workers) if executor == "thread" else executor
+        try:
+            futures = [pool.submit(_run_start_dates, copy.deepcopy(model), data, dates, chunk, years)
+                       for chunk in start_dates]
+            parts = [f.result() for f in futures]
+        finally:
+            if executor == "thread":
+                pool.shutdown()
+    else:
+        raise ValueError(f"Unknown executor {executor}, expected one of {EXECUTORS} or an Executor")
+
+    model_returns = [row for part in parts for row in part]
+    if range_index is not None and model_returns:
+        model_returns = range_index.attach_window_metrics(model_returns, years)
+    logger.info("End model testing")
+    return model_returns
@@ -2,10 +2,13 @@ import datetime
 import logging
 import math
 
+from returns.data import get_data_accrual_curve
+
 logger = logging.getLogger(__name__)
 
 STRIDE_DAYS = 3  # stride for data sampling
 PADDING_TIME_DELTA = datetime.timedelta(days=2 * STRIDE_DAYS)  # days to pad the jumps in the data
+ACCRUAL_MODES = {"stepped": False, "interpolated": True}  # spec "accrual" -> interpolate the yearly rates
 
 
 class Model:
@@ -42,6 +45,12 @@ class Model:
         self.shares = 0
         self.trades.append((date, price, delta_shares, self.capital, self.shares))
 
+    def liquidation_value(self, date, price):
+        """
+        Capital after selling everything on date, as last_trade would, without trading.
+        """
+        return self.capital + self.shares * price[0]
+
     def daily_trade(self, date, price):
         # hold all shares until the end
         # Send a skip ahead date since no trading will occur until the end
@@ -105,12 +114,23 @@ class Model:
         # Ensure there are enough trades to calculate returns
         if len(self.trades) < 2 or self.init_capital <= 0:
             return (self.start_date, 0, 0, 0, self.model_name)
+        return self._returns_row(self.trades[-1][0], self.capital)
 
+    def horizon_returns(self, date, price):
+        """
+        total_returns of a shorter run ending on date: the current state is valued as if
+        last_trade ran on date, without trading.
+        """
+        if len(self.trades) < 1 or self.init_capital <= 0:
+            return (self.start_date, 0, 0, 0, self.model_name)
+        return self._returns_row(date, self.liquidation_value(date, price))
+
+    def _returns_row(self, end_date, capital):
         # Calculate time span in years
-        time_span_years = (self.trades[-1][0] - self.trades[0][0]).days / 365
+        time_span_years = (end_date - self.trades[0][0]).days / 365
 
         # Calculate fractional returns
-        frac_returns = (self.capital - self.init_capital) / self.init_capital
+        frac_returns = (capital - self.init_capital) / self.init_capital
 
         # Calculate yearly return rate
         yearly_return_rate = self.yearly_returns(1 + frac_returns, time_span_years)
@@ -124,15 +144,17 @@ class Model:
 
 class KellyModel(Model):
     model_name = "Fractional_Kelly"
+    accrual_curve = None  # optional InterestAccrualCurve used for interest on cash
 
-    def __init__(self, capital=10000, bond_fract=0.4, rebalance_period=90):
+    def __init__(self, capital=10000, bond_fract=0.4, rebalance_period=90, accrual_curve=None):
         self.init_capital = capital
         self.init_bond_frac = bond_fract
         self.init_rebalance_period_days = rebalance_period
+        self.accrual_curve = accrual_curve
         logger.info("Model initialized, but not configured")
 
     def model_config(self, start_date, years=1):
-        self.model_name += f"_{self.init_bond_frac:.2}_{self.init_rebalance_period_days}"
+        self.model_name = type(self).model_name + f"_{self.init_bond_frac:.2}_{self.init_rebalance_period_days}"
         self.capital = self.init_capital
         self.shares = 0
         self.trades = []  # list of tuples (date, price, shares)
@@ -158,11 +180,31 @@ class KellyModel(Model):
         self.capital -= self.shares * price[0]  # reduce cash capital by the stock purchase
         self.trades.append((date, price, self.shares, self.capital, self.shares))
 
+    def cash_growth(self, date, rate):
+        """
+        Growth factor of the cash capital from the last re-balance to date.
+
+        Parameters:
+        date (datetime): Date the cash is valued.
+        rate (float): Yearly rate at date, used when no accrual curve is configured.
+
+        Returns:
+        float: The compounded growth factor.
+        """
+        if self.accrual_curve is not None:
+            return self.accrual_curve.growth(self.last_rebalance, date)
+        return (1. + rate) ** ((date - self.last_rebalance).days / 365)
+
+    def liquidation_value(self, date, price):
+        capital = self.capital
+        if (date - self.last_rebalance).days > 0:
+            capital *= self.cash_growth(date, price[1])
+        return capital + self.shares * price[0]
+
     def last_trade(self, date, price):
-        interest_factor = price[1]
         if (date - self.last_rebalance).days > 0:
             # interest on capital, compound daily
-            self.capital *= (1. + interest_factor) ** ((date - self.last_rebalance).days / 365)
+            self.capital *= self.cash_growth(date, price[1])
         self.capital += self.shares * price[0]  # sell all stocks
         delta_shares = -self.shares
         self.shares = 0
@@ -184,7 +226,7 @@ class KellyModel(Model):
     def rebalance(self, date, price):
         # interest on capital, compound daily
         logger.info(f"Trading to re-balance on {date}")
-        self.capital *= (1. + price[1]) ** ((date - self.last_rebalance).days / 365)
+        self.capital *= self.cash_growth(date, price[1])
         # current stock value
         stock_value = self.shares * price[0]
         # daily total capital
@@ -197,6 +239,7 @@ class KellyModel(Model):
 
 class InsuranceModel(KellyModel):
     model_name = "Insurance"
+    accrual_curve = None  # re-balanced cash carries the insurance rate, not the interest curve
 
     def __init__(self, capital=10000, insurance_frac=0.10, insurance_period=90, insurance_rate=-0.005,
                  insurance_deductible=0.15, insurance_payout_factor=10):
@@ -210,7 +253,8 @@ class InsuranceModel(KellyModel):
         logger.info("Model initialized, but not configured")
 
     def model_config(self, start_date, years=1):
-        self.model_name += f"_{self.init_insurance_frac:.2}_{self.init_insurance_deductible:.2}_{self.init_insurance_period}"
+        self.model_name = (type(self).model_name +
+                           f"_{self.init_insurance_frac:.2}_{self.init_insurance_deductible:.2}_{self.init_insurance_period}")
         self.capital = self.init_capital
         self.shares = 0
         self.trades = []  # list of tuples (date, price, shares)
@@ -263,3 +307,77 @@ class InsuranceModel(KellyModel):
             self.rebalance(date, _price)
             self.last_rebalance = date
 
+
+
+MODEL_CLASSES = {cls.__name__: cls for cls in (Model, KellyModel, InsuranceModel)}
+# models whose cash can accrue on an InterestAccrualCurve (spec "accrual"); InsuranceModel's
+# re-balanced cash carries the insurance rate instead
+ACCRUAL_MODEL_CLASSES = ["KellyModel"]
+
+
+def check_spec_accrual(spec):
+    """
+    Checks the "accrual" entry of a model spec.
+
+    Raises:
+    ValueError: If the accrual mode is unknown or the spec's model does not take an accrual curve.
+    """
+    accrual = spec.get("accrual")
+    if accrual is None:
+        return
+    if accrual not in ACCRUAL_MODES:
+        raise ValueError(f"accrual of model spec {spec!r} must be one of {sorted(ACCRUAL_MODES)}")
+    if spec.get("model") not in ACCRUAL_MODEL_CLASSES:
+        raise ValueError(f"model of spec {spec!r} does not take an accrual curve, "
+                         f"only {ACCRUAL_MODEL_CLASSES} do")
+
+
+def build_model(spec, data=None):
+    """
+    Builds a model from a JSON-able spec.
+
+    Parameters:
+    spec (dict): e.g. {"model": "KellyModel", "kwargs": {"bond_fract": 0.2, "rebalance_period": 90},
+        "accrual": "stepped"}; with "accrual" (see ACCRUAL_MODES, ACCRUAL_MODEL_CLASSES) interest
+        on cash accrues on an InterestAccrualCurve built from data.
+    data (list): Combined data the model will be tested on, required for specs with "accrual".
+
+    Returns:
+    Model: The (not yet configured) model.
+    """
+    check_spec_accrual(spec)
+    kwargs = dict(spec.get("kwargs", {}))
+    if spec.get("accrual") is not None:
+        if data is None:
+            raise ValueError(f"Model spec {spec} needs the data to build its accrual curve")
+        kwargs["accrual_curve"] = get_data_accrual_curve(data, interpolate=ACCRUAL_MODES[spec["accrual"]])
+    return MODEL_CLASSES[spec["model"]](**kwargs)
+
+
+def model_specs_bnh():
+    """
+    Spec of the buy and hold model for testing (see build_model).
+    """
+    return [{"model": "Model"}]
+
+
+def model_specs_kelly():
+    """
+    Specs of the Kelly models for testing (see build_model), accruing interest on cash day by day.
+    """
+    return [{"model": "KellyModel", "kwargs": {"bond_fract": i, "rebalance_period": j}, "accrual": "stepped"}
+            for i in [0.1, 0.2, 0.25, 0.15]
+            for j in [90, 180]]
+
+
+def model_specs_insurance():
+    """
+    Specs of the insurance models for testing (see build_model).
+    """
+    return [{"model": "InsuranceModel", "kwargs": {"insurance_frac": i, "insurance_deductible": j}}
+            for i in [0.05, 0.1]
+            for j in [0.09, 0.12, 0.18]]
+
+
+# model family -> spec grid, shared by the runner and the fused pipeline
+MODEL_SPEC_FAMILIES = {"bnh": model_specs_bnh, "kelly": model_specs_kelly, "insurance": model_specs_insurance}
@@ -1,7 +1,6 @@
 import logging
 import numpy as np
 import pandas as pd
-from matplotlib import pyplot as plt
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +39,8 @@ class MonthlyReturns:
         print(f'Maximum Return: {self.returns.max():.4f}')
 
     def plot_returns(self):
+        from matplotlib import pyplot as plt
+
         plt.figure(figsize=(10, 5))
         plt.hist(self.returns.values, bins=60, label='Monthly Returns', color='blue')
         plt.title('Monthly Returns Distribution')
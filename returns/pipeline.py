@@ -0,0 +1,105 @@
+import logging
+
+import numpy as np
+
+from returns.analysis import (BOOTSTRAP_CONFIDENCE, BOOTSTRAP_SAMPLES, BOOTSTRAP_SEED, DISTRIBUTION_BINS,
+                              MIN_BOOTSTRAP_BLOCKS, get_aggregate_returns_by_period,
+                              get_df_aggregate_returns_by_period)
+from returns.cube import (CUBE_COLUMNS, CUBE_HIST_BINS, PRIOR_RETURN_BUCKET_EDGES, RATE_BUCKET_EDGES, StartRegimes,
+                          StatsCube, get_cube_filename)
+from returns.data import (get_dataset_hash, get_total_returns_filename, interest_input_path, sp500_input_path,
+                          write_total_returns_file)
+from returns.engine import model_tester_horizons, returns_header
+from returns.models import STRIDE_DAYS, build_model
+from returns.writer import BackgroundResultWriter
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_HORIZONS = range(1, 16)
+
+
+def summary_stage_params(years, bootstrap=True):
+    """
+    Parameters of the summary stage of a model run (see bin/summarize.py), shared with
+    summarize_model so a run it already summarized is not summarized again.
+    """
+    return {"years": list(years),
+            "bins": DISTRIBUTION_BINS,
+            "bootstrap": ([BOOTSTRAP_SAMPLES, BOOTSTRAP_CONFIDENCE, BOOTSTRAP_SEED, MIN_BOOTSTRAP_BLOCKS]
+                          if bootstrap else None),
+            "cube": {"columns": CUBE_COLUMNS, "bins": CUBE_HIST_BINS,
+                     "rate_buckets": RATE_BUCKET_EDGES, "prior_return_buckets": PRIOR_RETURN_BUCKET_EDGES}}
+
+
+def summarize_model(spec, data, range_index, date_str, horizons=PIPELINE_HORIZONS, raw=False,
+                    path="./out_data/", manifest=None):
+    """
+    Runs one model for all horizons and writes its summary, total returns and statistics cube
+    files straight from the in-memory window results, the same outputs bin/runner.py followed by
+    bin/summarize.py produce without the per-window CSV round trip.
+
+    With a manifest the outputs are recorded as the runner and bin/summarize.py record them: the
+    raw result files as "results:" stages and the summary files as the "summary:" stage of their
+    result files, so bin/summarize.py finds them current. Without raw files the summary stage
+    depends on the data files and records the model spec instead.
+
+    Parameters:
+    spec (dict): Model spec (see returns.models.build_model).
+    data (list): Combined S&P 500 and interest data.
+    range_index (PriceRangeIndex): Price range index over data, for the window metrics.
+    date_str (str): Run tag of the output files.
+    horizons (list of int): Window lengths in years.
+    raw (bool): Also write the per-window result files (returns_{years}_{model}_{date_str}.csv).
+    path (str): Output directory.
+    manifest (StageManifest): If given, the outputs are recorded in it.
+
+    Returns:
+    str: The summary file name.
+    """
+    rets_by_years = model_tester_horizons(build_model(spec, data), data, horizons, range_index=range_index)
+    rets_by_years = {years: rets for years, rets in rets_by_years.items() if rets}
+    model_name = next(iter(rets_by_years.values()))[0][-1]
+    suffix = f"{model_name}_{date_str}.csv"
+
+    run_files = {years: f"{path}returns_{years}_{suffix}" for years in sorted(rets_by_years)}
+    writers = []
+    if raw:
+        for years, rets in rets_by_years.items():
+            writer = BackgroundResultWriter(run_files[years], returns_header(window_metrics=True))
+            writer.put(rets)
+            writer.finish()
+            writers.append(writer)
+
+    returns_stats_by_period, total_returns_by_period = get_aggregate_returns_by_period(rets_by_years,
+                                                                                       window_metrics=True)
+    filename = f"{path}summary_{suffix}"
+    get_df_aggregate_returns_by_period(returns_stats_by_period, window_metrics=True,
+                                       bootstrap=True).to_csv(filename, index=False)
+    logger.info(f"Summary data written to {filename}")
+    write_total_returns_file(get_total_returns_filename(filename), total_returns_by_period)
+
+    cube = StatsCube()
+    regimes = StartRegimes(data, range_index)
+    for years, rets in rets_by_years.items():
+        start_dates = np.array([r[0] for r in rets], dtype="datetime64[s]")
+        values = {"frac_return": np.array([r[1] for r in rets], dtype=float),
+                  "yearly_return_rate": np.array([r[2] for r in rets], dtype=float)}
+        value_ranges = {c: (v.min(), v.max()) for c, v in values.items()}
+        cube.add(model_name, years, start_dates, values, regimes, value_ranges)
+    cube.save(get_cube_filename(suffix, path))
+
+    for writer in writers:
+        writer.close()
+    if manifest is not None:
+        data_files = [sp500_input_path, interest_input_path]
+        run_params = {"model": spec, "stride_days": STRIDE_DAYS, "dataset_hash": get_dataset_hash(data)}
+        outputs = [filename, get_total_returns_filename(filename), get_cube_filename(suffix, path)]
+        if raw:
+            for years, fn in run_files.items():
+                manifest.record(f"results:{fn}", data_files, dict(run_params, years=years), [fn])
+            manifest.record(f"summary:{suffix}", list(run_files.values()) + data_files,
+                            summary_stage_params(run_files), outputs)
+        else:
+            manifest.record(f"summary:{suffix}", data_files, dict(summary_stage_params(run_files), **run_params),
+                            outputs)
+    return filename
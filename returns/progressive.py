@@ -0,0 +1,114 @@
+import logging
+
+import numpy as np
+
+from returns.engine import iter_start_dates, run_window
+from returns.models import STRIDE_DAYS
+
+logger = logging.getLogger(__name__)
+
+INITIAL_STEP = 64  # coarse level evaluates every INITIAL_STEP-th start date (rounded up to a power of 2)
+NUM_BATCHES = 10  # contiguous batches for batch-means standard errors (windows overlap in time)
+CONFIDENCE_Z = 1.96  # ~95% normal confidence intervals
+MIN_LEVELS = 2  # never stop on the coarse level alone
+MIN_SCALE = 0.01  # relative tolerances of estimates closer to zero are taken relative to this
+
+
+def refinement_levels(n, initial_step=INITIAL_STEP):
+    """
+    Splits the indices 0..n-1 into coarse-to-fine levels: the first level is evenly spread with
+    initial_step spacing, every further level fills the midpoints of the previous spacing, and
+    all levels together cover every index exactly once.
+
+    Returns:
+    list of list of int: Indices evaluated at each level.
+    """
+    step = 1 << max(int(initial_step) - 1, 0).bit_length()
+    levels = [list(range(0, n, step))]
+    while step > 1:
+        levels.append(list(range(step // 2, n, step)))
+        step //= 2
+    return [level for level in levels if level]
+
+
+def running_estimates(model_returns, num_batches=NUM_BATCHES):
+    """
+    Estimates of the summary statistics from the windows evaluated so far, with confidence
+    interval half-widths from contiguous batch means (neighbouring windows share most of their
+    days, so the rows are not independent).
+
+    Parameters:
+    model_returns (list): total_returns rows sorted by start date.
+
+    Returns:
+    dict: statistic -> (estimate, half width); half width is inf with too few rows.
+    """
+    frac = np.array([r[1] for r in model_returns], dtype=float)
+    stats = {"mean_frac_return": frac,
+             "mean_yearly_return": np.array([r[2] for r in model_returns], dtype=float),
+             "fraction_losing_starts": (frac < 0).astype(float)}
+    estimates = {}
+    for name, values in stats.items():
+        if len(values) < 2 * num_batches:
+            estimates[name] = (float(values.mean()) if len(values) else np.nan, np.inf)
+            continue
+        batch_means = np.array([b.mean() for b in np.array_split(values, num_batches)])
+        half_width = CONFIDENCE_Z * batch_means.std(ddof=1) / np.sqrt(num_batches)
+        estimates[name] = (float(values.mean()), float(half_width))
+    return estimates
+
+
+def converged(estimates, tolerance):
+    """
+    True if every estimate's confidence interval half-width is within tolerance relative to the
+    estimate (the statistics have very different scales), i.e.
+    half width <= tolerance * max(|estimate|, MIN_SCALE).
+    """
+    return all(hw <= tolerance * max(abs(estimate), MIN_SCALE) for estimate, hw in estimates.values())
+
+
+def iter_progressive_returns(model, data, years=10, initial_step=INITIAL_STEP, stride_days=STRIDE_DAYS):
+    """
+    Tests the model coarse-to-fine over the start dates, yielding after every refinement level.
+
+    Yields:
+    tuple: (level, fraction of start dates evaluated, rows so far sorted by start date, estimates)
+    """
+    start_dates = list(iter_start_dates(data, years, stride_days))
+    results = {}
+    for level, indices in enumerate(refinement_levels(len(start_dates), initial_step)):
+        for i in indices:
+            results[i] = run_window(model, data, start_dates[i], years)
+        model_returns = [results[i] for i in sorted(results)]
+        yield level, len(results) / len(start_dates), model_returns, running_estimates(model_returns)
+
+
+def progressive_model_tester(model, data, years=10, tolerance=0.05, initial_step=INITIAL_STEP,
+                             range_index=None, stride_days=STRIDE_DAYS):
+    """
+    Anytime version of model_tester: refines the sample of start dates until every estimate's
+    confidence interval half-width is within tolerance relative to the estimate (see converged),
+    or all start dates are evaluated.
+
+    Parameters:
+    model (Model): The model to test.
+    data (list): Combined S&P 500 and interest data.
+    years (int): Window length in years.
+    tolerance (float): Target confidence interval half-width relative to each estimate, e.g. 0.05.
+    initial_step (int): Spacing of the coarse level in units of stride_days.
+    range_index (PriceRangeIndex): If given, the market window metrics are attached to each row.
+
+    Returns:
+    tuple: (rows evaluated sorted by start date, estimates, fraction of start dates evaluated)
+    """
+    logger.info(f"Starting progressive model testing, tolerance={tolerance}")
+    for level, fraction, model_returns, estimates in iter_progressive_returns(model, data, years,
+                                                                              initial_step, stride_days):
+        report = " ".join(f"{k}={v[0]:.4f}±{v[1]:.4f}" for k, v in estimates.items())
+        logger.info(f"level={level} evaluated={fraction:5.1%} {report}")
+        if level + 1 >= MIN_LEVELS and converged(estimates, tolerance):
+            logger.info(f"Converged after evaluating {fraction:5.1%} of start dates")
+            break
+    if range_index is not None:
+        model_returns = range_index.attach_window_metrics(model_returns, years)
+    return model_returns, estimates, fraction
@@ -0,0 +1,182 @@
+import datetime
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WINDOW_METRICS_FIELDS = ["market_return",
+                         "market_min",
+                         "market_max",
+                         "market_max_drawdown"]
+
+
+def _merge_nodes(left, right):
+    """
+    Merges two (max, min, drawdown) segment tree nodes, left covering the earlier dates.
+    """
+    return (max(left[0], right[0]),
+            min(left[1], right[1]),
+            max(left[2], right[2], left[0] - right[1]))
+
+
+class PriceRangeIndex:
+    """
+    Range-query index over a daily price series.
+
+    Built once over the (sorted) series, it answers window return in O(1) from the log prices,
+    window min and max price in O(1) from sparse tables and max drawdown in O(log N) from a segment
+    tree of (max, min, drawdown) log-price nodes.
+    """
+
+    def __init__(self, dates, prices):
+        """
+        Parameters:
+        dates (list of datetime): Trading dates, oldest first.
+        prices (list of float): Prices (e.g. adjusted close) for each date.
+        """
+        self.dates = np.asarray(dates, dtype="datetime64[s]")
+        self.prices = np.asarray(prices, dtype=float)
+        self.log_prices = np.log(self.prices)
+        n = len(self.log_prices)
+
+        # sparse tables: row k holds min/max price over [i, i + 2**k)
+        levels = max(1, int(np.log2(n)) + 1)
+        self._min_table = np.empty((levels, n))
+        self._max_table = np.empty((levels, n))
+        self._min_table[0] = self.prices
+        self._max_table[0] = self.prices
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            self._min_table[k] = self._min_table[k - 1]
+            self._max_table[k] = self._max_table[k - 1]
+            np.minimum(self._min_table[k - 1][:-half], self._min_table[k - 1][half:], out=self._min_table[k][:-half])
+            np.maximum(self._max_table[k - 1][:-half], self._max_table[k - 1][half:], out=self._max_table[k][:-half])
+
+        # segment tree with leaves at [size, 2 * size), padding leaves are identity nodes
+        self._size = 1 << int(np.ceil(np.log2(max(n, 1))))
+        self._tree_max = np.full(2 * self._size, -np.inf)
+        self._tree_min = np.full(2 * self._size, np.inf)
+        self._tree_dd = np.zeros(2 * self._size)
+        self._tree_max[self._size:self._size + n] = self.log_prices
+        self._tree_min[self._size:self._size + n] = self.log_prices
+        lo = self._size
+        while lo > 1:
+            parent = np.arange(lo // 2, lo)
+            left, right = 2 * parent, 2 * parent + 1
+            self._tree_max[parent] = np.maximum(self._tree_max[left], self._tree_max[right])
+            self._tree_min[parent] = np.minimum(self._tree_min[left], self._tree_min[right])
+            self._tree_dd[parent] = np.maximum(np.maximum(self._tree_dd[left], self._tree_dd[right]),
+                                               self._tree_max[left] - self._tree_min[right])
+            lo //= 2
+        self._lag_tables = {}
+        logger.info(f"Price range index built over {n} prices")
+
+    def index_of(self, date):
+        """
+        Returns the index of the first trading date on or after date.
+        """
+        return int(np.searchsorted(self.dates, np.datetime64(date, "s")))
+
+    def indices_of(self, dates):
+        return np.searchsorted(self.dates, np.asarray(dates, dtype="datetime64[s]"))
+
+    def _range_extreme(self, table, reduce, i, j):
+        # inclusive [i, j], works for scalars and arrays
+        k = np.log2(np.asarray(j) - np.asarray(i) + 1).astype(int)
+        return reduce(table[k, i], table[k, np.asarray(j) - (1 << k) + 1])
+
+    def window_return(self, i, j):
+        """
+        Fractional price return from index i to index j (scalars or arrays).
+        """
+        return np.exp(self.log_prices[j] - self.log_prices[i]) - 1
+
+    def window_min(self, i, j):
+        """
+        Minimum price over the inclusive index range [i, j] (scalars or arrays).
+        """
+        return self._range_extreme(self._min_table, np.minimum, i, j)
+
+    def window_max(self, i, j):
+        """
+        Maximum price over the inclusive index range [i, j] (scalars or arrays).
+        """
+        return self._range_extreme(self._max_table, np.maximum, i, j)
+
+    def max_drawdown(self, i, j):
+        """
+        Largest peak-to-trough loss over the inclusive index range [i, j].
+
+        Returns:
+        float: The max drawdown as a positive fraction of the peak price (0 if prices never fall).
+        """
+        acc_left = (-np.inf, np.inf, 0.)
+        acc_right = (-np.inf, np.inf, 0.)
+        lo, hi = i + self._size, j + self._size + 1
+        while lo < hi:
+            if lo & 1:
+                acc_left = _merge_nodes(acc_left, (self._tree_max[lo], self._tree_min[lo], self._tree_dd[lo]))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                acc_right = _merge_nodes((self._tree_max[hi], self._tree_min[hi], self._tree_dd[hi]), acc_right)
+            lo >>= 1
+            hi >>= 1
+        return 1. - np.exp(-_merge_nodes(acc_left, acc_right)[2])
+
+    def max_drawdowns(self, i, j):
+        return np.array([self.max_drawdown(a, b) for a, b in zip(i, j)])
+
+    def worst_sub_period_return(self, i, j, lag):
+        """
+        Worst return over any lag trading days within the inclusive index range [i, j].
+
+        The lagged log returns get their own sparse table, built on first use for each lag.
+        """
+        if lag not in self._lag_tables:
+            self._lag_tables[lag] = PriceRangeIndex(self.dates[:-lag],
+                                                    np.exp(self.log_prices[lag:] - self.log_prices[:-lag]))
+        lag_table = self._lag_tables[lag]
+        return lag_table.window_min(i, np.asarray(j) - lag) - 1
+
+    def window_indices(self, start_date, end_date):
+        """
+        Index range of a model window: first trading dates on or after start_date and end_date,
+        matching the first and last trades made by the models.
+        """
+        return self.index_of(start_date), min(self.index_of(end_date), len(self.dates) - 1)
+
+    def window_metrics(self, start_date, end_date):
+        """
+        Returns:
+        tuple: (market_return, market_min, market_max, market_max_drawdown) over the window.
+        """
+        i, j = self.window_indices(start_date, end_date)
+        return (float(self.window_return(i, j)),
+                float(self.window_min(i, j)),
+                float(self.window_max(i, j)),
+                float(self.max_drawdown(i, j)))
+
+    def attach_window_metrics(self, model_returns, years):
+        """
+        Inserts the window metrics into total_returns rows, ahead of the model name.
+
+        Parameters:
+        model_returns (list of tuple): Rows as returned by Model.total_returns.
+        years (int): Window length used for the model runs.
+
+        Returns:
+        list of tuple: (date, frac_return, yearly_return_rate, time_span, *WINDOW_METRICS_FIELDS, model_name)
+        """
+        if not model_returns:
+            return []
+        start_dates = [r[0] for r in model_returns]
+        i = np.minimum(self.indices_of(start_dates), len(self.dates) - 1)
+        j = np.minimum(self.indices_of([d + datetime.timedelta(days=365 * years) for d in start_dates]),
+                       len(self.dates) - 1)
+        metrics = zip(self.window_return(i, j).tolist(),
+                      self.window_min(i, j).tolist(),
+                      self.window_max(i, j).tolist(),
+                      self.max_drawdowns(i, j).tolist())
+        return [tuple(r[:-1]) + m + (r[-1],) for r, m in zip(model_returns, metrics)]
@@ -0,0 +1,118 @@
+import itertools
+import logging
+import math
+
+import numpy as np
+
+from returns.engine import model_tester_horizons
+from returns.models import STRIDE_DAYS, build_model
+
+logger = logging.getLogger(__name__)
+
+# (stride in days, horizons in years) from the cheapest rung to the most expensive one
+FIDELITIES = [(STRIDE_DAYS * 32, [5]),
+              (STRIDE_DAYS * 8, [1, 5, 10]),
+              (STRIDE_DAYS * 2, [1, 3, 5, 10, 15])]
+FULL_FIDELITY_HORIZONS = list(range(1, 16))
+KEEP_FRACTION = 0.5  # fraction of candidates surviving each rung
+
+
+def _mean_yearly_return(model_returns):
+    return np.mean([r[2] for r in model_returns])
+
+
+def _median_yearly_return(model_returns):
+    return np.median([r[2] for r in model_returns])
+
+
+def _fraction_losing_starts(model_returns):
+    # negated so that higher scores are always better
+    return -np.mean([r[1] < 0 for r in model_returns])
+
+
+OBJECTIVES = {"mean_yearly_return": _mean_yearly_return,
+              "median_yearly_return": _median_yearly_return,
+              "fraction_losing_starts": _fraction_losing_starts}
+
+
+def parameter_grid(model, **param_values):
+    """
+    Returns the model specs (see returns.models.build_model) for all combinations of the
+    parameter values, e.g. parameter_grid("KellyModel", bond_fract=[0.1, 0.2], rebalance_period=[90]).
+    """
+    names = list(param_values)
+    return [{"model": model, "kwargs": dict(zip(names, values))}
+            for values in itertools.product(*(param_values[n] for n in names))]
+
+
+def evaluate_spec(spec, data, horizons, stride_days=STRIDE_DAYS):
+    """
+    Tests the model of spec over the horizons, with start dates every stride_days, simulating
+    each start date once to the longest horizon that fits (see model_tester_horizons).
+
+    Returns:
+    dict: horizon -> list of total_returns rows
+    """
+    return model_tester_horizons(build_model(spec, data), data, horizons, stride_days=stride_days)
+
+
+def score_returns(rets_by_years, objective):
+    """
+    Scores rows by the objective averaged over the horizons (horizons without windows are ignored).
+    """
+    scores = [OBJECTIVES[objective](rows) for rows in rets_by_years.values() if rows]
+    return float(np.mean(scores)) if scores else -np.inf
+
+
+def score_spec(spec, data, horizons, stride_days, objective):
+    """
+    Scores spec by the objective averaged over the horizons; only the score leaves the worker.
+
+    Returns:
+    float: The score.
+    """
+    return score_returns(evaluate_spec(spec, data, horizons, stride_days), objective)
+
+
+def successive_halving(specs, data, objective="mean_yearly_return", fidelities=FIDELITIES,
+                       keep_fraction=KEEP_FRACTION, winners=1, full_horizons=FULL_FIDELITY_HORIZONS,
+                       starmap=itertools.starmap):
+    """
+    Successive-halving search over model specs: every candidate is scored at the cheapest
+    fidelity, the top keep_fraction survive to the next, more expensive fidelity, and the
+    winners are finally tested at full fidelity (every start date, every horizon).
+
+    Parameters:
+    specs (list): Candidate model specs, e.g. from parameter_grid.
+    data (list): Combined S&P 500 and interest data.
+    objective (str): Key of OBJECTIVES.
+    fidelities (list): (stride in days, horizons) per rung, cheapest first.
+    keep_fraction (float): Fraction of candidates kept after each rung.
+    winners (int): Number of candidates tested at full fidelity.
+    starmap (callable): starmap implementation, e.g. multiprocessing.Pool().starmap.
+
+    Returns:
+    tuple: (list of (spec, score, dict of horizon -> rows) for the winners, best first;
+            list of rungs, each a list of (spec, score) sorted best first)
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective}, expected one of {list(OBJECTIVES)}")
+    candidates = list(specs)
+    history = []
+    for rung, (stride_days, horizons) in enumerate(fidelities):
+        scores = list(starmap(score_spec, [(spec, data, horizons, stride_days, objective) for spec in candidates]))
+        ranked = sorted(zip(candidates, scores), key=lambda x: -x[1])
+        history.append(ranked)
+        keep = max(winners, math.ceil(len(ranked) * keep_fraction))
+        candidates = [spec for spec, _ in ranked[:keep]]
+        logger.info(f"rung={rung} stride_days={stride_days} horizons={horizons} "
+                    f"best={ranked[0][1]:.4f} {ranked[0][0]} kept={len(candidates)}")
+
+    candidates = candidates[:winners]
+    # the winners' rows are written out, so only the final rung sends them back
+    final = list(starmap(evaluate_spec, [(spec, data, full_horizons, STRIDE_DAYS) for spec in candidates]))
+    result = sorted([(spec, score_returns(rets, objective), rets) for spec, rets in zip(candidates, final)],
+                    key=lambda x: -x[1])
+    for spec, score, _ in result:
+        logger.info(f"Winner {spec} full fidelity {objective}={score:.4f}")
+    return result, history
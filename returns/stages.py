@@ -0,0 +1,144 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = "./out_data/manifest/"
+HASH_BLOCK_SIZE = 1 << 20  # bytes read at a time when hashing files
+
+_hash_cache = {}  # (path, mtime_ns, size) -> content hash
+
+
+def file_hash(path):
+    """
+    Content hash of a file (cached while its modification time and size are unchanged).
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _hash_cache:
+        h = hashlib.sha256()
+        with open(path, "rb") as infile:
+            for block in iter(lambda: infile.read(HASH_BLOCK_SIZE), b""):
+                h.update(block)
+        _hash_cache[key] = h.hexdigest()[:16]
+    return _hash_cache[key]
+
+
+def params_hash(params):
+    """
+    Hash of JSON-able stage parameters.
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class StageManifest:
+    """
+    Records, for every stage run, the content hashes of its inputs, its parameters and the
+    hashes of the outputs it wrote, one JSON file per stage (so stages in different processes
+    never write the same file). A stage whose inputs, parameters and outputs still match its
+    record is current and is skipped; any artifact is traced back through the stages that made it.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _record_filename(self, stage_id):
+        return os.path.join(self.path, f"{hashlib.sha256(stage_id.encode()).hexdigest()[:16]}.json")
+
+    def record_of(self, stage_id):
+        try:
+            with open(self._record_filename(stage_id), "r") as infile:
+                return json.load(infile)
+        except FileNotFoundError:
+            return None
+
+    def records(self):
+        result = []
+        for fn in glob.glob(os.path.join(self.path, "*.json")):
+            with open(fn, "r") as infile:
+                result.append(json.load(infile))
+        return result
+
+    def is_current(self, stage_id, inputs, params, outputs):
+        """
+        True if the stage ran before with the same input contents and parameters and its
+        outputs are unchanged since.
+        """
+        record = self.record_of(stage_id)
+        if record is None or record["params_hash"] != params_hash(params):
+            return False
+        if sorted(record["inputs"]) != sorted(inputs) or sorted(record["outputs"]) != sorted(outputs):
+            return False
+        for recorded in [record["inputs"], record["outputs"]]:
+            for fn, h in recorded.items():
+                if not os.path.exists(fn) or file_hash(fn) != h:
+                    return False
+        return True
+
+    def record(self, stage_id, inputs, params, outputs):
+        record = {"stage": stage_id,
+                  "params": params,
+                  "params_hash": params_hash(params),
+                  "inputs": {fn: file_hash(fn) for fn in inputs},
+                  "outputs": {fn: file_hash(fn) for fn in outputs}}
+        filename = self._record_filename(stage_id)
+        with open(f"{filename}.{os.getpid()}.tmp", "w") as outfile:
+            json.dump(record, outfile, indent=1)
+        os.replace(f"{filename}.{os.getpid()}.tmp", filename)
+
+    def run_stage(self, stage_id, inputs, params, outputs, fn):
+        """
+        Runs fn() unless the stage is current, then records the stage.
+
+        Parameters:
+        stage_id (str): Unique stage name, e.g. "summary:Buy_Hold_2024-01-01_1200.csv".
+        inputs (list of str): Files the stage reads.
+        params (dict): JSON-able parameters that change the outputs.
+        outputs (list of str): Files the stage writes.
+        fn (callable): Builds the outputs.
+
+        Returns:
+        bool: True if the stage ran, False if it was current.
+        """
+        if self.is_current(stage_id, inputs, params, outputs):
+            logger.info(f"Stage {stage_id} is current, skipped")
+            return False
+        logger.info(f"Running stage {stage_id}")
+        fn()
+        self.record(stage_id, inputs, params, outputs)
+        return True
+
+    def trace(self, artifact):
+        """
+        Provenance of an artifact: the stage that wrote it, its parameters and, recursively, the
+        provenance of every input.
+
+        Returns:
+        dict: {"artifact", "hash", "stage", "params", "inputs": [...]}; stage is None for source
+              files no recorded stage wrote.
+        """
+        producers = {fn: r for r in self.records() for fn in r["outputs"]}
+        return self._trace(artifact, producers, set())
+
+    def _trace(self, artifact, producers, seen):
+        record = producers.get(artifact)
+        node = {"artifact": artifact,
+                "hash": (record["outputs"][artifact] if record is not None
+                         else file_hash(artifact) if os.path.exists(artifact) else None),
+                "stage": None, "params": None, "inputs": []}
+        if record is not None and artifact not in seen:
+            node.update({"stage": record["stage"], "params": record["params"],
+                         "inputs": [dict(self._trace(fn, producers, seen | {artifact}), hash=h)
+                                    for fn, h in sorted(record["inputs"].items())]})
+        return node
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m returns.stages <artifact>: print the provenance of an artifact
+    print(json.dumps(StageManifest().trace(sys.argv[1]), indent=1))
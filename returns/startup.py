@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["matplotlib", "pandas"]  # plotting and table stack, imported lazily
+
+# cold-start budget in seconds per entry point: interpreter start plus module-level imports
+ENTRY_POINT_BUDGETS = {"bin/runner.py": 1.0,
+                       "bin/summarize.py": 1.0,
+                       "bin/pipeline.py": 1.0,
+                       "bin/get_monthly_returns.py": 2.5}
+# entry points (and the simulation-only import path) that must start without HEAVY_MODULES
+LEAN_ENTRY_POINTS = ["bin/runner.py", "bin/summarize.py", "bin/pipeline.py"]
+SIMULATION_MODULES = ["returns.engine", "returns.distributed", "returns.checkpoint"]
+
+_PROBE = """
+import json, runpy, sys
+{action}
+print(json.dumps(sorted(m for m in {heavy} if m in sys.modules)))
+"""
+
+
+def _probe(action, repeat):
+    """
+    Runs action in fresh interpreters and returns the best wall time and the heavy modules loaded.
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    best, loaded = None, None
+    # entry points configure file logging on import, keep that out of the working tree
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", _PROBE.format(action=action, heavy=HEAVY_MODULES)],
+                                 cwd=tmp, env=env, capture_output=True, text=True, check=True)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            loaded = json.loads(out.stdout.strip().splitlines()[-1])
+    return best, loaded
+
+
+def measure_modules(modules, repeat=3):
+    """
+    Cold-start time of importing modules in a fresh interpreter.
+
+    Returns:
+    tuple: (seconds, list of heavy modules loaded)
+    """
+    return _probe("\n".join(f"import {m}" for m in modules), repeat)
+
+
+def measure_entry_point(path, repeat=3):
+    """
+    Cold-start time of an entry point: its module level runs, its __main__ block does not.
+
+    Returns:
+    tuple: (seconds, list of heavy modules loaded)
+    """
+    return _probe(f"runpy.run_path({os.path.join(REPO_ROOT, path)!r}, run_name='__startup_probe__')", repeat)
+
+
+def check_budgets(repeat=3):
+    """
+    Measures every entry point against its budget.
+
+    Returns:
+    list of tuple: (entry point, seconds, budget, heavy modules loaded, within budget and lean)
+    """
+    results = []
+    for path, budget in ENTRY_POINT_BUDGETS.items():
+        seconds, loaded = measure_entry_point(path, repeat)
+        ok = seconds <= budget and not (path in LEAN_ENTRY_POINTS and loaded)
+        results.append((path, seconds, budget, loaded, ok))
+    seconds, loaded = measure_modules(SIMULATION_MODULES, repeat)
+    results.append(("simulation modules", seconds, None, loaded, not loaded))
+    return results
+
+
+def check_lean_imports():
+    """
+    Checks that the lean entry points and the simulation modules import without HEAVY_MODULES
+    (no timing, so it holds on any machine).
+
+    Returns:
+    list of tuple: (entry point, heavy modules loaded)
+    """
+    results = [(path, measure_entry_point(path, repeat=1)[1]) for path in LEAN_ENTRY_POINTS]
+    results.append(("simulation modules", measure_modules(SIMULATION_MODULES, repeat=1)[1]))
+    return results
+
+
+if __name__ == "__main__":
+    # the wall-clock budgets depend on the machine and its load, so they are checked here on
+    # demand (python -m returns.startup) rather than in the test suite
+    all_ok = True
+    for path, seconds, budget, loaded, ok in check_budgets():
+        all_ok &= ok
+        budget_str = "" if budget is None else f"/ {budget:4.2f}s"
+        print(f"{'OK  ' if ok else 'FAIL'} {path:30} {seconds:5.2f}s {budget_str:8} heavy={loaded}")
+    sys.exit(0 if all_ok else 1)
@@ -0,0 +1,190 @@
+import csv
+import json
+import logging
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from returns.data import get_run_tag
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INDEX_PATH = "./out_data/summary_index/"
+
+# parameters encoded in model names after the family name, see Model.model_config
+MODEL_NAME_PARAMETERS = {"Buy_Hold": [],
+                         "Fractional_Kelly": ["bond_frac", "rebalance_period"],
+                         "Insurance": ["insurance_frac", "insurance_deductible", "insurance_period"]}
+PARAMETER_COLUMNS = [p for params in MODEL_NAME_PARAMETERS.values() for p in params]
+STRING_COLUMNS = ["model_name", "model_family", "run_tag", "source_file"]
+
+# Filter values of SummaryIndex.query and StatsCube.rollup: a scalar matches equal values, a
+# list, set or tuple matches any of its values and a Range matches lo <= value <= hi.
+Range = namedtuple("Range", ["lo", "hi"])
+
+
+def parse_model_name(model_name):
+    """
+    Splits a model name such as "Insurance_0.1_0.12_90" into its family and typed parameters.
+
+    Returns:
+    tuple: (family, dict of parameter name -> float)
+    """
+    for family, params in MODEL_NAME_PARAMETERS.items():
+        if model_name == family or model_name.startswith(f"{family}_"):
+            values = model_name[len(family) + 1:].split("_") if params else []
+            return family, {p: float(v) for p, v in zip(params, values)}
+    return model_name, {}
+
+
+def _read_summary_rows(filename):
+    rows = []
+    with open(filename, "r") as infile:
+        for row in csv.DictReader(infile):
+            model_name = row.pop("model_name")
+            family, params = parse_model_name(model_name)
+            # empty cells are statistics that could not be estimated, e.g. bootstrap intervals
+            row = {k: float(v) if v != "" else np.nan for k, v in row.items()}
+            row.update(params)
+            row.update({"model_name": model_name,
+                        "model_family": family,
+                        "run_tag": get_run_tag(filename, model_name),
+                        "source_file": filename,
+                        "horizon": int(row["time_span"])})
+            rows.append(row)
+    return rows
+
+
+class SummaryIndex:
+    """
+    Consolidated summary table across all models, parameter values, horizons and run tags.
+
+    The table is stored column by column as .npy files, sorted by horizon, with the row range
+    of each horizon in meta.json. Queries read only the columns they filter on or return, and
+    only the rows of the requested horizons, through memory maps.
+    """
+
+    def __init__(self, path=SUMMARY_INDEX_PATH):
+        self.path = path
+        self.meta_filename = os.path.join(path, "meta.json")
+        self.meta = None
+        if os.path.exists(self.meta_filename):
+            with open(self.meta_filename) as infile:
+                self.meta = json.load(infile)
+
+    def column(self, name):
+        if name not in self.meta["columns"]:
+            raise KeyError(f"Unknown summary index column {name!r}")
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+    def update(self, summary_files):
+        """
+        Brings the index up to date with the given summary files, re-reading only the files
+        that are new or changed since the last update.
+        """
+        current = {fn: os.path.getmtime(fn) for fn in summary_files}
+        indexed = self.meta["sources"] if self.meta is not None else {}
+        if indexed == current:
+            logger.info(f"Summary index {self.path} is up to date")
+            return False
+
+        rows = []
+        if self.meta is not None:
+            # keep rows of unchanged files
+            columns = {c: self.column(c)[:] for c in self.meta["columns"]}
+            source = columns["source_file"]
+            for i in range(self.meta["rows"]):
+                if indexed.get(str(source[i])) == current.get(str(source[i])):
+                    rows.append({c: columns[c][i] for c in columns})
+        for fn in sorted(current):
+            if indexed.get(fn) != current[fn]:
+                rows.extend(_read_summary_rows(fn))
+        self._write(rows, current)
+        return True
+
+    def _write(self, rows, sources):
+        rows.sort(key=lambda r: (r["horizon"], str(r["model_name"]), str(r["run_tag"])))
+        names = sorted({k for r in rows for k in r} | set(PARAMETER_COLUMNS))
+        os.makedirs(self.path, exist_ok=True)
+        # every column goes to a temporary file first and is renamed into place, like meta.json
+        for name in names:
+            if name in STRING_COLUMNS:
+                values = np.array([str(r[name]) for r in rows])
+            elif name == "horizon":
+                values = np.array([r[name] for r in rows], dtype=np.int64)
+            else:
+                values = np.array([r.get(name, np.nan) for r in rows], dtype=float)
+            with open(os.path.join(self.path, f"{name}.npy.tmp"), "wb") as outfile:
+                np.save(outfile, values)
+        for name in names:
+            os.replace(os.path.join(self.path, f"{name}.npy.tmp"), os.path.join(self.path, f"{name}.npy"))
+        horizons = np.array([r["horizon"] for r in rows], dtype=np.int64)
+        offsets = {}
+        for h in np.unique(horizons).tolist():
+            offsets[str(h)] = [int(np.searchsorted(horizons, h, "left")), int(np.searchsorted(horizons, h, "right"))]
+        self.meta = {"columns": names, "rows": len(rows), "horizon_offsets": offsets, "sources": sources}
+        with open(f"{self.meta_filename}.tmp", "w") as outfile:
+            json.dump(self.meta, outfile)
+        os.replace(f"{self.meta_filename}.tmp", self.meta_filename)
+        logger.info(f"Summary index {self.path} written with {len(rows)} rows from {len(sources)} files")
+
+    def query(self, filters=None, columns=None):
+        """
+        Returns the summary rows matching all filters.
+
+        Parameters:
+        filters (dict): Column name -> value (equality), list, set or tuple of values (membership)
+            or Range(lo, hi) (inclusive range), e.g. {"horizon": Range(5, 10), "bond_frac": [0.1, 0.25]}.
+        columns (list of str): Columns to return (default all).
+
+        Returns:
+        DataFrame: The matching rows.
+        """
+        import pandas as pd
+
+        filters = dict(filters or {})
+        columns = list(columns or self.meta["columns"])
+        unknown = sorted((set(filters) | set(columns)) - set(self.meta["columns"]) - {"horizon"})
+        if unknown:
+            raise KeyError(f"Unknown summary index columns {unknown}")
+        # the horizon filter selects row ranges without reading any column
+        horizon = filters.pop("horizon", None)
+        if horizon is None:
+            ranges = [(0, self.meta["rows"])]
+        else:
+            wanted = [horizon] if np.isscalar(horizon) else (range(horizon.lo, horizon.hi + 1)
+                                                             if isinstance(horizon, Range) else horizon)
+            ranges = [tuple(self.meta["horizon_offsets"][str(h)]) for h in wanted
+                      if str(h) in self.meta["horizon_offsets"]]
+
+        parts = []
+        for lo, hi in ranges:
+            mask = np.ones(hi - lo, dtype=bool)
+            for name, value in filters.items():
+                values = self.column(name)[lo:hi]
+                if isinstance(value, Range):
+                    mask &= (values >= value.lo) & (values <= value.hi)
+                elif isinstance(value, (list, set, tuple)):
+                    mask &= np.isin(values, list(value))
+                else:
+                    mask &= values == value
+            rows = np.nonzero(mask)[0] + lo
+            parts.append({c: self.column(c)[rows] for c in columns})
+        return pd.DataFrame({c: np.concatenate([p[c] for p in parts]) if parts else [] for c in columns})
+
+
+def update_summary_index(summary_files, path=SUMMARY_INDEX_PATH):
+    """
+    Creates or refreshes the consolidated summary index from the summary files.
+    """
+    return SummaryIndex(path).update(summary_files)
+
+
+def get_model_comparison_data_indexed(year=10, filters=None, path=SUMMARY_INDEX_PATH):
+    """
+    Like get_model_comparison_data, but answered from the summary index: one row per model
+    and run for the horizon, optionally filtered, sorted by mean total returns.
+    """
+    filters = dict(filters or {}, horizon=year)
+    return SummaryIndex(path).query(filters).sort_values("mean_total_returns")
@@ -0,0 +1,196 @@
+import csv
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from returns.data import get_run_tag, read_total_returns_file
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PATTERN = "./out_data/summary_*.csv"
+CACHE_CAPACITY = 32  # total returns files kept in memory
+REFRESH_INTERVAL = 2.  # seconds between checks for new or changed summary files
+HOST = "127.0.0.1"
+PORT = 8765
+
+
+class SummaryStore:
+    """
+    In-memory index over all summary files, with an LRU cache of their total returns.
+
+    Summary rows are small and kept for every file, indexed by model name and horizon.
+    The total returns files are large, so only the most recently used ones stay loaded.
+    New, changed and deleted summary files are picked up on the next query after
+    refresh_interval seconds.
+    """
+
+    def __init__(self, pattern=SUMMARY_PATTERN, capacity=CACHE_CAPACITY, refresh_interval=REFRESH_INTERVAL):
+        self.pattern = pattern
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self.files = {}  # filename -> mtime
+        self.rows = {}  # filename -> list of summary rows
+        self.by_model = {}  # model name -> set of filenames
+        self._cache = OrderedDict()  # filename -> total returns by horizon
+        self._last_refresh = None
+        self._lock = threading.RLock()
+        self.refresh(force=True)
+
+    def _load_rows(self, filename):
+        rows = []
+        with open(filename, "r") as infile:
+            for row in csv.DictReader(infile):
+                # statistics that could not be computed (e.g. bootstrap intervals) are empty cells
+                row = {k: (v if k == "model_name" else float(v) if v != "" else float("nan")) for k, v in row.items()}
+                row["horizon"] = int(row["time_span"])
+                row["run_tag"] = get_run_tag(filename, row["model_name"])
+                rows.append(row)
+        return rows
+
+    def refresh(self, force=False):
+        """
+        Reloads the summary files that appeared or changed since the last refresh.
+        """
+        with self._lock:
+            if not force and time.time() - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = time.time()
+            current = {fn: os.path.getmtime(fn) for fn in glob.glob(self.pattern)}
+            for fn in set(self.files) - set(current):
+                self._drop(fn)
+            for fn, mtime in current.items():
+                if self.files.get(fn) != mtime:
+                    self._drop(fn)
+                    rows = self._load_rows(fn)
+                    self.files[fn] = mtime
+                    self.rows[fn] = rows
+                    for model_name in {r["model_name"] for r in rows}:
+                        self.by_model.setdefault(model_name, set()).add(fn)
+                    logger.info(f"Loaded {fn}")
+
+    def _drop(self, filename):
+        self.files.pop(filename, None)
+        self._cache.pop(filename, None)
+        for row in self.rows.pop(filename, []):
+            self.by_model.get(row["model_name"], set()).discard(filename)
+
+    def models(self):
+        self.refresh()
+        with self._lock:
+            return sorted(m for m, files in self.by_model.items() if files)
+
+    def query(self, model=None, horizon=None, stats=None):
+        """
+        Returns summary rows matching the model name and horizon (None matches all).
+
+        Parameters:
+        model (str): Model name, e.g. "Insurance_0.1_0.12_90".
+        horizon (int): Horizon in years.
+        stats (list of str): Statistics to return (default all).
+
+        Returns:
+        list of dict: Rows with model_name, horizon, run_tag and the statistics.
+        """
+        self.refresh()
+        with self._lock:
+            files = self.by_model.get(model, set()) if model is not None else self.files
+            result = []
+            for fn in sorted(files):
+                for row in self.rows[fn]:
+                    if (model is None or row["model_name"] == model) and (horizon is None or row["horizon"] == horizon):
+                        keys = row.keys() if stats is None else ["model_name", "horizon", "run_tag"] + list(stats)
+                        result.append({k: row[k] for k in keys})
+            return result
+
+    def distribution(self, model, horizon, run_tag=None):
+        """
+        Returns the total returns of every window for a model and horizon, from the latest run
+        unless run_tag is given.
+        """
+        self.refresh()
+        # one lock acquisition, so a concurrent reload cannot drop the file between the lookups
+        with self._lock:
+            rows = [r for r in self.query(model, horizon) if run_tag is None or r["run_tag"] == run_tag]
+            if not rows:
+                raise KeyError(f"No summary for model={model} horizon={horizon} run_tag={run_tag}")
+            run_tag = max(r["run_tag"] for r in rows)
+            fn = next(fn for fn in sorted(self.by_model[model]) if get_run_tag(fn, model) == run_tag)
+            if fn in self._cache:
+                self._cache.move_to_end(fn)
+            else:
+                self._cache[fn] = read_total_returns_file(fn)
+                if len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
+            return [float(x) for x in self._cache[fn][str(horizon)]]
+
+
+class _SummaryRequestHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = {k: v[-1] for k, v in urllib.parse.parse_qs(url.query).items()}
+        try:
+            horizon = int(params["horizon"]) if "horizon" in params else None
+            if url.path == "/models":
+                self._send_json(200, self.store.models())
+            elif url.path == "/summary":
+                stats = params["stat"].split(",") if "stat" in params else None
+                self._send_json(200, self.store.query(params.get("model"), horizon, stats))
+            elif url.path == "/distribution":
+                self._send_json(200, self.store.distribution(params["model"], horizon, params.get("run_tag")))
+            else:
+                self._send_json(404, {"error": f"unknown path {url.path}"})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class SummaryServer(ThreadingHTTPServer):
+    """
+    Local HTTP/JSON service answering summary queries from a SummaryStore:
+
+        GET /models
+        GET /summary?model=<name>&horizon=<years>&stat=<stat>[,<stat>...]
+        GET /distribution?model=<name>&horizon=<years>[&run_tag=<date_str>]
+    """
+
+    def __init__(self, store, host=HOST, port=PORT):
+        handler = type("SummaryRequestHandler", (_SummaryRequestHandler,), {"store": store})
+        super().__init__((host, port), handler)
+        self.store = store
+
+    def start(self):
+        """
+        Serves from a background thread (e.g. inside a notebook kernel).
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def query_summary_service(path="/summary", host=HOST, port=PORT, **params):
+    """
+    Queries a running summary service, e.g. query_summary_service(model="Buy_Hold", horizon=10).
+    """
+    params = {k: v for k, v in params.items() if v is not None}
+    url = f"http://{host}:{port}{path}?{urllib.parse.urlencode(params)}"
+    with urllib.request.urlopen(url) as response:
+        return json.load(response)
@@ -0,0 +1,43 @@
+import datetime
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_HEADER = ["Date", "Open", "High", "Low", "Close*", "Adj Close**", "Volume",
+                    "Average Yield", "Year Open", "Year High", "Year Low", "Year Close", "Annual % Change"]
+
+
+def get_synthetic_combined_data(years=20, start_date=datetime.datetime(1990, 1, 1), seed=0,
+                                annual_drift=0.07, annual_volatility=0.16, rates=(0.02, 0.06)):
+    """
+    Generates a synthetic history in the layout of get_combined_sp500_interest_data.
+
+    Prices follow a geometric random walk over weekdays and each calendar year gets a
+    random interest rate, so long histories can be simulated without the TSV files.
+
+    Parameters:
+    years (int): Length of the history in years.
+    start_date (datetime): First date of the history.
+    seed (int): Seed for the random generator.
+    annual_drift (float): Expected yearly log return of the price.
+    annual_volatility (float): Yearly volatility of the price.
+    rates (tuple): Range (low, high) of the yearly interest rates.
+
+    Returns:
+    tuple: A tuple containing the combined data (with dates and values) and the header.
+    """
+    rng = np.random.default_rng(seed)
+    dates = [start_date + datetime.timedelta(days=i) for i in range(365 * years + years // 4 + 1)]
+    dates = [d for d in dates if d.weekday() < 5]
+    log_returns = rng.normal(annual_drift / 252, annual_volatility / np.sqrt(252), len(dates))
+    prices = (100. * np.exp(np.cumsum(log_returns))).round(2).tolist()
+    yearly_rates = {y: round(float(rng.uniform(*rates)), 4) for y in range(dates[0].year, dates[-1].year + 1)}
+
+    result = []
+    for date, price in zip(dates, prices):
+        rate = yearly_rates[date.year]
+        result.append([date, price, price, price, price, price, 1000000.] + [rate] * 5 + [0.])
+    logger.info(f"Generated {len(result)} rows of synthetic data")
+    return result, SYNTHETIC_HEADER
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+from returns.data import CHUNK_ROWS, iter_model_run_chunks
+
+logger = logging.getLogger(__name__)
+
+RESULTS_TENSOR_PATH = "./out_data/results_tensor/"
+TENSOR_COLUMNS = ["frac_return", "yearly_return_rate"]
+
+
+def get_results_tensor_outputs(path=RESULTS_TENSOR_PATH):
+    """
+    Files written by build_results_tensor.
+    """
+    return [os.path.join(path, f"{name}.npy") for name in TENSOR_COLUMNS + ["start_dates"]] + \
+           [os.path.join(path, "meta.json")]
+
+
+def _parse_returns_filename(filename):
+    # ./out_data/returns_{years}_{model_name}_{date_str}.csv, date_str as "%Y-%m-%d_%H%M"
+    years, rest = os.path.basename(filename)[len("returns_"):-len(".csv")].split("_", 1)
+    model_name, day, time = rest.rsplit("_", 2)
+    return int(years), model_name, f"{day}_{time}"
+
+
+def select_latest_runs(files):
+    """
+    Picks one result file per (horizon, model): the newest run by the date_str in its name, so
+    runs that differ in start dates or code are never mixed within one model's rows.
+
+    Returns:
+    list of str: The selected file names, sorted.
+    """
+    latest = {}
+    for fn in files:
+        years, model_name, date_str = _parse_returns_filename(fn)
+        if (years, model_name) not in latest or date_str > latest[(years, model_name)][0]:
+            latest[(years, model_name)] = (date_str, fn)
+    return sorted(fn for _, fn in latest.values())
+
+
+def build_results_tensor(files, path=RESULTS_TENSOR_PATH, chunk_size=CHUNK_ROWS):
+    """
+    Builds the dense results tensor from model run output files in two chunked passes: one for
+    the shared start-date axis and the model names, one to fill the memory-mapped arrays.
+
+    Each column of TENSOR_COLUMNS is stored as a (model, horizon, start date) .npy array, NaN
+    where a model has no window (the start date is too late for the horizon, or it was not run).
+    If a model was run more than once for a horizon, only its newest run is used (see
+    select_latest_runs); the files used are listed in meta.json.
+    """
+    files = select_latest_runs(files)
+    dates, models, horizons = [], set(), set()
+    for fn in files:
+        horizons.add(_parse_returns_filename(fn)[0])
+        for chunk in iter_model_run_chunks(fn, ["date", "model_name"], chunk_size):
+            dates.append(np.unique(chunk["date"].astype("datetime64[s]")))
+            models.update(chunk["model_name"].tolist())
+    start_dates = np.unique(np.concatenate(dates)) if dates else np.array([], dtype="datetime64[s]")
+    models, horizons = sorted(models), sorted(horizons)
+
+    os.makedirs(path, exist_ok=True)
+    shape = (len(models), len(horizons), len(start_dates))
+    arrays = {c: np.lib.format.open_memmap(os.path.join(path, f"{c}.npy"), mode="w+", dtype=float, shape=shape)
+              for c in TENSOR_COLUMNS}
+    for a in arrays.values():
+        a[:] = np.nan
+    for fn in files:
+        h = horizons.index(_parse_returns_filename(fn)[0])
+        for chunk in iter_model_run_chunks(fn, ["date", "model_name"] + TENSOR_COLUMNS, chunk_size):
+            s = np.searchsorted(start_dates, chunk["date"].astype("datetime64[s]"))
+            m = np.searchsorted(models, chunk["model_name"].astype(str))
+            for c in TENSOR_COLUMNS:
+                arrays[c][m, h, s] = chunk[c]
+    for a in arrays.values():
+        a.flush()
+    np.save(os.path.join(path, "start_dates.npy"), start_dates)
+    with open(os.path.join(path, "meta.json"), "w") as outfile:
+        json.dump({"models": models, "horizons": horizons, "columns": TENSOR_COLUMNS, "sources": files}, outfile)
+    logger.info(f"Results tensor {shape} written to {path}")
+    return path
+
+
+class ResultsTensor:
+    """
+    Memory-mapped (model, horizon, start date) arrays of window results on one shared start-date
+    axis, so paired comparisons across models are vectorized operations on aligned rows.
+    """
+
+    def __init__(self, path=RESULTS_TENSOR_PATH):
+        with open(os.path.join(path, "meta.json"), "r") as infile:
+            meta = json.load(infile)
+        self.models = meta["models"]
+        self.horizons = meta["horizons"]
+        self.start_dates = np.load(os.path.join(path, "start_dates.npy"))
+        self.arrays = {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r") for c in meta["columns"]}
+
+    def values(self, horizon, column="frac_return", models=None):
+        """
+        Returns:
+        ndarray: (model, start date) results for the horizon (all models unless given).
+        """
+        m = slice(None) if models is None else [self.models.index(name) for name in models]
+        return np.asarray(self.arrays[column][m, self.horizons.index(horizon)])
+
+    def excess_returns(self, model, baseline, horizon, column="frac_return"):
+        """
+        Per start date difference of model over baseline (NaN where either has no window).
+        """
+        x = self.values(horizon, column, [model, baseline])
+        return x[0] - x[1]
+
+    def pairwise_differences(self, horizon, column="frac_return"):
+        """
+        Returns:
+        ndarray: (model, model, start date) differences, [i, j] is model i minus model j.
+        """
+        x = self.values(horizon, column)
+        return x[:, None, :] - x[None, :, :]
+
+    def win_rates(self, horizon, column="frac_return"):
+        """
+        Returns:
+        ndarray: (model, model) fraction of the start dates both models ran in where model i
+                 did better than model j.
+        """
+        x = self.values(horizon, column)
+        valid = ~np.isnan(x)
+        both = valid[:, None, :] & valid[None, :, :]
+        with np.errstate(invalid="ignore"):
+            wins = (x[:, None, :] > x[None, :, :]) & both
+            return wins.sum(axis=-1) / both.sum(axis=-1)
+
+    def ranks(self, horizon, column="frac_return"):
+        """
+        Returns:
+        ndarray: (model, start date) rank of each model on each start date, 1 is best (NaN
+                 where the model has no window; ties are ranked in model order).
+        """
+        x = self.values(horizon, column)
+        order = np.argsort(np.where(np.isnan(x), np.inf, -x), axis=0, kind="stable")
+        ranks = np.empty_like(x)
+        np.put_along_axis(ranks, order, np.arange(1, len(x) + 1, dtype=float)[:, None], axis=0)
+        return np.where(np.isnan(x), np.nan, ranks)
+
+    def mean_ranks(self, horizon, column="frac_return"):
+        """
+        Mean rank of every model over the start dates where all models ran.
+        """
+        ranks = self.ranks(horizon, column)
+        complete = ~np.isnan(ranks).any(axis=0)
+        return dict(zip(self.models, ranks[:, complete].mean(axis=1).tolist()))
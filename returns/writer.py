@@ -0,0 +1,108 @@
+import csv
+import io
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+MAX_QUEUED_BATCHES = 8  # producers block beyond this, bounding memory
+FLUSH_ROWS = 20000  # rows encoded before a chunk is written to the file
+
+
+class BackgroundResultWriter:
+    """
+    Writes batches of result rows to a CSV file from a background thread.
+
+    The simulation hands over batches with put() and continues; the writer thread encodes
+    them in bulk and writes large chunks. The queue is bounded, so a slow disk applies
+    back-pressure instead of letting results pile up in memory. With atomic=True the rows go
+    to a temporary file that is renamed to filename only once everything is written.
+    """
+
+    def __init__(self, filename, header, max_queued_batches=MAX_QUEUED_BATCHES, flush_rows=FLUSH_ROWS,
+                 atomic=False):
+        self.filename = filename
+        self.header = header
+        self.atomic = atomic
+        self.flush_rows = flush_rows
+        self.rows_written = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_queued_batches)
+        self._finished = False
+        self._sentinel_seen = False
+        self._thread = threading.Thread(target=self._run, name=f"writer:{filename}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            out_filename = f"{self.filename}.tmp" if self.atomic else self.filename
+            with open(out_filename, "w") as outfile:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(self.header)
+                pending = 0
+                while True:
+                    rows = self._queue.get()
+                    if rows is None:
+                        self._sentinel_seen = True
+                        break
+                    writer.writerows(rows)
+                    pending += len(rows)
+                    if pending >= self.flush_rows:
+                        outfile.write(buffer.getvalue())
+                        buffer.seek(0)
+                        buffer.truncate()
+                        self.rows_written += pending
+                        pending = 0
+                outfile.write(buffer.getvalue())
+                self.rows_written += pending
+            if self.atomic:
+                os.replace(out_filename, self.filename)
+            logger.info(f"Wrote {self.rows_written} rows to {self.filename}")
+        except Exception as e:
+            logger.error(f"Writing {self.filename} failed: {e}")
+            self.error = e
+            # keep draining so producers never block on a dead writer; once the sentinel was
+            # consumed nothing more is queued, so only clear what is left without blocking
+            if not self._sentinel_seen:
+                while self._queue.get() is not None:
+                    pass
+            else:
+                try:
+                    while True:
+                        self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def put(self, rows):
+        """
+        Queues a batch of rows for writing, blocking while the queue is full.
+        """
+        if self.error is not None:
+            raise self.error
+        self._queue.put(rows)
+
+    def finish(self):
+        """
+        Signals that no more rows will be queued. The writer thread completes in the background.
+        """
+        if not self._finished:
+            self._finished = True
+            self._queue.put(None)
+
+    def close(self):
+        """
+        Finishes and waits for all queued rows to be written.
+        """
+        self.finish()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
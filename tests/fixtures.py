@@ -0,0 +1,48 @@
+import os
+import tempfile
+from returns.data import get_price_range_index
+from returns.engine import iter_model_returns, returns_header
+from returns.writer import BackgroundResultWriter
+
+
+def enter_temp_dir(cls):
+    """
+    Moves the test class into a fresh temporary working directory holding an empty out_data directory.
+    The class cleanups restore the previous working directory and remove the temporary one.
+
+    Parameters:
+    cls (type): The unittest.TestCase class, called from its setUpClass.
+    """
+    tmp = tempfile.TemporaryDirectory()
+    cls.addClassCleanup(tmp.cleanup)
+    cls.addClassCleanup(os.chdir, os.getcwd())
+    os.chdir(tmp.name)
+    os.mkdir("out_data")
+
+
+def write_model_runs(data, models, horizons, date_str, range_index=None):
+    """
+    Tests the models over the horizons and writes the rows the way the runner does, to
+    ./out_data/returns_{years}_{model name}_{date_str}.
+
+    Parameters:
+    data (list): Combined data, e.g. from get_synthetic_combined_data.
+    models (list): Model instances.
+    horizons (list): Horizons in years.
+    date_str (str): File name suffix after the model name, e.g. "2024-01-01_1200.csv".
+    range_index (PriceRangeIndex): Index over data, built when not given.
+
+    Returns:
+    dict: (model name, years) -> list of total_returns rows
+    """
+    if range_index is None:
+        range_index = get_price_range_index(data)
+    runs = {}
+    for model in models:
+        for years in horizons:
+            rows = [r for b in iter_model_returns(model, data, years, range_index) for r in b]
+            runs[(rows[0][-1], years)] = rows
+            with BackgroundResultWriter(f"./out_data/returns_{years}_{rows[0][-1]}_{date_str}",
+                                        returns_header(window_metrics=True)) as writer:
+                writer.put(rows)
+    return runs
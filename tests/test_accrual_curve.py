@@ -0,0 +1,89 @@
+import unittest
+import datetime
+import numpy as np
+from returns.accrual import InterestAccrualCurve
+from returns.data import combined_interest_index, get_data_accrual_curve
+from returns.engine import model_tester
+from returns.models import KellyModel, build_model
+from returns.synthetic import get_synthetic_combined_data
+
+INTEREST = {2019: [0.02], 2020: [0.10], 2021: [0.04]}
+
+
+class TestInterestAccrualCurve(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = InterestAccrualCurve(INTEREST)
+
+    def test_range(self):
+        self.assertEqual(self.curve.origin, datetime.datetime(2019, 1, 1))
+        self.assertEqual(self.curve.end, datetime.datetime(2022, 1, 1))
+        self.assertEqual(len(self.curve.cum_log), 365 + 366 + 365 + 1)
+        with self.assertRaises(ValueError):
+            self.curve.growth(datetime.datetime(2018, 12, 31), datetime.datetime(2019, 2, 1))
+
+    def test_growth_within_year_matches_pow(self):
+        # same as (1 + rate) ** (days / 365) used by the models
+        start = datetime.datetime(2020, 1, 1)
+        end = datetime.datetime(2020, 4, 1)
+        self.assertAlmostEqual(self.curve.growth(start, end), 1.1 ** (91 / 365))
+        self.assertEqual(self.curve.growth(start, start), 1.0)
+
+    def test_growth_across_year_boundary(self):
+        start = datetime.datetime(2020, 12, 1)
+        end = datetime.datetime(2021, 2, 1)
+        self.assertAlmostEqual(self.curve.growth(start, end), 1.1 ** (31 / 365) * 1.04 ** (31 / 365))
+
+    def test_growth_many(self):
+        dates = [datetime.datetime(2019, 3, 1), datetime.datetime(2020, 7, 4), datetime.datetime(2021, 9, 9)]
+        index = self.curve.day_indices(dates)
+        growth = self.curve.growth_many(index[:-1], index[1:])
+        expected = [self.curve.growth(dates[0], dates[1]), self.curve.growth(dates[1], dates[2])]
+        np.testing.assert_allclose(growth, expected)
+
+    def test_interpolate(self):
+        curve = InterestAccrualCurve(INTEREST, interpolate=True)
+        # flat before the first mid-year anchor
+        start = datetime.datetime(2019, 1, 1)
+        self.assertAlmostEqual(curve.growth(start, datetime.datetime(2019, 2, 1)), 1.02 ** (31 / 365))
+        # rates rise smoothly through the 2019/2020 boundary instead of stepping
+        dec = curve.log_growth(datetime.datetime(2019, 12, 30), datetime.datetime(2019, 12, 31))
+        jan = curve.log_growth(datetime.datetime(2020, 1, 1), datetime.datetime(2020, 1, 2))
+        self.assertLess(dec, jan)
+        self.assertLess(jan, np.log(1.1) / 365)
+
+    def test_kelly_model_uses_curve(self):
+        kelly_model = KellyModel(accrual_curve=self.curve)
+        kelly_model.model_config(datetime.datetime(2020, 12, 1), years=1)
+        kelly_model.shares = 0
+        kelly_model.capital = 1000
+        kelly_model.last_trade(datetime.datetime(2021, 2, 1), [100, 0.50])  # rate at date is ignored
+        self.assertAlmostEqual(kelly_model.capital, 1000 * 1.1 ** (31 / 365) * 1.04 ** (31 / 365))
+
+    def test_data_curve(self):
+        data, _ = get_synthetic_combined_data(years=3)
+        curve = get_data_accrual_curve(data)
+        rate = data[0][combined_interest_index]
+        self.assertAlmostEqual(curve.growth(datetime.datetime(1990, 1, 1), datetime.datetime(1990, 7, 1)),
+                               (1 + rate) ** (181 / 365))
+
+    def test_spec_accrual(self):
+        data, _ = get_synthetic_combined_data(years=3)
+        spec = {"model": "KellyModel", "kwargs": {"bond_fract": 0.5, "rebalance_period": 180}, "accrual": "stepped"}
+        self.assertIsNotNone(build_model(spec, data).accrual_curve)
+        self.assertIsNone(build_model(dict(spec, accrual=None), data).accrual_curve)
+        with self.assertRaises(ValueError):
+            build_model(spec)
+        # unknown modes and models without accrual curves are rejected before the model is built
+        with self.assertRaises(ValueError):
+            build_model(dict(spec, accrual="daily"), data)
+        with self.assertRaises(ValueError):
+            build_model({"model": "InsuranceModel", "accrual": "stepped"}, data)
+        rows = model_tester(build_model(spec, data), data, years=2)
+        kelly_model = KellyModel(bond_fract=0.5, rebalance_period=180, accrual_curve=get_data_accrual_curve(data))
+        expected = model_tester(kelly_model, data, years=2)
+        self.assertListEqual(rows, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import tempfile
+from returns.checkpoint import SweepCheckpoint
+from returns.distributed import make_tasks, run_task
+from returns.synthetic import get_synthetic_combined_data
+
+SPECS = [{"model": "Model"}, {"model": "KellyModel"}]
+
+
+class TestSweepCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "sweep")
+        self.data, _ = get_synthetic_combined_data(years=3)
+        self.tasks = make_tasks(SPECS, [1, 2], self.data, chunk_windows=100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_plan_and_resume(self):
+        checkpoint = SweepCheckpoint(self.directory)
+        pending = checkpoint.plan(self.tasks)
+        self.assertListEqual(pending, self.tasks)
+        for task in self.tasks[:3]:
+            checkpoint.commit(task, run_task(task, self.data))
+        # a unit interrupted while writing leaves only a temporary file
+        with open(checkpoint.part_filename(self.tasks[3]["task_id"]) + ".123.tmp", "w") as outfile:
+            outfile.write("partial")
+
+        resumed = SweepCheckpoint(self.directory)
+        pending = resumed.plan(self.tasks, resume=True)
+        self.assertListEqual(pending, self.tasks[3:])
+        self.assertListEqual(resumed.read(self.tasks[0]["task_id"]), run_task(self.tasks[0], self.data))
+
+    def test_plan_twice(self):
+        SweepCheckpoint(self.directory).plan(self.tasks)
+        with self.assertRaises(FileExistsError):
+            SweepCheckpoint(self.directory).plan(self.tasks)
+
+    def test_resume_with_other_data(self):
+        SweepCheckpoint(self.directory).plan(self.tasks)
+        other_data, _ = get_synthetic_combined_data(years=3, seed=1)
+        with self.assertRaises(ValueError):
+            SweepCheckpoint(self.directory).plan(make_tasks(SPECS, [1, 2], other_data, chunk_windows=100),
+                                                 resume=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import datetime
+import glob
+import numpy as np
+from returns.cube import *
+from returns.data import create_summary_file_chunked, get_price_range_index
+from returns.models import Model, KellyModel
+from returns.synthetic import get_synthetic_combined_data
+from tests.fixtures import enter_temp_dir, write_model_runs
+
+DATE_STR = "2024-01-01_1200.csv"
+
+
+class TestStatsCube(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        enter_temp_dir(cls)
+        cls.data, _ = get_synthetic_combined_data(years=6, start_date=datetime.datetime(1987, 1, 1))
+        cls.range_index = get_price_range_index(cls.data)
+        cls.rows = write_model_runs(cls.data, [Model(), KellyModel()], [1, 2], DATE_STR, cls.range_index)
+        cls.files = create_cube_files(glob.glob("./out_data/returns_*.csv"), cls.data, cls.range_index, years=[1, 2])
+
+    def test_totals_match_rows(self):
+        cube = load_cube()
+        self.assertEqual(len(self.files), 2)
+        for (model_name, years), rows in self.rows.items():
+            stats = cell_stats(cube.select(model_name=model_name, horizon=years))
+            frac = np.array([r[1] for r in rows])
+            self.assertEqual(stats["count"], len(rows))
+            self.assertAlmostEqual(stats["mean_frac_return"], frac.mean())
+            self.assertAlmostEqual(stats["std_frac_return"], frac.std())
+            self.assertAlmostEqual(stats["fraction_losing_starts"], np.mean(frac < 0))
+
+    def test_slices(self):
+        cube = load_cube()
+        rows = self.rows[("Buy_Hold", 1)]
+        in_1990s = [r for r in rows if r[0].year >= 1990]
+        cell = cube.select(model_name="Buy_Hold", horizon=1, decade=1990)
+        self.assertEqual(cell["frac_return"].count, len(in_1990s))
+        self.assertAlmostEqual(cell["yearly_return_rate"].mean, np.mean([r[2] for r in in_1990s]))
+        self.assertEqual(cube.select(model_name="Buy_Hold", horizon=1, decade=Range(1990, 1999))["frac_return"].count,
+                         len(in_1990s))
+        self.assertEqual(cube.select(model_name="Buy_Hold", horizon=(1, 2))["frac_return"].count,
+                         len(rows) + len(self.rows[("Buy_Hold", 2)]))
+        by_decade = cube.rollup(["decade"], model_name="Buy_Hold", horizon=1)
+        self.assertListEqual(sorted(by_decade), [(1980,), (1990,)])
+        # the first year has no prior-year return
+        first_year = cube.rollup(["prior_return_bucket"], model_name="Buy_Hold", horizon=1)
+        self.assertEqual(first_year[(None,)]["frac_return"].count,
+                         sum(r[0] < datetime.datetime(1988, 1, 1) for r in rows))
+        rates = cube.rollup(["rate_bucket"])
+        self.assertEqual(sum(c["frac_return"].count for c in rates.values()),
+                         sum(len(r) for r in self.rows.values()))
+        with self.assertRaises(ValueError):
+            cube.rollup(["era"])
+
+    def test_histograms(self):
+        cube = load_cube()
+        for (model_name, years), rows in self.rows.items():
+            cell = cube.select(model_name=model_name, horizon=years)["frac_return"]
+            # edges from the results' own range: nothing is clipped
+            self.assertEqual(cell.hist.sum(), len(rows))
+            self.assertEqual(cell.edges[0], min(r[1] for r in rows))
+            self.assertEqual(cell.edges[-1], max(r[1] for r in rows))
+        mixed = cube.select(model_name="Buy_Hold")["frac_return"]
+        self.assertIsNone(mixed.hist)
+        self.assertEqual(mixed.count, len(self.rows[("Buy_Hold", 1)]) + len(self.rows[("Buy_Hold", 2)]))
+
+    def test_summary_pass_cube(self):
+        # the cube filled from the summary's aggregation pass matches the standalone one
+        cube = StatsCube()
+        create_summary_file_chunked(f"Buy_Hold_{DATE_STR}", years=[1, 2], chunk_size=100,
+                                    chunk_callback=cube.chunk_adder(StartRegimes(self.data, self.range_index)))
+        expected = load_cube(f"./out_data/cube_Buy_Hold_*.npz")
+        self.assertSetEqual(set(cube.cells), set(expected.cells))
+        for key, cell in expected.cells.items():
+            for c in CUBE_COLUMNS:
+                self.assertEqual(cube.cells[key][c].count, cell[c].count)
+                self.assertAlmostEqual(cube.cells[key][c].mean, cell[c].mean)
+                np.testing.assert_array_equal(cube.cells[key][c].hist, cell[c].hist)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import json
+import os
+import socket
+import tempfile
+import threading
+from returns.daemon import *
+from returns.engine import model_tester
+from returns.models import KellyModel
+from returns.synthetic import get_synthetic_combined_data
+
+SPECS = [{"model": "Model"},
+         {"model": "KellyModel", "kwargs": {"bond_fract": 0.2, "rebalance_period": 30}}]
+
+
+class TestSimulationDaemon(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.tmp.name, "sim.sock")
+        cls.data, _ = get_synthetic_combined_data(years=4)
+        cls.server = SimulationDaemon(cls.data, cls.socket_path, workers=2)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmp.cleanup()
+
+    def test_ping(self):
+        self.assertListEqual(list(daemon_request({"command": "ping"}, self.socket_path)),
+                             [{"type": "pong", "workers": 2, "rows": len(self.data)}])
+
+    def test_sweep_streams_results(self):
+        messages = list(daemon_request({"specs": SPECS, "horizons": [1, 2], "rows": True}, self.socket_path))
+        self.assertEqual(messages[-1]["type"], "done")
+        results = {m["spec_index"]: m for m in messages[:-1]}
+        self.assertListEqual(sorted(results), [0, 1])
+        kelly = results[1]
+        expected = model_tester(KellyModel(bond_fract=0.2, rebalance_period=30), self.data, years=2)
+        self.assertEqual(kelly["model_name"], expected[0][-1])
+        self.assertEqual(kelly["horizons"]["2"]["sample_size"], len(expected))
+        self.assertListEqual([r[1] for r in kelly["horizons"]["2"]["rows"]], [r[1] for r in expected])
+        self.assertAlmostEqual(kelly["horizons"]["2"]["mean_total_returns"],
+                               sum(r[1] for r in expected) / len(expected))
+
+    def test_bad_request(self):
+        messages = list(daemon_request({"horizons": [1]}, self.socket_path))
+        self.assertEqual(messages[0]["type"], "error")
+
+    def test_invalid_requests(self):
+        for request in [{"specs": [], "horizons": [1]},
+                        {"specs": [{"model": "NoSuchModel"}], "horizons": [1]},
+                        {"specs": [{"model": "KellyModel", "accrual": "daily"}], "horizons": [1]},
+                        {"specs": [{"model": "InsuranceModel", "accrual": "stepped"}], "horizons": [1]},
+                        {"specs": SPECS, "horizons": []},
+                        {"specs": SPECS, "horizons": 5},
+                        {"specs": SPECS, "horizons": [1, -2]},
+                        {"specs": SPECS, "horizons": [1.5]},
+                        {"specs": SPECS, "stride_days": 0}]:
+            messages = list(daemon_request(request, self.socket_path))
+            self.assertEqual(len(messages), 1)
+            self.assertEqual(messages[0]["type"], "error")
+            self.assertIn("ValueError", messages[0]["message"])
+
+    def test_failing_spec(self):
+        request = {"specs": [{"model": "KellyModel", "kwargs": {"no_such_argument": 1}}], "horizons": [1]}
+        messages = list(daemon_request(request, self.socket_path))
+        self.assertEqual(messages[-1]["type"], "error")
+        self.assertIn("TypeError", messages[-1]["message"])
+        # the daemon keeps serving
+        self.assertEqual(next(daemon_request({"command": "ping"}, self.socket_path))["type"], "pong")
+
+    def test_closed_sweep_cancels_chunks(self):
+        sweep = self.server.sweep({"specs": SPECS * 5, "horizons": [1]})
+        self.assertEqual(next(sweep)["type"], "result")
+        with self.assertLogs("returns.daemon", level="INFO") as logs:
+            sweep.close()
+        self.assertIn("cancelled", logs.output[0])
+
+    def test_client_disconnect(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps({"specs": SPECS * 5, "horizons": [1, 2], "rows": True}) + "\n").encode())
+        self.assertEqual(next(daemon_request({"command": "ping"}, self.socket_path))["type"], "pong")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import functools
+import os
+import tempfile
+import time
+from returns.distributed import *
+from returns.engine import model_tester
+from returns.models import build_model
+from returns.synthetic import get_synthetic_combined_data
+
+SPECS = [{"model": "Model"},
+         {"model": "KellyModel", "kwargs": {"bond_fract": 0.2, "rebalance_period": 90}}]
+data_loader = functools.partial(get_synthetic_combined_data, years=4)
+
+
+class TestDistributedSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue_dir = self.tmp.name
+        self.data, _ = data_loader()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def collect(self, coordinator):
+        results = {}
+        for task, rows in coordinator.iter_results(poll_interval=0.05):
+            results[task["task_id"]] = rows
+        return results
+
+    def test_make_tasks(self):
+        tasks = make_tasks(SPECS, [1, 2], self.data, chunk_windows=100)
+        windows = sum(len(run_task(t, self.data)) for t in tasks if t["task_id"].startswith("m000_y02"))
+        self.assertEqual(windows, len(model_tester(build_model(SPECS[0]), self.data, years=2)))
+        self.assertTrue(all(t["dataset_hash"] == get_dataset_hash(self.data) for t in tasks))
+
+    def test_run_task_group(self):
+        tasks = [t for t in make_tasks(SPECS, [1, 2, 3], self.data, chunk_windows=100) if t["task_id"].startswith("m001")]
+        chunk = [t for t in tasks if t["chunk"] == 0]
+        self.assertEqual(len(chunk), 3)
+        result = run_task_group(chunk, self.data)
+        for task in chunk:
+            self.assertListEqual(result[task["task_id"]], run_task(task, self.data))
+
+    def test_local_workers(self):
+        tasks = make_tasks(SPECS, [1, 2], self.data, chunk_windows=150)
+        coordinator = SweepCoordinator(self.queue_dir, lease_timeout=30)
+        coordinator.submit(tasks)
+        workers = start_local_workers(self.queue_dir, 3, data_loader, heartbeat_interval=0.2)
+        results = self.collect(coordinator)
+        coordinator.shutdown()
+        for worker in workers:
+            worker.join(timeout=30)
+            self.assertEqual(worker.exitcode, 0)
+
+        self.assertSetEqual(set(results), {t["task_id"] for t in tasks})
+        for m, spec in enumerate(SPECS):
+            rows = [r for task_id in sorted(results) if task_id.startswith(f"m{m:03}_y02") for r in results[task_id]]
+            self.assertListEqual(rows, model_tester(build_model(spec), self.data, years=2))
+
+    def test_workers_run_task_groups(self):
+        tasks = make_tasks(SPECS[1:], [1, 2, 3], self.data, chunk_windows=100)
+        coordinator = SweepCoordinator(self.queue_dir)
+        coordinator.submit(tasks)
+        groups = group_tasks_by_chunk(tasks)
+        # one work item per model and chunk, covering every horizon of the chunk
+        self.assertEqual(len(glob.glob(os.path.join(self.queue_dir, "pending", "*.json"))), len(groups))
+        self.assertLess(len(groups), len(tasks))
+        worker = SweepWorker(self.queue_dir, self.data)
+        worker.run(idle_timeout=0.1, poll_interval=0.01)
+        self.assertEqual(worker.tasks_done, len(tasks))
+        results = self.collect(coordinator)
+        for task in tasks:
+            self.assertListEqual(results[task["task_id"]], run_task(task, self.data))
+
+    def test_redispatch_on_worker_loss(self):
+        tasks = make_tasks(SPECS[:1], [1], self.data, chunk_windows=200)
+        coordinator = SweepCoordinator(self.queue_dir, lease_timeout=0.5)
+        coordinator.submit(tasks)
+        # a worker claims the first task and dies without heartbeats
+        dead_worker = SweepWorker(self.queue_dir, self.data, worker_id="dead")
+        claimed_fn = dead_worker.claim()
+        stale = time.time() - 10
+        os.utime(claimed_fn, (stale, stale))
+
+        live_worker = SweepWorker(self.queue_dir, self.data, worker_id="live", heartbeat_interval=0.1)
+        live_worker.run(idle_timeout=0.1, poll_interval=0.01)
+        self.assertEqual(live_worker.tasks_done, len(tasks) - 1)
+        completed = coordinator.poll()  # re-dispatches the expired claim
+        self.assertEqual(len(completed), len(tasks) - 1)
+        self.assertFalse(os.path.exists(claimed_fn))
+        live_worker.run(idle_timeout=0.1, poll_interval=0.01)
+        results = self.collect(coordinator)
+        self.assertListEqual(list(results), [tasks[0]["task_id"]])
+
+    def test_dataset_mismatch(self):
+        coordinator = SweepCoordinator(self.queue_dir)
+        coordinator.submit(make_tasks(SPECS[:1], [1], self.data, chunk_windows=1000))
+        other_data, _ = get_synthetic_combined_data(years=4, seed=1)
+        worker = SweepWorker(self.queue_dir, other_data)
+        worker.run(idle_timeout=0.1, poll_interval=0.01)
+        self.assertEqual(worker.tasks_done, 0)
+        self.assertEqual(worker.tasks_failed, 1)
+        with self.assertRaises(RuntimeError):
+            coordinator.poll()
+        # a new sweep in the same directory does not inherit the failure or stale tasks
+        SweepCoordinator(self.queue_dir).shutdown()
+        self.assertListEqual(glob.glob(os.path.join(self.queue_dir, "*", "*")), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
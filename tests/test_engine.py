@@ -0,0 +1,106 @@
+import unittest
+import csv
+import datetime
+import os
+import tempfile
+from returns.engine import *
+from returns.models import Model, KellyModel, InsuranceModel
+from returns.range_index import PriceRangeIndex
+from returns.synthetic import get_synthetic_combined_data
+from returns.writer import BackgroundResultWriter
+
+
+class TestEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.data, self.header = get_synthetic_combined_data(years=4)
+
+    def test_iter_start_dates(self):
+        start_dates = list(iter_start_dates(self.data, years=2))
+        self.assertEqual(start_dates[0], self.data[0][0])
+        self.assertEqual(start_dates[1] - start_dates[0], datetime.timedelta(days=STRIDE_DAYS))
+        self.assertLess(start_dates[-1] + datetime.timedelta(days=730), self.data[-1][0])
+
+    def test_batches_match_model_tester(self):
+        rets = model_tester(Model(), self.data, years=2)
+        batches = list(iter_model_returns(Model(), self.data, years=2, batch_size=100))
+        self.assertEqual(len(rets), len(list(iter_start_dates(self.data, years=2))))
+        self.assertTrue(all(len(b) <= 100 for b in batches))
+        self.assertListEqual([r for b in batches for r in b], rets)
+
+    def test_buy_hold_returns(self):
+        ret = run_window(Model(), self.data, self.data[0][0], years=1)
+        end = next(d for d in self.data if d[0] >= self.data[0][0] + datetime.timedelta(days=365))
+        self.assertAlmostEqual(ret[1], end[5] / self.data[0][5] - 1)
+
+    def test_multi_horizon_matches_single_runs(self):
+        for model in [Model(), KellyModel(bond_fract=0.2, rebalance_period=30),
+                      InsuranceModel(insurance_deductible=0.05, insurance_period=30)]:
+            multi = model_tester_horizons(model, self.data, [1, 2, 3])
+            for years in [1, 2, 3]:
+                self.assertListEqual(multi[years], model_tester(model, self.data, years))
+
+    def test_horizon_returns(self):
+        model = KellyModel(bond_fract=0.3, rebalance_period=30)
+        start = self.data[10][0]
+        rows = run_window_horizons(model, self.data, start, [2, 1])
+        self.assertEqual(rows[1], run_window(model, self.data, start, 1))
+        self.assertEqual(rows[2], run_window(model, self.data, start, 2))
+        dates = [d[0] for d in self.data]
+        self.assertEqual(run_window(model, self.data, start, 2, dates), rows[2])
+
+    def test_split_start_dates(self):
+        chunks = split_start_dates(list(range(10)), 4)
+        self.assertListEqual(chunks, [[0, 1, 2], [3, 4, 5], [6, 7], [8, 9]])
+        self.assertListEqual(split_start_dates([1, 2], 4), [[1], [2]])
+
+    def test_parallel_model_tester(self):
+        model = KellyModel(bond_fract=0.2, rebalance_period=30)
+        expected = model_tester(model, self.data, years=2)
+        for executor in EXECUTORS:
+            rets = parallel_model_tester(model, self.data, years=2, executor=executor, workers=2, chunks=5)
+            self.assertListEqual(rets, expected, executor)
+        with self.assertRaises(ValueError):
+            parallel_model_tester(model, self.data, years=2, executor="gpu")
+
+    def test_window_metrics(self):
+        range_index = PriceRangeIndex([d[0] for d in self.data], [d[5] for d in self.data])
+        rets = model_tester(KellyModel(), self.data, years=1, range_index=range_index)
+        self.assertEqual(len(rets[0]), len(returns_header(window_metrics=True)))
+        self.assertTrue(rets[0][-1].startswith("Fractional_Kelly"))
+
+
+class TestBackgroundResultWriter(unittest.TestCase):
+
+    def test_write_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fn = os.path.join(tmp, "returns.csv")
+            with BackgroundResultWriter(fn, returns_header(), max_queued_batches=2, flush_rows=7) as writer:
+                for i in range(10):
+                    writer.put([(f"2020-01-{i + 1:02}", i, 0.1, 1.0, "Buy_Hold")] * 3)
+            self.assertEqual(writer.rows_written, 30)
+            with open(fn) as infile:
+                rows = list(csv.reader(infile))
+            self.assertListEqual(rows[0], returns_header())
+            self.assertEqual(len(rows), 31)
+            self.assertListEqual(rows[-1], ["2020-01-10", "9", "0.1", "1.0", "Buy_Hold"])
+
+    def test_write_error(self):
+        writer = BackgroundResultWriter("/nonexistent/dir/returns.csv", returns_header())
+        with self.assertRaises(OSError):
+            writer.close()
+
+    def test_replace_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # the final rename fails after the writer thread has consumed the end of the rows
+            fn = os.path.join(tmp, "returns.csv")
+            os.mkdir(fn)
+            writer = BackgroundResultWriter(fn, returns_header(), atomic=True)
+            writer.put([("2020-01-01", 0, 0.1, 1.0, "Buy_Hold")])
+            with self.assertRaises(OSError):
+                writer.close()
+            self.assertFalse(writer._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,6 +20,7 @@ class TestInsuranceModel(unittest.TestCase):
         self.insurance_model.model_config(start_date, years=2)
         self.assertEqual(self.insurance_model.capital, 10000)
         self.assertEqual(self.insurance_model.shares, 0)
+        self.assertEqual(self.insurance_model.model_name, "Insurance_0.1_0.15_90")
         # Add more assertions here to test state after configuration
     def test_rebalance(self):
         self.insurance_model.shares = 900
@@ -20,6 +20,8 @@ class TestKellyModel(unittest.TestCase):
         self.assertEqual(self.kelly_model.capital, 10000)
         self.assertEqual(self.kelly_model.shares, 0)
         self.assertEqual(self.kelly_model.bond_frac, 0.4)
+        # configuring again does not extend the name
+        self.assertEqual(self.kelly_model.model_name, "Fractional_Kelly_0.4_90")
         # Add more assertions here to test state after configuration
 
     def test_first_trade(self):
@@ -0,0 +1,90 @@
+import unittest
+import glob
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from returns.cube import get_cube_filename, load_cube
+from returns.data import (create_summary_file, get_model_run_outputs, get_price_range_index, get_total_returns_filename,
+                          interest_input_path, read_total_returns_file, sp500_input_path)
+from returns.models import MODEL_SPEC_FAMILIES, build_model
+from returns.pipeline import *
+from returns.stages import StageManifest
+from returns.synthetic import get_synthetic_combined_data
+
+SPEC = {"model": "KellyModel", "kwargs": {"bond_fract": 0.2, "rebalance_period": 90}}
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.mkdir("out_data")
+        self.data, _ = get_synthetic_combined_data(years=5)
+        self.range_index = get_price_range_index(self.data)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_no_raw_outputs(self):
+        fn = summarize_model(SPEC, self.data, self.range_index, "T", horizons=[1, 2])
+        self.assertEqual(fn, "./out_data/summary_Fractional_Kelly_0.2_90_T.csv")
+        self.assertListEqual(glob.glob("./out_data/returns_*"), [])
+        self.assertListEqual(list(read_total_returns_file(fn)), ["1", "2"])
+        self.assertEqual(load_cube().select(horizon=2)["frac_return"].count, pd.read_csv(fn).sample_size[1])
+
+    def test_matches_csv_round_trip(self):
+        fn = summarize_model(SPEC, self.data, self.range_index, "T", horizons=[1, 2], raw=True)
+        summary = pd.read_csv(fn)
+        returns = {k: v.returns for k, v in read_total_returns_file(fn).items()}
+        self.assertEqual(len(glob.glob("./out_data/returns_*_T.csv")), 2)
+
+        expected_fn, _ = create_summary_file(*get_model_run_outputs("Fractional_Kelly_0.2_90_T.csv", years=[1, 2]))
+        self.assertEqual(expected_fn, fn)
+        expected = pd.read_csv(expected_fn)
+        numeric = expected.columns.drop("model_name")
+        self.assertListEqual(summary.columns.to_list(), expected.columns.to_list())
+        np.testing.assert_allclose(summary[numeric].to_numpy(), expected[numeric].to_numpy(), rtol=1e-12)
+        for k, v in read_total_returns_file(expected_fn).items():
+            np.testing.assert_array_equal(returns[k], v.returns)
+
+    def test_manifest_records(self):
+        os.mkdir("data")
+        for fn in [sp500_input_path, interest_input_path]:
+            with open(fn, "w") as outfile:
+                outfile.write(fn)
+        manifest = StageManifest("./out_data/manifest/")
+        fn = summarize_model(SPEC, self.data, self.range_index, "T", horizons=[1, 2], raw=True, manifest=manifest)
+        suffix = "Fractional_Kelly_0.2_90_T.csv"
+        run_files = [f"./out_data/returns_{years}_{suffix}" for years in [1, 2]]
+        outputs = [fn, get_total_returns_filename(fn), get_cube_filename(suffix)]
+        # bin/summarize.py finds the summary of the raw files current
+        self.assertTrue(manifest.is_current(f"summary:{suffix}", run_files + [sp500_input_path, interest_input_path],
+                                            summary_stage_params([1, 2]), outputs))
+        trace = manifest.trace(get_cube_filename(suffix))
+        self.assertEqual(trace["stage"], f"summary:{suffix}")
+        results = [node for node in trace["inputs"] if node["artifact"] in run_files]
+        self.assertListEqual([node["params"]["years"] for node in results], [1, 2])
+        self.assertEqual(results[0]["params"]["model"], SPEC)
+
+        fn = summarize_model(SPEC, self.data, self.range_index, "U", horizons=[1, 2], manifest=manifest)
+        trace = manifest.trace(fn)
+        self.assertEqual(trace["params"]["model"], SPEC)
+        self.assertListEqual([node["artifact"] for node in trace["inputs"]],
+                             sorted([sp500_input_path, interest_input_path]))
+
+    def test_model_spec_families(self):
+        names = set()
+        for specs_fn in MODEL_SPEC_FAMILIES.values():
+            for spec in specs_fn():
+                model = build_model(spec, self.data)
+                model.model_config(self.data[0][0])
+                names.add(model.model_name)
+        self.assertEqual(len(names), 1 + 8 + 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+from returns.engine import model_tester
+from returns.models import Model
+from returns.progressive import *
+from returns.synthetic import get_synthetic_combined_data
+
+
+class TestProgressive(unittest.TestCase):
+
+    def setUp(self):
+        self.data, self.header = get_synthetic_combined_data(years=4)
+
+    def test_refinement_levels_cover_all(self):
+        levels = refinement_levels(100, initial_step=12)
+        self.assertListEqual(levels[0], list(range(0, 100, 16)))
+        self.assertListEqual(levels[1], list(range(8, 100, 16)))
+        self.assertListEqual(sorted(i for level in levels for i in level), list(range(100)))
+
+    def test_full_refinement_matches_model_tester(self):
+        rets, estimates, fraction = progressive_model_tester(Model(), self.data, years=2, tolerance=0., initial_step=16)
+        full = model_tester(Model(), self.data, years=2)
+        self.assertListEqual(rets, full)
+        self.assertEqual(fraction, 1.)
+        self.assertAlmostEqual(estimates["mean_frac_return"][0], np.mean([r[1] for r in full]))
+
+    def test_early_stop(self):
+        rets, estimates, fraction = progressive_model_tester(Model(), self.data, years=2, tolerance=np.inf,
+                                                             initial_step=4)
+        levels = refinement_levels(len(model_tester(Model(), self.data, years=2)), 4)
+        self.assertEqual(len(rets), len(levels[0]) + len(levels[1]))
+        self.assertListEqual(rets, sorted(rets, key=lambda r: r[0]))
+
+    def test_running_estimates(self):
+        rows = [[None, -0.1 if i % 4 == 0 else 0.1, 0.05, 1, "m"] for i in range(40)]
+        estimates = running_estimates(rows)
+        self.assertAlmostEqual(estimates["fraction_losing_starts"][0], 0.25)
+        self.assertEqual(estimates["mean_yearly_return"][1], 0.)
+        self.assertEqual(running_estimates(rows[:5])["mean_frac_return"][1], np.inf)
+
+    def test_converged_is_relative(self):
+        estimates = {"mean_frac_return": (2., 0.09), "fraction_losing_starts": (0.1, 0.004)}
+        self.assertTrue(converged(estimates, 0.05))
+        self.assertFalse(converged(dict(estimates, fraction_losing_starts=(0.1, 0.006)), 0.05))
+        # estimates near zero are measured against MIN_SCALE
+        self.assertTrue(converged({"mean_yearly_return": (0., MIN_SCALE * 0.05)}, 0.05))
+
+
+if __name__ == '__main__':
+    unittest.main()
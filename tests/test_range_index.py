@@ -0,0 +1,62 @@
+import unittest
+import datetime
+import numpy as np
+from returns.range_index import PriceRangeIndex
+
+
+def brute_force_max_drawdown(prices):
+    peak = np.maximum.accumulate(prices)
+    return np.max(1 - prices / peak)
+
+
+class TestPriceRangeIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.prices = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, 1000)))
+        self.dates = [datetime.datetime(2000, 1, 3) + datetime.timedelta(days=i) for i in range(1000)]
+        self.index = PriceRangeIndex(self.dates, self.prices)
+        self.windows = [(0, 999), (5, 6), (17, 17), (100, 612), (333, 998)] + \
+            [tuple(sorted(rng.integers(0, 1000, 2))) for _ in range(50)]
+
+    def test_window_return(self):
+        for i, j in self.windows:
+            self.assertAlmostEqual(self.index.window_return(i, j), self.prices[j] / self.prices[i] - 1)
+
+    def test_window_min_max(self):
+        for i, j in self.windows:
+            self.assertAlmostEqual(self.index.window_min(i, j), self.prices[i:j + 1].min())
+            self.assertAlmostEqual(self.index.window_max(i, j), self.prices[i:j + 1].max())
+
+    def test_vectorized_min_max(self):
+        i, j = np.array(self.windows).T
+        np.testing.assert_allclose(self.index.window_min(i, j), [self.prices[a:b + 1].min() for a, b in self.windows])
+        np.testing.assert_allclose(self.index.window_max(i, j), [self.prices[a:b + 1].max() for a, b in self.windows])
+
+    def test_max_drawdown(self):
+        for i, j in self.windows:
+            self.assertAlmostEqual(self.index.max_drawdown(i, j), brute_force_max_drawdown(self.prices[i:j + 1]))
+        # monotone rising prices never draw down
+        rising = PriceRangeIndex(self.dates[:10], np.arange(1., 11.))
+        self.assertAlmostEqual(rising.max_drawdown(0, 9), 0)
+
+    def test_worst_sub_period_return(self):
+        lag = 20
+        i, j = 100, 600
+        expected = min(self.prices[k + lag] / self.prices[k] - 1 for k in range(i, j - lag + 1))
+        self.assertAlmostEqual(self.index.worst_sub_period_return(i, j, lag), expected)
+
+    def test_attach_window_metrics(self):
+        rows = [(self.dates[10], 0.1, 0.1, 1.0, "Buy_Hold"), (self.dates[20] - datetime.timedelta(hours=1),
+                                                             0.2, 0.2, 1.0, "Buy_Hold")]
+        attached = self.index.attach_window_metrics(rows, years=1)
+        self.assertEqual(len(attached[0]), 9)
+        self.assertEqual(attached[0][-1], "Buy_Hold")
+        self.assertEqual(attached[0][:4], rows[0][:4])
+        self.assertAlmostEqual(attached[0][4], self.prices[375] / self.prices[10] - 1)
+        self.assertAlmostEqual(attached[0][7], brute_force_max_drawdown(self.prices[10:376]))
+        self.assertAlmostEqual(attached[1][4], self.prices[385] / self.prices[20] - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+from returns.engine import model_tester, model_tester_horizons
+from returns.models import KellyModel
+from returns.search import *
+from returns.synthetic import get_synthetic_combined_data
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.data, self.header = get_synthetic_combined_data(years=5)
+        self.specs = parameter_grid("KellyModel", bond_fract=[0.1, 0.5, 0.9], rebalance_period=[90, 180])
+
+    def test_parameter_grid(self):
+        self.assertEqual(len(self.specs), 6)
+        self.assertDictEqual(self.specs[1], {"model": "KellyModel", "kwargs": {"bond_fract": 0.1, "rebalance_period": 180}})
+
+    def test_successive_halving(self):
+        fidelities = [(30, [1]), (12, [1, 2])]
+        result, history = successive_halving(self.specs, self.data, "fraction_losing_starts",
+                                             fidelities=fidelities, winners=1, full_horizons=[2])
+        self.assertListEqual([len(rung) for rung in history], [6, 3])
+        # survivors of the first rung are its best half
+        self.assertTrue(all(spec in [s for s, _ in history[0][:3]] for spec, _ in history[1]))
+        spec, score, rets = result[0]
+        self.assertEqual(spec, history[1][0][0])
+        full = model_tester(KellyModel(**spec["kwargs"]), self.data, years=2)
+        self.assertListEqual(rets[2], full)
+        self.assertAlmostEqual(score, -np.mean([r[1] < 0 for r in full]))
+
+    def test_score_spec(self):
+        spec = self.specs[0]
+        score = score_spec(spec, self.data, [1, 2], 30, "fraction_losing_starts")
+        self.assertIsInstance(score, float)
+        rets = model_tester_horizons(KellyModel(**spec["kwargs"]), self.data, [1, 2], stride_days=30)
+        self.assertDictEqual(evaluate_spec(spec, self.data, [1, 2], 30), rets)
+        self.assertAlmostEqual(score, score_returns(rets, "fraction_losing_starts"))
+
+    def test_unknown_objective(self):
+        with self.assertRaises(ValueError):
+            successive_halving(self.specs, self.data, "sharpe")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+from returns.stages import *
+
+
+class TestStageManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manifest = StageManifest(os.path.join(self.tmp.name, "manifest"))
+        self.source = self.path("source.txt")
+        self.middle = self.path("middle.txt")
+        self.final = self.path("final.txt")
+        self.write(self.source, "1,2,3")
+        self.runs = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, fn, text):
+        with open(fn, "w") as outfile:
+            outfile.write(text)
+
+    def build(self, scale=2):
+        def make_middle():
+            self.runs.append("middle")
+            with open(self.source) as infile:
+                self.write(self.middle, ",".join(str(int(x) * scale) for x in infile.read().split(",")))
+
+        def make_final():
+            self.runs.append("final")
+            with open(self.middle) as infile:
+                self.write(self.final, str(sum(int(x) for x in infile.read().split(","))))
+
+        self.manifest.run_stage("middle", [self.source], {"scale": scale}, [self.middle], make_middle)
+        self.manifest.run_stage("final", [self.middle], {}, [self.final], make_final)
+
+    def test_skips_current_stages(self):
+        self.build()
+        self.build()
+        self.assertListEqual(self.runs, ["middle", "final"])
+
+    def test_rebuilds_stale_stages(self):
+        self.build()
+        # same content rewritten: still current
+        self.write(self.source, "1,2,3")
+        self.build()
+        self.assertListEqual(self.runs, ["middle", "final"])
+        self.build(scale=3)
+        self.assertListEqual(self.runs, ["middle", "final"] * 2)
+        self.write(self.source, "1,2,4")
+        self.build(scale=3)
+        self.assertListEqual(self.runs[-2:], ["middle", "final"])
+        os.remove(self.final)
+        self.build(scale=3)
+        self.assertListEqual(self.runs[-1:], ["final"])
+        with open(self.final) as infile:
+            self.assertEqual(infile.read(), "21")
+
+    def test_trace(self):
+        self.build()
+        trace = self.manifest.trace(self.final)
+        self.assertEqual(trace["stage"], "final")
+        middle = trace["inputs"][0]
+        self.assertEqual(middle["stage"], "middle")
+        self.assertDictEqual(middle["params"], {"scale": 2})
+        source = middle["inputs"][0]
+        self.assertEqual(source["artifact"], self.source)
+        self.assertIsNone(source["stage"])
+        self.assertEqual(source["hash"], file_hash(self.source))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,13 @@
+import unittest
+from returns.startup import *
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_lean_imports(self):
+        for path, loaded in check_lean_imports():
+            self.assertListEqual(loaded, [], f"{path} loaded {loaded}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import glob
+import os
+import tempfile
+import numpy as np
+from returns.analysis import RETURNS_STATS_COLUMNS
+from returns.summary_index import *
+
+
+def write_summary(directory, model_name, run_tag, offset=0.):
+    fn = os.path.join(directory, f"summary_{model_name}_{run_tag}.csv")
+    with open(fn, "w") as outfile:
+        outfile.write(",".join(RETURNS_STATS_COLUMNS) + "\n")
+        for years in [1, 2, 3]:
+            outfile.write(f"100,{years}.0,{model_name}," + ",".join([str(offset + years / 10)] * 9) + "\n")
+    return fn
+
+
+class TestSummaryIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "index")
+        self.files = [write_summary(self.tmp.name, "Buy_Hold", "2024-01-01_1200"),
+                      write_summary(self.tmp.name, "Fractional_Kelly_0.1_90", "2024-01-01_1200", offset=1.),
+                      write_summary(self.tmp.name, "Fractional_Kelly_0.25_30", "2024-01-01_1200", offset=2.),
+                      write_summary(self.tmp.name, "Insurance_0.1_0.12_90", "2024-01-01_1200", offset=3.)]
+        update_summary_index(self.files, self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_model_name(self):
+        self.assertEqual(parse_model_name("Buy_Hold"), ("Buy_Hold", {}))
+        self.assertEqual(parse_model_name("Fractional_Kelly_0.25_30"),
+                         ("Fractional_Kelly", {"bond_frac": 0.25, "rebalance_period": 30.}))
+        self.assertEqual(parse_model_name("Insurance_0.1_0.12_90"),
+                         ("Insurance", {"insurance_frac": 0.1, "insurance_deductible": 0.12, "insurance_period": 90.}))
+
+    def test_query(self):
+        index = SummaryIndex(self.path)
+        self.assertEqual(index.meta["rows"], 12)
+        df = index.query({"horizon": 2, "bond_frac": [0.1, 0.25]}, ["model_name", "mean_total_returns"])
+        self.assertListEqual(list(df.columns), ["model_name", "mean_total_returns"])
+        self.assertListEqual(list(df.model_name), ["Fractional_Kelly_0.1_90", "Fractional_Kelly_0.25_30"])
+        self.assertListEqual(list(df.mean_total_returns), [1.2, 2.2])
+        df = index.query({"horizon": Range(2, 3), "model_family": "Insurance", "insurance_deductible": Range(0.1, 0.2)})
+        self.assertListEqual(list(df.horizon), [2, 3])
+        self.assertEqual(len(index.query({"horizon": 9})), 0)
+        df = get_model_comparison_data_indexed(3, path=self.path)
+        self.assertListEqual(list(df.model_family), ["Buy_Hold", "Fractional_Kelly", "Fractional_Kelly", "Insurance"])
+        self.assertEqual(len(index.query({"horizon": (1, 3), "bond_frac": (0.1, 0.25)})), 4)
+        with self.assertRaises(KeyError):
+            index.query({"bond_fraction": 0.1})
+        self.assertListEqual(glob.glob(os.path.join(self.path, "*.tmp")), [])
+
+    def test_incremental_update(self):
+        self.assertFalse(update_summary_index(self.files, self.path))
+        new = write_summary(self.tmp.name, "Buy_Hold", "2024-02-01_1200", offset=5.)
+        self.assertTrue(update_summary_index(self.files[1:] + [new], self.path))
+        df = SummaryIndex(self.path).query({"model_family": "Buy_Hold"}, ["run_tag", "horizon"])
+        self.assertListEqual(list(df.run_tag), ["2024-02-01_1200"] * 3)
+        self.assertEqual(SummaryIndex(self.path).meta["rows"], 12)
+
+    def test_empty_cells(self):
+        fn = os.path.join(self.tmp.name, "summary_Buy_Hold_2024-03-01_1200.csv")
+        with open(fn, "w") as outfile:
+            outfile.write("sample_size,time_span,model_name,mean_total_returns,mean_total_returns_ci_low\n")
+            outfile.write("100,2.0,Buy_Hold,0.1,\n")
+        update_summary_index([fn], self.path)
+        df = SummaryIndex(self.path).query({"horizon": 2}, ["mean_total_returns", "mean_total_returns_ci_low"])
+        self.assertEqual(df.mean_total_returns[0], 0.1)
+        self.assertTrue(np.isnan(df.mean_total_returns_ci_low[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
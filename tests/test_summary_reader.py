@@ -0,0 +1,163 @@
+import unittest
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+from returns.analysis import (ColumnAggregator, BOOTSTRAP_CI_COLUMNS, MIN_BOOTSTRAP_BLOCKS, bootstrap_block_length,
+                              bootstrap_intervals, distribution_summary, moving_block_bootstrap_indices)
+from returns.data import (create_summary_file, create_summary_file_chunked, get_model_run_outputs,
+                          read_summary_data, read_total_returns_file, TotalReturnsFileWriter)
+from returns.models import KellyModel
+from returns.synthetic import get_synthetic_combined_data
+from tests.fixtures import enter_temp_dir, write_model_runs
+
+DATE_STR = "test.csv"
+SUFFIX = f"Fractional_Kelly_0.4_90_{DATE_STR}"
+
+
+class TestChunkedSummary(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        enter_temp_dir(cls)
+        # long enough for several bootstrap blocks at both horizons
+        data, _ = get_synthetic_combined_data(years=12)
+        write_model_runs(data, [KellyModel()], [1, 2], DATE_STR)
+
+    def test_matches_in_memory_summary(self):
+        fn, jfn = create_summary_file(*get_model_run_outputs(SUFFIX, years=[1, 2]))
+        expected = pd.read_csv(fn)
+        expected_returns = {k: (v.returns, v.hist_counts, v.quantiles) for k, v in read_total_returns_file(fn).items()}
+
+        # without the opt-in bootstrap the chunked summary has no interval columns
+        fn, jfn = create_summary_file_chunked(SUFFIX, years=[1, 2], chunk_size=37)
+        self.assertFalse(set(BOOTSTRAP_CI_COLUMNS) & set(pd.read_csv(fn).columns))
+
+        fn, jfn = create_summary_file_chunked(SUFFIX, years=[1, 2], chunk_size=37, bootstrap=True)
+        summary = pd.read_csv(fn)
+        total_returns = read_total_returns_file(fn)
+
+        self.assertListEqual(summary.columns.to_list(), expected.columns.to_list())
+        self.assertListEqual(summary.columns.to_list()[-len(BOOTSTRAP_CI_COLUMNS):], BOOTSTRAP_CI_COLUMNS)
+        # every horizon has intervals, the blocks are shortened to fit enough of them
+        self.assertTrue(summary[BOOTSTRAP_CI_COLUMNS].notna().all().all())
+        self.assertTrue((summary["mean_total_returns_ci_low"] <= summary["mean_total_returns"]).all())
+        self.assertTrue((summary["mean_total_returns"] <= summary["mean_total_returns_ci_high"]).all())
+        self.assertListEqual(summary["model_name"].to_list(), expected["model_name"].to_list())
+        numeric = expected.columns.drop("model_name")
+        np.testing.assert_allclose(summary[numeric].to_numpy(), expected[numeric].to_numpy(), rtol=1e-9)
+        self.assertListEqual(list(total_returns), ["1", "2"])
+        for k, (returns, counts, quantiles) in expected_returns.items():
+            np.testing.assert_array_equal(total_returns[k].returns, returns)
+            np.testing.assert_array_equal(total_returns[k].hist_counts, counts)
+            np.testing.assert_allclose(total_returns[k].quantiles, quantiles, rtol=1e-12)
+
+    def test_distribution_file(self):
+        fn, jfn = create_summary_file(*get_model_run_outputs(SUFFIX, years=[1, 2]))
+        results, _, _ = get_model_run_outputs(SUFFIX, years=[1, 2])
+        df, total_returns = read_summary_data(fn)
+        dist = total_returns["1"]
+        frac_returns = np.array([r[1] for r in results[1]], dtype=float)
+        self.assertEqual(dist.returns.dtype, np.float32)
+        np.testing.assert_allclose(dist.returns, frac_returns, rtol=1e-6)
+        np.testing.assert_array_equal(dist.hist_counts, np.histogram(frac_returns, bins=45)[0])
+        self.assertAlmostEqual(dist.quantiles[50], np.median(frac_returns))
+        self.assertEqual(len(dist.quantiles), len(dist.quantile_levels))
+        self.assertEqual(len(list(dist)), len(frac_returns))
+
+    def test_streamed_total_returns_file(self):
+        fn = "./out_data/total_returns_Streamed_test.npz"
+        with TotalReturnsFileWriter(fn) as writer:
+            with writer.array_stream("returns_1", 5) as append:
+                append([0.1, 0.2])
+                append([-0.3, 0.4, 0.5])
+            writer.add_horizon(1, *distribution_summary([0.1, 0.2, -0.3, 0.4, 0.5]))
+        dist = read_total_returns_file(fn.replace("total_returns", "summary").replace(".npz", ".csv"))["1"]
+        np.testing.assert_allclose(dist.returns, [0.1, 0.2, -0.3, 0.4, 0.5], rtol=1e-6)
+        self.assertEqual(dist.quantiles[50], 0.2)
+        with self.assertRaises(ValueError):
+            with TotalReturnsFileWriter(fn + "2") as writer:
+                with writer.array_stream("returns_1", 5) as append:
+                    append([0.1])
+        self.assertFalse(os.path.exists(fn + "2") or os.path.exists(fn + "2.tmp"))
+
+    def test_json_total_returns_fallback(self):
+        fn = "./out_data/summary_Old_Model_test.csv"
+        with open(fn.replace("summary", "total_returns").replace(".csv", ".json"), "w") as outfile:
+            json.dump({"1": [0.1, -0.2]}, outfile)
+        self.assertDictEqual(read_total_returns_file(fn), {"1": [0.1, -0.2]})
+
+
+class TestColumnAggregator(unittest.TestCase):
+
+    def test_merge(self):
+        values = np.random.default_rng(1).normal(0.05, 0.2, 1001)
+        left, right = ColumnAggregator((values.min(), values.max())), ColumnAggregator((values.min(), values.max()))
+        left.update(values[:400])
+        right.update(values[400:])
+        left.merge(right)
+        self.assertEqual(left.count, 1001)
+        self.assertAlmostEqual(left.mean, np.mean(values))
+        self.assertAlmostEqual(left.std(), np.std(values))
+        self.assertEqual(left.negative, np.count_nonzero(values < 0))
+        np.testing.assert_array_equal(left.hist, np.histogram(values, bins=45)[0])
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def test_block_indices(self):
+        indices = moving_block_bootstrap_indices(100, 10, samples=7)
+        self.assertEqual(indices.shape, (7, 100))
+        self.assertTrue(((indices >= 0) & (indices < 100)).all())
+        np.testing.assert_array_equal(np.diff(indices[:, :10], axis=1), 1)
+
+    def test_block_length(self):
+        first, last = datetime.datetime(2000, 1, 1), datetime.datetime(2009, 12, 31)
+        self.assertEqual(bootstrap_block_length(1218, first, last, 0.5), 61)
+        # capped to leave MIN_BOOTSTRAP_BLOCKS blocks
+        self.assertEqual(bootstrap_block_length(1218, first, last, 1.), 121)
+        self.assertEqual(bootstrap_block_length(10, first, last, 15.), 1)
+
+    def test_long_horizon_on_realistic_history(self):
+        # 10-year windows every 3 days over 1956-2023 (as from the bundled data)
+        first, last = datetime.datetime(1956, 1, 3), datetime.datetime(2013, 2, 1)
+        n = 6958
+        block_length = bootstrap_block_length(n, first, last, 10.)
+        self.assertEqual(block_length, n // MIN_BOOTSTRAP_BLOCKS)
+        walk = 0.5 + np.cumsum(np.random.default_rng(5).normal(0, 0.01, n))
+        bounds = bootstrap_intervals(walk, walk / 10, block_length)
+        self.assertFalse(np.isnan(bounds).any())
+        self.assertLess(bounds[0], walk.mean())
+        self.assertGreater(bounds[1], walk.mean())
+
+    def test_intervals(self):
+        values = np.random.default_rng(2).normal(0.05, 0.2, 2000)
+        bounds = bootstrap_intervals(values, values / 10, block_length=1, samples=500)
+        self.assertEqual(len(bounds), len(BOOTSTRAP_CI_COLUMNS))
+        low, high = bounds[0], bounds[1]
+        self.assertLess(low, values.mean())
+        self.assertGreater(high, values.mean())
+        self.assertAlmostEqual(high - low, 2 * 1.96 * values.std() / np.sqrt(len(values)), delta=0.005)
+        # overlapping windows: longer blocks give wider intervals on autocorrelated data
+        walk = np.cumsum(np.random.default_rng(3).normal(0, 0.01, 2000))
+        narrow = bootstrap_intervals(walk, walk, block_length=1)
+        wide = bootstrap_intervals(walk, walk, block_length=200)
+        self.assertGreater(wide[1] - wide[0], narrow[1] - narrow[0])
+        # too few blocks to resample from
+        self.assertTrue(np.isnan(bootstrap_intervals(walk, walk, block_length=201)).all())
+
+    def test_intervals_match_materialized_resamples(self):
+        total = np.random.default_rng(4).normal(0.05, 0.2, 503)
+        yearly = total / 7
+        indices = moving_block_bootstrap_indices(len(total), 13, samples=50)
+        estimates = [total[indices].mean(axis=1), yearly[indices].mean(axis=1),
+                     np.median(total[indices], axis=1), np.median(yearly[indices], axis=1),
+                     total[indices].std(axis=1), yearly[indices].std(axis=1),
+                     np.count_nonzero(total[indices] < 0, axis=1) / len(total)]
+        expected = np.quantile(np.array(estimates), [0.025, 0.975], axis=1).T.reshape(-1)
+        np.testing.assert_allclose(bootstrap_intervals(total, yearly, 13, samples=50), expected, rtol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
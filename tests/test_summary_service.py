@@ -0,0 +1,85 @@
+import unittest
+import json
+import math
+import os
+import tempfile
+import urllib.error
+from returns.analysis import RETURNS_STATS_COLUMNS
+from returns.summary_service import *
+
+
+def write_summary(directory, model_name, run_tag, offset=0.):
+    fn = os.path.join(directory, f"summary_{model_name}_{run_tag}.csv")
+    with open(fn, "w") as outfile:
+        outfile.write(",".join(RETURNS_STATS_COLUMNS) + "\n")
+        for years in [1, 2, 3]:
+            outfile.write(f"100,{years}.0,{model_name}," + ",".join([str(offset + years / 10)] * 9) + "\n")
+    with open(fn.replace("summary", "total_returns").replace(".csv", ".json"), "w") as outfile:
+        json.dump({str(years): [offset + years, offset - years] for years in [1, 2, 3]}, outfile)
+    return fn
+
+
+class TestSummaryService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        write_summary(self.tmp.name, "Buy_Hold", "2024-01-01_1200")
+        write_summary(self.tmp.name, "Insurance_0.1_0.12_90", "2024-01-01_1200", offset=1.)
+        self.store = SummaryStore(os.path.join(self.tmp.name, "summary_*.csv"), capacity=1, refresh_interval=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_query(self):
+        self.assertListEqual(self.store.models(), ["Buy_Hold", "Insurance_0.1_0.12_90"])
+        rows = self.store.query("Insurance_0.1_0.12_90", horizon=2, stats=["mean_total_returns"])
+        self.assertListEqual(rows, [{"model_name": "Insurance_0.1_0.12_90", "horizon": 2,
+                                     "run_tag": "2024-01-01_1200", "mean_total_returns": 1.2}])
+        self.assertEqual(len(self.store.query(horizon=3)), 2)
+
+    def test_distribution_lru(self):
+        self.assertListEqual(self.store.distribution("Buy_Hold", 2), [2, -2])
+        self.assertListEqual(self.store.distribution("Insurance_0.1_0.12_90", 1), [2, 0])
+        self.assertEqual(len(self.store._cache), 1)
+        with self.assertRaises(KeyError):
+            self.store.distribution("Buy_Hold", 7)
+
+    def test_reload_new_files(self):
+        write_summary(self.tmp.name, "Buy_Hold", "2024-02-01_1200", offset=5.)
+        rows = self.store.query("Buy_Hold", horizon=1)
+        self.assertListEqual([r["run_tag"] for r in rows], ["2024-01-01_1200", "2024-02-01_1200"])
+        self.assertListEqual(self.store.distribution("Buy_Hold", 1), [6, 4])
+        os.remove(os.path.join(self.tmp.name, "summary_Buy_Hold_2024-02-01_1200.csv"))
+        self.assertEqual(len(self.store.query("Buy_Hold")), 3)
+
+    def test_empty_cells(self):
+        fn = os.path.join(self.tmp.name, "summary_Buy_Hold_2024-03-01_1200.csv")
+        with open(fn, "w") as outfile:
+            outfile.write(",".join(RETURNS_STATS_COLUMNS) + "\n")
+            outfile.write("100,1.0,Buy_Hold," + ",".join(["0.1"] * 8) + ",\n")
+        row = self.store.query("Buy_Hold", horizon=1)[-1]
+        self.assertEqual(row["run_tag"], "2024-03-01_1200")
+        self.assertTrue(math.isnan(row[RETURNS_STATS_COLUMNS[-1]]))
+
+    def test_server(self):
+        server = SummaryServer(self.store, port=0)
+        server.start()
+        try:
+            port = server.server_address[1]
+            self.assertListEqual(query_summary_service("/models", port=port), self.store.models())
+            rows = query_summary_service(port=port, model="Buy_Hold", horizon=3, stat="fraction_losing_starts")
+            self.assertAlmostEqual(rows[0]["fraction_losing_starts"], 0.3)
+            self.assertListEqual(query_summary_service("/distribution", port=port, model="Buy_Hold", horizon=1),
+                                 [1, -1])
+            with self.assertRaises(urllib.error.HTTPError):
+                query_summary_service("/distribution", port=port, model="Nope", horizon=1)
+            with self.assertRaises(urllib.error.HTTPError) as cm:
+                query_summary_service(port=port, model="Buy_Hold", horizon="x")
+            self.assertEqual(cm.exception.code, 400)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import datetime
+import glob
+import numpy as np
+from returns.tensor import *
+from returns.engine import returns_header
+from returns.models import Model, KellyModel, InsuranceModel
+from returns.synthetic import get_synthetic_combined_data
+from returns.writer import BackgroundResultWriter
+from tests.fixtures import enter_temp_dir, write_model_runs
+
+DATE_STR = "2024-01-01_1200.csv"
+
+
+class TestResultsTensor(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        enter_temp_dir(cls)
+        data, _ = get_synthetic_combined_data(years=5, start_date=datetime.datetime(1987, 1, 1))
+        cls.rows = write_model_runs(data, [Model(), KellyModel(), InsuranceModel()], [1, 2], DATE_STR)
+        build_results_tensor(glob.glob("./out_data/returns_*.csv"), chunk_size=100)
+        cls.tensor = ResultsTensor()
+
+    def test_layout(self):
+        t = self.tensor
+        self.assertListEqual(t.horizons, [1, 2])
+        self.assertListEqual(t.models, sorted({m for m, _ in self.rows}))
+        self.assertIsInstance(t.arrays["frac_return"], np.memmap)
+        self.assertEqual(t.arrays["frac_return"].shape, (3, 2, len(self.rows[("Buy_Hold", 1)])))
+        for (model_name, years), rows in self.rows.items():
+            x = t.values(years, models=[model_name])[0]
+            self.assertEqual(np.count_nonzero(~np.isnan(x)), len(rows))
+            np.testing.assert_array_equal(x[:len(rows)], [r[1] for r in rows])
+            np.testing.assert_array_equal(t.start_dates[:len(rows)].astype(datetime.datetime), [r[0] for r in rows])
+
+    def test_comparisons(self):
+        t = self.tensor
+        x = t.values(2)
+        diffs = t.pairwise_differences(2)
+        np.testing.assert_array_equal(diffs[0, 1], t.excess_returns(t.models[0], t.models[1], 2))
+        wins = t.win_rates(2)
+        both = ~np.isnan(x[0]) & ~np.isnan(x[1])
+        self.assertAlmostEqual(wins[0, 1], np.mean(x[0][both] > x[1][both]))
+        self.assertTrue(np.all(np.diag(wins) == 0))
+        ranks = t.ranks(2)
+        self.assertTrue(np.isnan(ranks[:, -1]).all())
+        complete = both & ~np.isnan(x[2])
+        self.assertTrue(np.all(np.sort(ranks[:, complete], axis=0) == np.arange(1, 4)[:, None]))
+        best = np.argmax(x[:, complete], axis=0)
+        np.testing.assert_array_equal(ranks[best, np.flatnonzero(complete)], 1)
+        mean_ranks = t.mean_ranks(2)
+        self.assertAlmostEqual(sum(mean_ranks.values()), 6)
+
+    def test_newest_run_only(self):
+        rows = self.rows[("Buy_Hold", 1)]
+        newer = [[r[0], r[1] + 1.] + list(r[2:]) for r in rows[:len(rows) // 2]]
+        fn = "./out_data/returns_1_Buy_Hold_2025-01-01_1200.csv"
+        with BackgroundResultWriter(fn, returns_header(window_metrics=True)) as writer:
+            writer.put(newer)
+        try:
+            files = glob.glob("./out_data/returns_*.csv")
+            self.assertEqual(len(select_latest_runs(files)), len(files) - 1)
+            self.assertIn(fn, select_latest_runs(files))
+            path = build_results_tensor(files, path="./out_data/tensor_newest/")
+        finally:
+            os.remove(fn)
+        x = ResultsTensor(path).values(1, models=["Buy_Hold"])[0]
+        # the older run's later start dates are not mixed in
+        self.assertEqual(np.count_nonzero(~np.isnan(x)), len(newer))
+        np.testing.assert_array_equal(x[:len(newer)], [r[1] for r in newer])
+
+
+if __name__ == '__main__':
+    unittest.main()